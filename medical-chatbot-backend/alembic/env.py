@@ -19,6 +19,7 @@ from app.models.guest_session import GuestSession
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.feedback import Feedback
+from app.models.memory_index import ConversationMemoryIndex
 
 # Alembic Config object
 config = context.config
@@ -0,0 +1,43 @@
+"""add hot path indexes
+
+Revision ID: f9cb83bec501
+Revises: 75e586590fd1
+Create Date: 2026-10-17 09:00:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f9cb83bec501'
+down_revision = '75e586590fd1'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_messages_conversation_id_created_at', 'messages', ['conversation_id', 'created_at']),
+    ('ix_conversations_user_id_updated_at', 'conversations', ['user_id', 'updated_at']),
+    ('ix_conversations_guest_session_id_updated_at', 'conversations', ['guest_session_id', 'updated_at']),
+    ('ix_feedbacks_message_id', 'feedbacks', ['message_id']),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY does not block writes on a live messages
+        # table, but cannot run inside the migration transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, unique=False,
+                                postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
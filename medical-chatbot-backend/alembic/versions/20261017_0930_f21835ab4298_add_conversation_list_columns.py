@@ -0,0 +1,36 @@
+"""add conversation list columns
+
+Revision ID: f21835ab4298
+Revises: f9cb83bec501
+Create Date: 2026-10-17 09:30:41.902117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f21835ab4298'
+down_revision = 'f9cb83bec501'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('conversations', sa.Column('preview', sa.String(length=100), nullable=True))
+
+    # Backfill from existing messages (both subqueries use ix_messages_conversation_id_created_at)
+    op.execute(
+        "UPDATE conversations SET "
+        "message_count = (SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id), "
+        "preview = (SELECT substr(messages.content, 1, 100) FROM messages "
+        "WHERE messages.conversation_id = conversations.id AND messages.role = 'user' "
+        "ORDER BY messages.created_at, messages.id LIMIT 1)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('conversations') as batch_op:
+        batch_op.drop_column('preview')
+        batch_op.drop_column('message_count')
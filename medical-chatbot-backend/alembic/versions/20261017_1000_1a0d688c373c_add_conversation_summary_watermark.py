@@ -0,0 +1,26 @@
+"""add conversation summary watermark
+
+Revision ID: 1a0d688c373c
+Revises: f21835ab4298
+Create Date: 2026-10-17 10:00:27.551840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a0d688c373c'
+down_revision = 'f21835ab4298'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL = nothing summarized yet; the first long turn folds the older messages once
+    op.add_column('conversations', sa.Column('summarized_through_message_id', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('conversations') as batch_op:
+        batch_op.drop_column('summarized_through_message_id')
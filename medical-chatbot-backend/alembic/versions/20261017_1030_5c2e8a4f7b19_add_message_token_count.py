@@ -0,0 +1,27 @@
+"""add message token count
+
+Revision ID: 5c2e8a4f7b19
+Revises: 1a0d688c373c
+Create Date: 2026-10-17 10:30:12.408337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8a4f7b19'
+down_revision = '1a0d688c373c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # No backfill: counting needs the tokenizer, and rows without a count are
+    # counted when they are loaded (see app/utils/token_counter.message_tokens)
+    op.add_column('messages', sa.Column('token_count', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('messages') as batch_op:
+        batch_op.drop_column('token_count')
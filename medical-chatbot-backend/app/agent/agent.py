@@ -1,23 +1,167 @@
 """Main agent orchestrator - Optimized for stable performance and citations"""
-from typing import AsyncGenerator, List, Dict, Optional, Any
+from typing import AsyncGenerator, Awaitable, List, Dict, Optional, Any, Tuple
+import asyncio
+import hashlib
 import json
 import logging
-from openai import AsyncOpenAI
+import time
 from app.config import settings
+from app.core.clients import get_openai_client
 from app.agent.prompt_builder import get_system_prompt
+from app.agent.streaming import ToolAwareStream, find_complete_string_argument
+from app.tools.knowledge_index import get_knowledge_index
 from app.tools.search import SearchTool
 from app.tools.symptom_checker import SymptomCheckerTool
+from app.tools.base import ToolResult
 from app.safety.emergency_detector import is_emergency, detect_special_cases
 from app.safety.responses import get_emergency_response
-from app.services.conversation_memory import get_conversation_memory
+from app.services.conversation_memory import build_summary_message, chat_message, get_conversation_memory
+from app.services.answer_cache import AnswerCache, get_answer_cache
 
-# Global client for efficiency
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 logger = logging.getLogger(__name__)
-from app.utils.cost_calculator import log_ai_cost
+from app.utils.cost_calculator import log_ai_cost, cached_prompt_tokens
+from app.utils.token_counter import warm_up_encoding
+
+# Per-tool execution timeouts (seconds)
+TOOL_TIMEOUTS = {
+    "medical_search": 20.0,
+    "check_symptoms": 15.0,
+}
+DEFAULT_TOOL_TIMEOUT = 20.0
+
+# Size of the content chunks used when replaying a cached answer
+CACHE_REPLAY_CHUNK_CHARS = 80
+
+
+# Tool definitions sent on the tool-enabled path (built once, shared by all requests)
+TOOLS_SCHEMA = [
+    {
+        "type": "function",
+        "function": {
+            "name": "medical_search",
+            "description": "Search trusted medical sources for conditions, treatments, and health info.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "The search query"},
+                    "timelimit": {
+                        "type": "string", 
+                        "description": "Filter results by time: 'd' (day), 'w' (week), 'm' (month), 'y' (year). USE THIS for latest news or recent updates.",
+                        "enum": ["d", "w", "m", "y"]
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "check_symptoms",
+            "description": "Analyze symptoms using a medical database.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symptoms": {"type": "array", "items": {"type": "string"}},
+                    "age": {"type": "integer"},
+                    "gender": {"type": "string", "enum": ["male", "female"]}
+                },
+                "required": ["symptoms"]
+            }
+        }
+    }
+]
+
+
+class CostTracker:
+    """Accumulates per-step AI costs for one request"""
+    
+    def __init__(self):
+        self.steps = []  # {"step": "name", "cost": 0.00, "tokens": 100, "input_tokens": X, "cached_tokens": C, "output_tokens": Y}
+        self.total_cost = 0.0
+        self.total_input_tokens = 0
+        self.total_cached_tokens = 0
+        self.total_output_tokens = 0
+    
+    def add_step(self, step: str, cost: float, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> None:
+        """Record a step whose cost is already known"""
+        self.steps.append({
+            "step": step,
+            "cost": cost,
+            "tokens": input_tokens + output_tokens,
+            "input_tokens": input_tokens,
+            "cached_tokens": cached_tokens,
+            "output_tokens": output_tokens
+        })
+        self.total_cost += cost
+        self.total_input_tokens += input_tokens
+        self.total_cached_tokens += cached_tokens
+        self.total_output_tokens += output_tokens
+    
+    def add_usage(self, step: str, usage, model: str = "gpt-4o-mini") -> None:
+        """Log and record the cost of an OpenAI usage object (ignored if missing)"""
+        if not usage:
+            return
+        cached_tokens = cached_prompt_tokens(usage)
+        cost = log_ai_cost(
+            model=model,
+            input_tokens=usage.prompt_tokens,
+            output_tokens=usage.completion_tokens,
+            context=step,
+            cached_tokens=cached_tokens
+        )
+        self.add_step(step, cost, usage.prompt_tokens, usage.completion_tokens, cached_tokens)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Cost fields for the done event"""
+        return {
+            "total_cost": self.total_cost,
+            "total_input_tokens": self.total_input_tokens,
+            "total_cached_tokens": self.total_cached_tokens,
+            "cached_token_ratio": round(self.total_cached_tokens / self.total_input_tokens, 4) if self.total_input_tokens else 0.0,
+            "total_output_tokens": self.total_output_tokens,
+            "cost_breakdown": self.steps
+        }
+
+
+async def run_pipeline_stages(stages: Dict[str, Awaitable]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+    """
+    Run independent request stages concurrently and time each one.
+    
+    Args:
+        stages: Mapping of stage name to awaitable
+    
+    Returns:
+        (results by stage name, latency in ms by stage name)
+    
+    If any stage fails (or the caller is cancelled), the remaining stages are
+    cancelled before the error is re-raised.
+    """
+    async def timed(awaitable: Awaitable) -> Tuple[Any, float]:
+        started = time.perf_counter()
+        result = await awaitable
+        return result, round((time.perf_counter() - started) * 1000, 1)
+    
+    tasks = {name: asyncio.create_task(timed(awaitable)) for name, awaitable in stages.items()}
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    
+    results = {name: task.result()[0] for name, task in tasks.items()}
+    latencies = {name: task.result()[1] for name, task in tasks.items()}
+    return results, latencies
 
 class MedicalChatAgent:
-    """Stable Agentic implementation with tool execution and citations"""
+    """
+    Stable Agentic implementation with tool execution and citations
+    
+    Stateless and safe to share across concurrent requests: all per-request
+    state lives inside process_message. Use get_agent() for the shared instance.
+    """
     
     def __init__(self):
         self.search_tool = SearchTool()
@@ -25,59 +169,243 @@ class MedicalChatAgent:
         
         # Initialize Decision Maker for Token Optimization (Gatekeeper Pattern)
         from app.agent.decision_maker import DecisionMaker
-        self.decision_maker = DecisionMaker()
+        self.decision_maker = DecisionMaker(memo_max_entries=settings.GATEKEEPER_MEMO_MAX_ENTRIES)
         
-        self.tools_schema = [
-            {
-                "type": "function",
-                "function": {
-                    "name": "medical_search",
-                    "description": "Search trusted medical sources for conditions, treatments, and health info.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {"type": "string", "description": "The search query"},
-                            "timelimit": {
-                                "type": "string", 
-                                "description": "Filter results by time: 'd' (day), 'w' (week), 'm' (month), 'y' (year). USE THIS for latest news or recent updates.",
-                                "enum": ["d", "w", "m", "y"]
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "check_symptoms",
-                    "description": "Analyze symptoms using a medical database.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "symptoms": {"type": "array", "items": {"type": "string"}},
-                            "age": {"type": "integer"},
-                            "gender": {"type": "string", "enum": ["male", "female"]}
-                        },
-                        "required": ["symptoms"]
-                    }
-                }
+        self.tools_schema = TOOLS_SCHEMA
+        
+        # Static prompt material, serialized once and reused by every request
+        self.system_prompt = get_system_prompt()
+        self.tools_schema_json = json.dumps(self.tools_schema, ensure_ascii=False)
+
+    async def warm_up(self) -> None:
+        """
+        Prepare the shared agent before the first user request.
+        
+        The tool schema, system prompt and local intent classifier are already
+        loaded by __init__; this loads the tokenizer and opens a pooled upstream
+        connection so the first request after a deploy does not pay for BPE
+        loading or TLS setup.
+        """
+        started = time.perf_counter()
+        exact_tokens = await warm_up_encoding()
+        # Opening the knowledge index reads its per-document arrays: keep it off the loop
+        await asyncio.to_thread(get_knowledge_index)
+        prefix_hash = hashlib.sha256(
+            (self.system_prompt + self.tools_schema_json).encode("utf-8")
+        ).hexdigest()[:12]
+        
+        try:
+            await asyncio.wait_for(get_openai_client().models.retrieve("gpt-4o-mini"), timeout=10.0)
+        except Exception as e:
+            logger.warning(f"Agent warm-up could not reach OpenAI: {str(e)}")
+        
+        logger.info(
+            f"Agent warmed up in {(time.perf_counter() - started) * 1000:.0f}ms "
+            f"(static prefix {prefix_hash}, {len(self.system_prompt) + len(self.tools_schema_json)} chars, "
+            f"token counts {'exact' if exact_tokens else 'estimated'})"
+        )
+
+    async def _execute_tool(self, function_name: str, args: Dict[str, Any]) -> ToolResult:
+        """Dispatch a single tool call to its implementation"""
+        if function_name == "medical_search":
+            return await self.search_tool.execute(
+                args.get("query"),
+                timelimit=args.get("timelimit")
+            )
+        if function_name == "check_symptoms":
+            return await self.symptom_checker.execute(**args)
+        return ToolResult(success=False, error=f"Unknown tool: {function_name}")
+
+    async def _open_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[List[Dict[str, Any]]] = None
+    ) -> ToolAwareStream:
+        """Start a streamed completion; tools are only sent when given"""
+        request = {
+            "model": "gpt-4o-mini",
+            "messages": messages,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }
+        if tools:
+            request["tools"] = tools
+            request["tool_choice"] = "auto"
+        return ToolAwareStream(await get_openai_client().chat.completions.create(**request))
+
+    def _start_early_search(
+        self,
+        tool_call: Dict[str, str],
+        index: int,
+        early_searches: Dict[int, Dict[str, Any]]
+    ) -> bool:
+        """
+        Launch medical_search while the tool call arguments are still streaming.
+        
+        Starts as soon as the query argument is syntactically complete, using
+        whatever timelimit has arrived so far. _run_tool_call later checks the
+        guess against the full arguments and re-runs the search if they differ.
+        
+        Returns:
+            True if a search task was started
+        """
+        if tool_call["name"] != "medical_search":
+            return False
+        query = find_complete_string_argument(tool_call["arguments"], "query")
+        if query is None:
+            return False
+        
+        timelimit = find_complete_string_argument(tool_call["arguments"], "timelimit")
+        early_searches[index] = {
+            "query": query,
+            "timelimit": timelimit,
+            "task": asyncio.create_task(self.search_tool.execute(query, timelimit=timelimit))
+        }
+        logger.info(f"Started medical_search early for query: {query}")
+        return True
+
+    async def _run_tool_call(
+        self,
+        tool_call: Dict[str, str],
+        early_search: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute one tool call with its per-tool timeout.
+        
+        Never raises: failures and timeouts are turned into tool message content
+        so the model can still answer with whatever the other tools returned.
+        An early-started search is reused when its arguments match the final ones.
+        """
+        function_name = tool_call["name"]
+        outcome = {
+            "tool_call_id": tool_call["id"],
+            "name": function_name,
+            "status": "completed",
+            "content": "",
+            "sources": [],
+            "search_cache": None
+        }
+        
+        try:
+            args = json.loads(tool_call["arguments"] or "{}")
+            if (
+                early_search is not None
+                and early_search["query"] == args.get("query")
+                and early_search["timelimit"] == args.get("timelimit")
+            ):
+                execution = early_search["task"]
+            else:
+                if early_search is not None:
+                    early_search["task"].cancel()
+                execution = self._execute_tool(function_name, args)
+            exec_result = await asyncio.wait_for(
+                execution,
+                timeout=TOOL_TIMEOUTS.get(function_name, DEFAULT_TOOL_TIMEOUT)
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Tool {function_name} timed out")
+            outcome["status"] = "timeout"
+            outcome["content"] = f"Error: {function_name} timed out"
+            return outcome
+        except Exception as e:
+            logger.error(f"Tool {function_name} failed: {str(e)}")
+            outcome["status"] = "failed"
+            outcome["content"] = f"Error running {function_name}: {str(e)}"
+            return outcome
+        
+        if exec_result.success:
+            outcome["content"] = json.dumps(exec_result.data)
+            if function_name == "medical_search":
+                outcome["sources"] = exec_result.sources
+                outcome["search_cache"] = exec_result.metadata.get("cache")
+        else:
+            outcome["status"] = "failed"
+            if function_name == "medical_search":
+                outcome["content"] = f"Error searching: {exec_result.error}"
+            else:
+                outcome["content"] = f"Error checking symptoms: {exec_result.error}"
+        
+        return outcome
+
+    @staticmethod
+    def _has_timelimit(tool_call: Dict[str, Any]) -> bool:
+        """Whether a tool call restricts its search to recent results (news answers are not cached)"""
+        try:
+            args = json.loads(tool_call["arguments"] or "{}")
+        except json.JSONDecodeError:
+            return False  # The call itself fails, which already disables caching
+        return isinstance(args, dict) and bool(args.get("timelimit"))
+
+    def _classified_tool_path(self, user_message: str) -> Optional[str]:
+        """
+        Tool path of a standalone question known before the gatekeeper runs.
+        
+        Returns:
+            The local classifier's intent when it is confident, else None (the
+            answer cache is then consulted once the gatekeeper has decided)
+        """
+        classifier = self.decision_maker.local_classifier
+        if classifier is not None:
+            intent, confidence = classifier.predict(user_message)
+            if confidence >= settings.INTENT_CLASSIFIER_THRESHOLD:
+                return intent
+        return None
+
+    async def _replay_cached_answer(
+        self,
+        cached: Dict[str, Any],
+        costs: Optional[CostTracker] = None
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Replay a cached answer through the same metadata/content/done events
+        
+        Args:
+            cached: Answer cache entry
+            costs: Tracker of the request so far (e.g. the gatekeeper call)
+        """
+        costs = costs or CostTracker()
+        costs.add_step("Answer Cache (Replay)", cost=0.0, input_tokens=0, output_tokens=0)
+        
+        yield {
+            "type": "metadata",
+            "data": {
+                "decision": cached["tool_path"],
+                "decision_reason": "Answer cache",
+                "decision_confidence": cached["decision"].get("confidence", 1.0),
+                "decision_source": "cache",
+                "cache_hit": True
             }
-        ]
+        }
+        for tool_name in cached["tools_used"]:
+            yield {"type": "metadata", "data": {"tool_used": tool_name, "status": "completed"}}
+        if cached["sources"]:
+            yield {"type": "metadata", "data": {"sources": cached["sources"]}}
+        
+        content = cached["content"]
+        for start in range(0, len(content), CACHE_REPLAY_CHUNK_CHARS):
+            yield {"type": "content", "data": content[start:start + CACHE_REPLAY_CHUNK_CHARS]}
+        
+        yield {
+            "type": "done",
+            "data": {
+                "tokens_used": len(content.split()),
+                **costs.summary(),
+                "cache_hit": True
+            }
+        }
 
     async def process_message(
         self,
         user_message: str,
         conversation_history: List[Dict[str, str]] = None,
-        attachments: Optional[List[Dict[str, Any]]] = None
+        attachments: Optional[List[Dict[str, Any]]] = None,
+        conversation_summary: Optional[str] = None,
+        recalled_messages: Optional[List[Dict[str, str]]] = None
     ) -> AsyncGenerator[Dict, None]:
         conversation_history = conversation_history or []
         
         # Initialize cost tracking for this request
-        request_costs = []  # Will store {"step": "name", "cost": 0.00, "tokens": 100, "input_tokens": X, "output_tokens": Y}
-        total_request_cost = 0.0
-        total_input_tokens = 0
-        total_output_tokens = 0
+        costs = CostTracker()
         
         # Process file attachments if any
         enriched_message = user_message
@@ -121,276 +449,256 @@ class MedicalChatAgent:
             yield {"type": "done", "data": {"tokens_used": 0}}
             return
 
-        # 2. Build Messages with Smart Memory Management
-        memory = get_conversation_memory(window_size=30)
-        
-        # Process conversation history with sliding window + summarization
-        messages = await memory.process_conversation_history(
-            conversation_history=conversation_history,
-            system_prompt=get_system_prompt()
+        # 2. Answer cache: standalone repeated questions skip the whole pipeline.
+        # Entries are keyed on the tool path, so the lookup waits for the path to
+        # be known: from a confident local classifier here, else from the gatekeeper
+        answer_cache = get_answer_cache() if settings.ANSWER_CACHE_ENABLED else None
+        cacheable = (
+            answer_cache is not None
+            and not conversation_summary
+            and not recalled_messages
+            and AnswerCache.is_cacheable(conversation_history, attachments)
         )
+        classified_path = self._classified_tool_path(user_message) if cacheable else None
+        if classified_path is not None:
+            cached = answer_cache.get(user_message, (classified_path,))
+            if cached is not None:
+                logger.info(f"Answer cache hit ({cached['tool_path']})")
+                async for event in self._replay_cached_answer(cached):
+                    yield event
+                return
+
+        # 3. Request pipeline: memory/summary preparation and the DecisionMaker
+        # gatekeeper don't depend on each other, so both run concurrently
+        memory = get_conversation_memory(
+            window_size=settings.CONVERSATION_WINDOW_SIZE, token_budget=settings.CONTEXT_TOKEN_BUDGET
+        )
+        
+        try:
+            stage_results, stage_latency_ms = await run_pipeline_stages({
+                # Process conversation history with sliding window + summarization
+                "memory": memory.process_conversation_history(
+                    conversation_history=conversation_history,
+                    system_prompt=self.system_prompt,
+                    summary=conversation_summary,
+                    recalled=recalled_messages
+                ),
+                # TOKEN OPTIMIZATION: Use DecisionMaker as Gatekeeper
+                # Instead of always sending tools schema, first check if tools are actually needed
+                "decision": self.decision_maker.decide_action(
+                    user_message=enriched_message,
+                    conversation_history=conversation_history
+                )
+            })
+            messages = stage_results["memory"]
+            decision = stage_results["decision"]
+        except Exception as e:
+            # A failed stage must not lose the answer: fall back to the raw recent
+            # history and the tool-enabled path (the safe default for medical queries)
+            logger.error(f"Request pipeline failed, using raw history: {str(e)}")
+            messages = [{"role": "system", "content": self.system_prompt}]
+            if conversation_summary:
+                messages.append(build_summary_message(conversation_summary))
+            messages.extend(chat_message(msg) for msg in conversation_history[memory.window_start(conversation_history):])
+            decision = {
+                "intent": "requires_tools",
+                "reason": "Request pipeline failed, defaulting to tool-enabled mode for safety",
+                "confidence": 0.5,
+                "source": "fallback"
+            }
+            stage_latency_ms = {}
+        
+        # Tokens of the verbatim history, from the counts stored at write time
+        history_tokens = memory.history_tokens(conversation_history[memory.window_start(conversation_history):])
         
         # Add current user message
         messages.append({"role": "user", "content": enriched_message})
 
-        # 3. TOKEN OPTIMIZATION: Use DecisionMaker as Gatekeeper
-        # Instead of always sending tools schema, first check if tools are actually needed
-        decision = await self.decision_maker.decide_action(
-            user_message=enriched_message,
-            conversation_history=conversation_history
-        )
-        
         # Track Decision Maker cost
-        decision_cost = decision.get("cost", 0.0)
-        decision_input_tokens = decision.get("input_tokens", 0)
-        decision_output_tokens = decision.get("output_tokens", 0)
-        
-        if decision_cost > 0:
-            request_costs.append({
-                "step": "Decision Maker (Gatekeeper)",
-                "cost": decision_cost,
-                "tokens": decision_input_tokens + decision_output_tokens,
-                "input_tokens": decision_input_tokens,
-                "output_tokens": decision_output_tokens
-            })
-            total_request_cost += decision_cost
-            total_input_tokens += decision_input_tokens
-            total_output_tokens += decision_output_tokens
+        if decision.get("cost", 0.0) > 0:
+            costs.add_step(
+                "Decision Maker (Gatekeeper)",
+                cost=decision["cost"],
+                input_tokens=decision.get("input_tokens", 0),
+                output_tokens=decision.get("output_tokens", 0),
+                cached_tokens=decision.get("cached_tokens", 0)
+            )
         
         logger.info(f"DecisionMaker intent: {decision.get('intent')} - {decision.get('reason')}")
+        
+        # Answer cache lookup deferred until the gatekeeper picked the tool path
+        # (a repeated question is usually a free gatekeeper memo hit)
+        if cacheable and classified_path is None and decision.get("source") != "fallback":
+            cached = answer_cache.get(user_message, (decision.get("intent"),))
+            if cached is not None:
+                logger.info(f"Answer cache hit ({cached['tool_path']})")
+                async for event in self._replay_cached_answer(cached, costs):
+                    yield event
+                return
+        
         yield {
             "type": "metadata", 
             "data": {
                 "decision": decision.get('intent'),
                 "decision_reason": decision.get('reason'),
-                "decision_confidence": decision.get('confidence', 0.0)
+                "decision_confidence": decision.get('confidence', 0.0),
+                "decision_source": decision.get('source')
             }
         }
 
         # 4. Agent Loop - Conditional Tool Schema Passing
+        full_content = []
+        all_sources = []
+        tools_used = []
+        search_cache = []  # hit / stale / miss per medical_search call
+        # Tool failures and time-limited (news) searches make an answer unsuitable for caching
+        cache_answer = cacheable
+        # Upstream completion streams opened for this request (closed on exit or cancellation)
+        streams = []
         try:
             # PATH 1: DIRECT ANSWER (No Tools Needed) - Saves input tokens!
             if decision.get('intent') == 'direct_answer':
                 logger.info("Direct answer path - NO tools schema sent")
                 
                 # Call OpenAI WITHOUT tools parameter (major cost savings)
-                stream = await client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    stream=True,
-                    stream_options={"include_usage": True}
-                    # NOTE: No 'tools' parameter = saves input tokens
-                )
+                stream = await self._open_stream(messages)
+                streams.append(stream)
+                async for event in stream.events():
+                    if event["type"] == "content":
+                        full_content.append(event["data"])
+                        yield event
+                costs.add_usage("Agent Direct (No Tools - Optimized)", stream.usage)
+            
+            else:
+                # PATH 2: REQUIRES TOOLS (Medical Query) - Use full schema
+                logger.info("Tool-enabled path - tools schema included")
                 
-                full_content = ""
-                async for chunk in stream:
-                    if not chunk.choices:
-                        # Handle usage chunk at the end
-                        if hasattr(chunk, 'usage') and chunk.usage:
-                            step_cost = log_ai_cost(
-                                model="gpt-4o-mini",
-                                input_tokens=chunk.usage.prompt_tokens,
-                                output_tokens=chunk.usage.completion_tokens,
-                                context="Agent Direct (No Tools - Optimized)"
-                            )
-                            # Track cost for this step
-                            request_costs.append({
-                                "step": "Agent Direct (No Tools - Optimized)",
-                                "cost": step_cost,
-                                "tokens": chunk.usage.prompt_tokens + chunk.usage.completion_tokens,
-                                "input_tokens": chunk.usage.prompt_tokens,
-                                "output_tokens": chunk.usage.completion_tokens
-                            })
-                            total_request_cost += step_cost
-                            total_input_tokens += chunk.usage.prompt_tokens
-                            total_output_tokens += chunk.usage.completion_tokens
-                        continue
-                    content = chunk.choices[0].delta.content
-                    if content:
-                        full_content += content
-                        yield {"type": "content", "data": content}
+                # Step A: One streamed call WITH tools. Text deltas are forwarded
+                # straight away; tool_calls deltas are accumulated from the same stream
+                # and medical_search starts as soon as its query argument is complete
+                early_searches = {}
+                stream = await self._open_stream(messages, tools=self.tools_schema)
+                streams.append(stream)
+                try:
+                    async for event in stream.events():
+                        if event["type"] == "content":
+                            full_content.append(event["data"])
+                            yield event
+                        elif event["type"] == "tool_call_delta":
+                            index = event["data"]["index"]
+                            if index not in early_searches and self._start_early_search(stream.tool_calls[index], index, early_searches):
+                                yield {"type": "metadata", "data": {"tool_used": "medical_search", "status": "executing"}}
+                except BaseException:
+                    for early in early_searches.values():
+                        early["task"].cancel()
+                    raise
+                costs.add_usage("Agent Initial (With Tools)", stream.usage)
                 
-                # Send final metadata with cost tracking
-                yield {
-                    "type": "done", 
-                    "data": {
-                        "tokens_used": len(full_content.split()),
-                        "total_cost": total_request_cost,
-                        "total_input_tokens": total_input_tokens,
-                        "total_output_tokens": total_output_tokens,
-                        "cost_breakdown": request_costs
-                    }
-                }
-                return
-            
-            # PATH 2: REQUIRES TOOLS (Medical Query) - Use full schema
-            logger.info("Tool-enabled path - tools schema included")
-            
-            # Step A: Initial Call WITH tools to see if they're needed
-            response = await client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                tools=self.tools_schema,
-                tool_choice="auto"
-            )
-            
-            # Log initial call cost
-            if response.usage:
-                step_cost = log_ai_cost(
-                    model="gpt-4o-mini",
-                    input_tokens=response.usage.prompt_tokens,
-                    output_tokens=response.usage.completion_tokens,
-                    context="Agent Initial (With Tools)"
-                )
-                # Track cost
-                request_costs.append({
-                    "step": "Agent Initial (With Tools)",
-                    "cost": step_cost,
-                    "tokens": response.usage.prompt_tokens + response.usage.completion_tokens,
-                    "input_tokens": response.usage.prompt_tokens,
-                    "output_tokens": response.usage.completion_tokens
-                })
-                total_request_cost += step_cost
-                total_input_tokens += response.usage.prompt_tokens
-                total_output_tokens += response.usage.completion_tokens
-            
-            
-            message = response.choices[0].message
-            tool_calls = message.tool_calls
-
-            if tool_calls:
-                messages.append(message)
-                for tool_call in tool_calls:
-                    function_name = tool_call.function.name
-                    args = json.loads(tool_call.function.arguments)
+                tool_calls = stream.get_tool_calls()
+                if tool_calls:
+                    messages.append(stream.assistant_message())
+                    if any(self._has_timelimit(tool_call) for tool_call in tool_calls):
+                        cache_answer = False
+                    for index, tool_call in enumerate(tool_calls):
+                        if index not in early_searches:
+                            yield {"type": "metadata", "data": {"tool_used": tool_call["name"], "status": "executing"}}
                     
-                    yield {"type": "metadata", "data": {"tool_used": function_name, "status": "executing"}}
+                    # Execute all tool calls concurrently; report each one as it finishes
+                    tool_tasks = [
+                        asyncio.create_task(self._run_tool_call(tool_call, early_searches.get(index)))
+                        for index, tool_call in enumerate(tool_calls)
+                    ]
+                    try:
+                        for finished in asyncio.as_completed(tool_tasks):
+                            outcome = await finished
+                            yield {"type": "metadata", "data": {"tool_used": outcome["name"], "status": outcome["status"]}}
+                            if outcome["status"] != "completed":
+                                cache_answer = False
+                            tools_used.append(outcome["name"])
+                            if outcome["search_cache"]:
+                                search_cache.append(outcome["search_cache"])
+                            if outcome["sources"]:
+                                all_sources.extend(outcome["sources"])
+                                yield {"type": "metadata", "data": {"sources": outcome["sources"]}}
+                    finally:
+                        for task in tool_tasks:
+                            if not task.done():
+                                task.cancel()
+                        for early in early_searches.values():
+                            early["task"].cancel()
                     
-                    # Execute Tools
-                    tool_result = ""
-                    if function_name == "medical_search":
-                        exec_result = await self.search_tool.execute(
-                            args.get("query"), 
-                            timelimit=args.get("timelimit")
-                        )
-                        if exec_result.success:
-                            tool_result = json.dumps(exec_result.data)
-                            yield {"type": "metadata", "data": {"sources": exec_result.sources}}
-                        else:
-                            tool_result = f"Error searching: {exec_result.error}"
-                            
-                    elif function_name == "check_symptoms":
-                        exec_result = await self.symptom_checker.execute(**args)
-                        if exec_result.success:
-                            tool_result = json.dumps(exec_result.data)
-                        else:
-                            tool_result = f"Error checking symptoms: {exec_result.error}"
-
-                    messages.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": function_name,
-                        "content": tool_result,
-                    })
-
-                # Step B: Final Generation after tool results
-                stream = await client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    stream=True,
-                    stream_options={"include_usage": True}
-                )
-                
-                full_content = ""
-                async for chunk in stream:
-                    if not chunk.choices:
-                        # Handle usage chunk at the end
-                        if hasattr(chunk, 'usage') and chunk.usage:
-                            step_cost = log_ai_cost(
-                                model="gpt-4o-mini",
-                                input_tokens=chunk.usage.prompt_tokens,
-                                output_tokens=chunk.usage.completion_tokens,
-                                context="Agent Final (Streamed)"
-                            )
-                            # Track cost
-                            request_costs.append({
-                                "step": "Agent Final (Streamed)",
-                                "cost": step_cost,
-                                "tokens": chunk.usage.prompt_tokens + chunk.usage.completion_tokens,
-                                "input_tokens": chunk.usage.prompt_tokens,
-                                "output_tokens": chunk.usage.completion_tokens
-                            })
-                            total_request_cost += step_cost
-                            total_input_tokens += chunk.usage.prompt_tokens
-                            total_output_tokens += chunk.usage.completion_tokens
-                        continue
-                    content = chunk.choices[0].delta.content
-                    if content:
-                        full_content += content
-                        yield {"type": "content", "data": content}
-                
-                # Send final metadata with complete cost tracking
-                yield {
-                    "type": "done", 
-                    "data": {
-                        "tokens_used": len(full_content.split()),
-                        "total_cost": total_request_cost,
-                        "total_input_tokens": total_input_tokens,
-                        "total_output_tokens": total_output_tokens,
-                        "cost_breakdown": request_costs
-                    }
-                }
+                    # Tool messages must follow the assistant message in tool_calls order
+                    for task in tool_tasks:
+                        outcome = task.result()
+                        messages.append({
+                            "tool_call_id": outcome["tool_call_id"],
+                            "role": "tool",
+                            "name": outcome["name"],
+                            "content": outcome["content"],
+                        })
+                    
+                    # Step B: Final Generation after tool results (only when a tool was invoked)
+                    stream = await self._open_stream(messages)
+                    streams.append(stream)
+                    async for event in stream.events():
+                        if event["type"] == "content":
+                            full_content.append(event["data"])
+                            yield event
+                    costs.add_usage("Agent Final (Streamed)", stream.usage)
             
-            else:
-                # Direct response (no tools needed)
-                # Re-run with stream for direct speed
-                stream = await client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    stream=True,
-                    stream_options={"include_usage": True}
+            answer = "".join(full_content)
+            # Real prompt size of the first completion, reported against the history budget
+            prompt_tokens = streams[0].usage.prompt_tokens if streams and streams[0].usage else None
+            logger.info(
+                f"Context: history {history_tokens}/{settings.CONTEXT_TOKEN_BUDGET} tokens, "
+                f"prompt_tokens {prompt_tokens}"
+            )
+            if cache_answer:
+                answer_cache.put(
+                    user_message,
+                    "direct_answer" if decision.get("intent") == "direct_answer" else "requires_tools",
+                    answer,
+                    sources=all_sources,
+                    tools_used=tools_used,
+                    decision={"confidence": decision.get("confidence", 0.0)}
                 )
-                full_content = ""
-                async for chunk in stream:
-                    if not chunk.choices:
-                        # Handle usage chunk at the end
-                        if hasattr(chunk, 'usage') and chunk.usage:
-                            step_cost = log_ai_cost(
-                                model="gpt-4o-mini",
-                                input_tokens=chunk.usage.prompt_tokens,
-                                output_tokens=chunk.usage.completion_tokens,
-                                context="Agent Direct (Streamed)"
-                            )
-                            # Track cost
-                            request_costs.append({
-                                "step": "Agent Direct (Streamed)",
-                                "cost": step_cost,
-                                "tokens": chunk.usage.prompt_tokens + chunk.usage.completion_tokens,
-                                "input_tokens": chunk.usage.prompt_tokens,
-                                "output_tokens": chunk.usage.completion_tokens
-                            })
-                            total_request_cost += step_cost
-                            total_input_tokens += chunk.usage.prompt_tokens
-                            total_output_tokens += chunk.usage.completion_tokens
-                        continue
-                    content = chunk.choices[0].delta.content
-                    if content:
-                        full_content += content
-                        yield {"type": "content", "data": content}
-                
-                # Send final metadata with complete cost tracking
-                yield {
-                    "type": "done", 
-                    "data": {
-                        "tokens_used": len(full_content.split()),
-                        "total_cost": total_request_cost,
-                        "total_input_tokens": total_input_tokens,
-                        "total_output_tokens": total_output_tokens,
-                        "cost_breakdown": request_costs
-                    }
+            
+            # Send final metadata with complete cost tracking
+            yield {
+                "type": "done", 
+                "data": {
+                    "tokens_used": len(answer.split()),
+                    **costs.summary(),
+                    "stage_latency_ms": stage_latency_ms,
+                    "context_tokens": {
+                        "history": history_tokens,
+                        "recalled": memory.history_tokens(recalled_messages or []),
+                        "budget": settings.CONTEXT_TOKEN_BUDGET,
+                        "prompt": prompt_tokens
+                    },
+                    "search_cache": search_cache,
+                    "cache_hit": False
                 }
+            }
 
         except Exception as e:
             logger.error(f"Agent error: {str(e)}")
             yield {"type": "content", "data": f"I apologize, an error occurred: {str(e)}. Please try again later."}
             yield {"type": "done", "data": {"error": str(e)}}
+        
+        finally:
+            # On client disconnect the generator is cancelled mid-stream: close the
+            # upstream response so OpenAI stops generating tokens nobody will read
+            for stream in streams:
+                await asyncio.shield(stream.aclose())
+
+
+# Shared instance, created and warmed at application startup
+_agent_instance = None
+
+def get_agent() -> MedicalChatAgent:
+    """Get or create the shared agent singleton"""
+    global _agent_instance
+    if _agent_instance is None:
+        _agent_instance = MedicalChatAgent()
+    return _agent_instance
@@ -1,45 +1,22 @@
 """Decision maker for agent actions"""
 from typing import Dict, List, Optional
+from collections import OrderedDict
+import hashlib
 import json
 import logging
-from app.utils.cost_calculator import log_ai_cost
-from openai import AsyncOpenAI
+from app.utils.cost_calculator import log_ai_cost, cached_prompt_tokens
 from app.config import settings
+from app.core.clients import get_openai_client
+from app.agent.intent_classifier import get_intent_classifier
+from app.utils.text_normalizer import normalize_text
 
 
 logger = logging.getLogger(__name__)
 
-class DecisionMaker:
-    """Decides which action the agent should take using LLM"""
-    
-    def __init__(self):
-        # Initialize OpenAI client with key from settings
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-    
-    async def decide_action(
-        self,
-        user_message: str,
-        conversation_history: List[Dict[str, str]] = None
-    ) -> Dict[str, any]:
-        """
-        Decide what action to take based on user message using LLM.
-        Returns intent classification: requires_tools (medical query) or direct_answer (greeting/simple chat)
-        """
-        conversation_history = conversation_history or []
-        
-        # Convert history to string for prompt
-        history_str = ""
-        for msg in conversation_history[-10:]: # Last 10 messages for context
-            history_str += f"{msg.get('role', 'user')}: {msg.get('content', '')}\n"
-        
-        # Enhanced prompt for gatekeeper pattern
-        prompt = f"""You are a decision maker for a medical AI chatbot. Analyze the user's message and determine if it requires medical tools/search or can be answered directly.
-
-**Conversation History:**
-{history_str if history_str else "No previous messages"}
-
-**User Message:**
-{user_message}
+# Static gatekeeper instructions. Kept byte-identical across requests (and placed
+# before the dynamic history) so OpenAI prompt prefix caching can apply.
+GATEKEEPER_SYSTEM_PROMPT = """You are a decision maker for a medical AI chatbot. Output valid JSON.
+Analyze the user's message and determine if it requires medical tools/search or can be answered directly.
 
 **Classify the intent:**
 
@@ -55,18 +32,134 @@ class DecisionMaker:
 - "What are the side effects of aspirin?" → requires_tools
 
 Respond in strict JSON format:
-{{
+{
   "intent": "requires_tools" or "direct_answer",
   "reason": "brief explanation",
   "confidence": 0.0-1.0
-}}"""
+}"""
+
+# Compact conversation view sent to the gatekeeper instead of verbatim history
+GATEKEEPER_USER_TURNS = 3  # Most recent user messages included
+GATEKEEPER_TURN_CHARS = 200  # Each truncated to this many characters
+GATEKEEPER_INTENT_LABELS = 5  # Intents of the most recent earlier turns
+
+
+def compact_history_view(conversation_history: List[Dict[str, str]]) -> str:
+    """
+    Compact view of the conversation for the gatekeeper
+    
+    Assistant answers (long, cited) are left out: the last few user turns,
+    truncated, plus the intents chosen for earlier turns (stored in the
+    assistant message metadata) carry enough context to classify a follow-up.
+    
+    Args:
+        conversation_history: Message dicts; assistant entries may carry "intent"
+        
+    Returns:
+        View text ("" for a new conversation)
+    """
+    user_turns = [msg.get("content", "") for msg in conversation_history if msg.get("role") == "user"]
+    intents = [msg["intent"] for msg in conversation_history if msg.get("role") == "assistant" and msg.get("intent")]
+    
+    lines = []
+    for content in user_turns[-GATEKEEPER_USER_TURNS:]:
+        content = " ".join(content.split())
+        if len(content) > GATEKEEPER_TURN_CHARS:
+            content = content[:GATEKEEPER_TURN_CHARS] + "…"
+        lines.append(f"user: {content}")
+    if intents:
+        lines.append(f"earlier intents: {', '.join(intents[-GATEKEEPER_INTENT_LABELS:])}")
+    return "\n".join(lines)
+
+
+class DecisionMaker:
+    """Decides which action the agent should take using LLM"""
+    
+    def __init__(self, memo_max_entries: int = 1024):
+        """
+        Args:
+            memo_max_entries: Size of the LRU memo of gatekeeper decisions
+        """
+        self.local_classifier = get_intent_classifier()
+        self.memo_max_entries = memo_max_entries
+        self._memo: "OrderedDict[str, Dict[str, any]]" = OrderedDict()
+        self.memo_hits = 0
+        self.memo_misses = 0
+    
+    @staticmethod
+    def memo_key(history_view: str, user_message: str) -> str:
+        """Memo key: hash of the compact view plus the normalized message"""
+        raw = f"{history_view}\n|{normalize_text(user_message)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def memo_stats(self) -> Dict[str, any]:
+        """Decision memo counters for monitoring"""
+        lookups = self.memo_hits + self.memo_misses
+        return {
+            "entries": len(self._memo),
+            "hits": self.memo_hits,
+            "misses": self.memo_misses,
+            "hit_rate": round(self.memo_hits / lookups, 4) if lookups else 0.0
+        }
+    
+    async def decide_action(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None
+    ) -> Dict[str, any]:
+        """
+        Decide what action to take based on user message.
+        Returns intent classification: requires_tools (medical query) or direct_answer (greeting/simple chat)
+        
+        The local intent classifier answers first for a new conversation; the LLM
+        gatekeeper is called when the classifier is missing or below the confidence
+        threshold, and for every follow-up. The classifier only sees the current
+        message, and a follow-up such as "and for children?" means nothing on its own.
+        """
+        if self.local_classifier is not None and not conversation_history:
+            local_decision = self.local_classifier.classify(user_message)
+            if local_decision["confidence"] >= settings.INTENT_CLASSIFIER_THRESHOLD:
+                return local_decision
+        
+        return await self.decide_with_llm(user_message, conversation_history)
+    
+    async def decide_with_llm(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]] = None
+    ) -> Dict[str, any]:
+        """Classify the user message with the gpt-4o-mini gatekeeper call (memoized per conversation state)"""
+        conversation_history = conversation_history or []
+        
+        history_view = compact_history_view(conversation_history)
+        key = self.memo_key(history_view, user_message)
+        cached = self._memo.get(key)
+        if cached is not None:
+            self._memo.move_to_end(key)
+            self.memo_hits += 1
+            return {
+                **cached,
+                "source": "llm_memo",
+                "cost": 0.0,
+                "input_tokens": 0,
+                "cached_tokens": 0,
+                "output_tokens": 0
+            }
+        self.memo_misses += 1
+        
+        # Dynamic part of the gatekeeper prompt (goes after the static instructions)
+        prompt = f"""**Conversation History:**
+{history_view if history_view else "No previous messages"}
+
+**User Message:**
+{user_message}"""
         
         try:
             # Call OpenAI with gpt-4o-mini (cheaper and more capable than gpt-3.5-turbo)
-            response = await self.client.chat.completions.create(
+            response = await get_openai_client().chat.completions.create(
                 model="gpt-4o-mini", 
                 messages=[
-                    {"role": "system", "content": "You are a decision maker for a medical chatbot. Output valid JSON."},
+                    {"role": "system", "content": GATEKEEPER_SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0,
@@ -76,14 +169,17 @@ Respond in strict JSON format:
             # Log cost
             decision_cost = 0.0
             decision_input_tokens = 0
+            decision_cached_tokens = 0
             decision_output_tokens = 0
             
             if response.usage:
+                decision_cached_tokens = cached_prompt_tokens(response.usage)
                 decision_cost = log_ai_cost(
                     model="gpt-4o-mini",
                     input_tokens=response.usage.prompt_tokens,
                     output_tokens=response.usage.completion_tokens,
-                    context="Decision Maker (Gatekeeper)"
+                    context="Decision Maker (Gatekeeper)",
+                    cached_tokens=decision_cached_tokens
                 )
                 decision_input_tokens = response.usage.prompt_tokens
                 decision_output_tokens = response.usage.completion_tokens
@@ -98,14 +194,27 @@ Respond in strict JSON format:
                     "intent": "requires_tools", 
                     "reason": "Invalid LLM response", 
                     "confidence": 0.5,
+                    "source": "llm",
                     "cost": decision_cost,
                     "input_tokens": decision_input_tokens,
+                    "cached_tokens": decision_cached_tokens,
                     "output_tokens": decision_output_tokens
                 }
 
+            # Only well-formed LLM decisions are memoized (not fallbacks)
+            self._memo[key] = {
+                "intent": decision["intent"],
+                "reason": decision.get("reason", ""),
+                "confidence": decision.get("confidence", 0.0)
+            }
+            if len(self._memo) > self.memo_max_entries:
+                self._memo.popitem(last=False)
+            
             # Add cost tracking to decision
+            decision["source"] = "llm"
             decision["cost"] = decision_cost
             decision["input_tokens"] = decision_input_tokens
+            decision["cached_tokens"] = decision_cached_tokens
             decision["output_tokens"] = decision_output_tokens
             
             return decision
@@ -117,6 +226,7 @@ Respond in strict JSON format:
                 "intent": "requires_tools",
                 "reason": "Error in decision process, defaulting to tool-enabled mode for safety",
                 "confidence": 0.5,
+                "source": "fallback",
                 "cost": 0.0,
                 "input_tokens": 0,
                 "output_tokens": 0
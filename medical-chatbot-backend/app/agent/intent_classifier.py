@@ -0,0 +1,201 @@
+"""Local intent classifier - zero-latency gatekeeper in front of the LLM DecisionMaker
+
+A logistic regression over hashed Arabic/English character n-grams. Weights are
+stored as a NumPy .npz file built by scripts/train_intent_classifier.py from
+logged LLM decisions. Classification runs in-process in well under 1 ms.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from pathlib import Path
+import logging
+import math
+import zlib
+import numpy as np
+from app.config import settings
+from app.utils.text_normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Labels: index 1 is the positive class of the logistic regression
+INTENT_LABELS = ("direct_answer", "requires_tools")
+
+DEFAULT_NUM_FEATURES = 2 ** 14
+DEFAULT_NGRAM_RANGE = (2, 4)
+# Only the start of very long messages (pasted documents) is featurized
+MAX_FEATURE_CHARS = 300
+
+
+def _sigmoid(z: float) -> float:
+    """Numerically safe logistic function"""
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+class IntentClassifier:
+    """Character n-gram logistic regression for requires_tools / direct_answer"""
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        bias: float,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE
+    ):
+        """
+        Args:
+            weights: Feature weights (length = number of hashed features)
+            bias: Intercept of the logistic regression
+            ngram_range: (min_n, max_n) character n-gram sizes
+        """
+        self.weights = weights.astype(np.float32)
+        self.bias = float(bias)
+        self.ngram_range = tuple(ngram_range)
+        self.num_features = len(self.weights)
+
+    @staticmethod
+    def featurize(
+        text: str,
+        num_features: int = DEFAULT_NUM_FEATURES,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash character n-grams of the normalized text into a sparse vector
+
+        Returns:
+            (feature indices, L2-normalized values)
+        """
+        normalized = normalize_text(text)[:MAX_FEATURE_CHARS]
+        padded = f" {normalized} "
+
+        counts: Dict[int, float] = {}
+        min_n, max_n = ngram_range
+        for n in range(min_n, max_n + 1):
+            for i in range(len(padded) - n + 1):
+                # crc32 is stable across processes (unlike the salted built-in hash)
+                index = zlib.crc32(padded[i:i + n].encode("utf-8")) % num_features
+                counts[index] = counts.get(index, 0.0) + 1.0
+
+        if not counts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        values /= np.linalg.norm(values)
+        return indices, values
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that the message requires tools"""
+        indices, values = self.featurize(text, self.num_features, self.ngram_range)
+        z = float(np.dot(self.weights[indices], values)) + self.bias
+        return _sigmoid(z)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Classify a message
+
+        Returns:
+            (intent label, confidence in [0.5, 1.0])
+        """
+        p = self.predict_proba(text)
+        if p >= 0.5:
+            return INTENT_LABELS[1], p
+        return INTENT_LABELS[0], 1.0 - p
+
+    def classify(self, text: str) -> Dict[str, any]:
+        """Classify a message into a decision dict shaped like DecisionMaker's output"""
+        intent, confidence = self.predict(text)
+        return {
+            "intent": intent,
+            "reason": "Local intent classifier",
+            "confidence": round(confidence, 4),
+            "source": "local",
+            "cost": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0
+        }
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        intents: Sequence[str],
+        num_features: int = DEFAULT_NUM_FEATURES,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        l2: float = 1e-4,
+        seed: int = 0
+    ) -> "IntentClassifier":
+        """
+        Fit the classifier with SGD on labeled messages
+
+        Args:
+            texts: User messages
+            intents: Matching labels ("requires_tools" or "direct_answer")
+        """
+        features = [cls.featurize(t, num_features, ngram_range) for t in texts]
+        labels = np.array([INTENT_LABELS.index(i) for i in intents], dtype=np.float32)
+
+        weights = np.zeros(num_features, dtype=np.float32)
+        bias = 0.0
+        rng = np.random.default_rng(seed)
+
+        for epoch in range(epochs):
+            lr = learning_rate / (1.0 + epoch * 0.1)
+            for i in rng.permutation(len(features)):
+                indices, values = features[i]
+                z = float(np.dot(weights[indices], values)) + bias
+                gradient = _sigmoid(z) - float(labels[i])
+                weights[indices] -= lr * (gradient * values + l2 * weights[indices])
+                bias -= lr * gradient
+
+        return cls(weights, bias, ngram_range)
+
+    def save(self, path: str) -> None:
+        """Save weights to a compressed .npz file"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            weights=self.weights,
+            bias=np.array([self.bias], dtype=np.float32),
+            ngram_range=np.array(self.ngram_range, dtype=np.int64)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        """Load weights saved by save()"""
+        with np.load(path) as data:
+            return cls(
+                weights=data["weights"],
+                bias=float(data["bias"][0]),
+                ngram_range=tuple(int(n) for n in data["ngram_range"])
+            )
+
+
+def evaluate(classifier: IntentClassifier, texts: List[str], intents: List[str]) -> float:
+    """Accuracy of the classifier on labeled messages"""
+    if not texts:
+        return 0.0
+    correct = sum(1 for t, i in zip(texts, intents) if classifier.predict(t)[0] == i)
+    return correct / len(texts)
+
+
+# Singleton instance (None when no trained model is available)
+_classifier_instance = None
+_classifier_loaded = False
+
+def get_intent_classifier() -> Optional[IntentClassifier]:
+    """Load the trained classifier once; returns None if no model file exists"""
+    global _classifier_instance, _classifier_loaded
+    if not _classifier_loaded:
+        _classifier_loaded = True
+        path = settings.INTENT_CLASSIFIER_PATH
+        if path and Path(path).exists():
+            try:
+                _classifier_instance = IntentClassifier.load(path)
+                logger.info(f"Local intent classifier loaded from {path}")
+            except Exception as e:
+                logger.error(f"Failed to load intent classifier from {path}: {str(e)}")
+        else:
+            logger.info("No local intent classifier model found, using LLM gatekeeper only")
+    return _classifier_instance
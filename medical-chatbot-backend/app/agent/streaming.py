@@ -1,109 +1,210 @@
-"""OpenAI streaming wrapper"""
-from typing import AsyncGenerator, List, Dict
+"""OpenAI streaming helpers"""
+from typing import AsyncGenerator, List, Dict, Optional
 import json
-from openai import AsyncOpenAI
-from app.config import settings
-from app.utils.errors import OpenAIException
+import logging
 
+logger = logging.getLogger(__name__)
 
-class StreamingClient:
-    """Wrapper for OpenAI streaming API"""
+
+def _skip_whitespace(text: str, i: int) -> int:
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return i
+
+
+def _string_end(text: str, start: int) -> Optional[int]:
+    """Index of the closing quote of the JSON string starting at start, or None if incomplete"""
+    i = start + 1
+    while i < len(text):
+        if text[i] == "\\":
+            i += 2
+            continue
+        if text[i] == '"':
+            return i
+        i += 1
+    return None
+
+
+def _value_end(text: str, start: int) -> Optional[int]:
+    """Index just past the non-string JSON value starting at start, or None if incomplete"""
+    depth = 0
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            end = _string_end(text, i)
+            if end is None:
+                return None
+            i = end + 1
+            continue
+        if char in "[{":
+            depth += 1
+        elif char in "]}":
+            if depth == 0:
+                return i
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        elif char == "," and depth == 0:
+            return i
+        i += 1
+    return None
+
+
+def find_complete_string_argument(arguments: str, key: str) -> Optional[str]:
+    """
+    Read a top-level string argument from a possibly incomplete JSON object
     
-    def __init__(self):
-        # تحقق من وجود مفتاح OpenAI - Check if OpenAI key exists
-        if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY.startswith("sk-your"):
-            raise OpenAIException(
-                message="OpenAI API key is missing or not configured. Please set OPENAI_API_KEY in .env file.",
-                details={"error": "OPENAI_KEY_NOT_CONFIGURED"}
-            )
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    Used while tool_calls arguments are still streaming: returns the decoded
+    value as soon as its closing quote has arrived, or None while it is
+    incomplete, absent, not a string, or the JSON so far is invalid.
     
-    async def stream_chat(
-        self,
-        messages: List[Dict[str, str]],
-        system_prompt: str = None
-    ) -> AsyncGenerator[str, None]:
-        """
-        Stream chat completion from OpenAI
+    Args:
+        arguments: Arguments JSON received so far, e.g. '{"query": "diabetes sy'
+        key: Top-level key to look for
+    """
+    try:
+        i = _skip_whitespace(arguments, 0)
+        if i >= len(arguments) or arguments[i] != "{":
+            return None
+        i += 1
         
-        Args:
-            messages: List of message dicts with 'role' and 'content'
-            system_prompt: Optional system prompt to prepend
-        
-        Yields:
-            Content chunks as they arrive
-        """
-        try:
-            # Prepare messages
-            full_messages = []
+        while True:
+            i = _skip_whitespace(arguments, i)
+            if i >= len(arguments) or arguments[i] == "}":
+                return None
+            if arguments[i] == ",":
+                i += 1
+                continue
+            if arguments[i] != '"':
+                return None
             
-            if system_prompt:
-                full_messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
+            name_end = _string_end(arguments, i)
+            if name_end is None:
+                return None
+            name = json.loads(arguments[i:name_end + 1])
             
-            full_messages.extend(messages)
+            i = _skip_whitespace(arguments, name_end + 1)
+            if i >= len(arguments) or arguments[i] != ":":
+                return None
+            i = _skip_whitespace(arguments, i + 1)
+            if i >= len(arguments):
+                return None
             
-            # Create streaming completion
-            stream = await self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=full_messages,
-                stream=True,
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            # Stream chunks
-            async for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-        
-        except Exception as e:
-            raise OpenAIException(
-                message=f"OpenAI streaming failed: {str(e)}",
-                details={"error": str(e)}
-            )
+            if arguments[i] == '"':
+                value_end = _string_end(arguments, i)
+                if value_end is None:
+                    return None
+                if name == key:
+                    return json.loads(arguments[i:value_end + 1])
+                i = value_end + 1
+            else:
+                value_end = _value_end(arguments, i)
+                if value_end is None:
+                    return None
+                i = value_end
+    except ValueError:
+        # Malformed escape sequences and similar - wait for the full arguments
+        return None
+
+
+class ToolAwareStream:
+    """
+    Consume one streamed chat completion that may contain text deltas,
+    tool_calls deltas, or both.
+    
+    Text deltas are yielded as soon as they arrive; tool call fragments are
+    accumulated by index so the complete calls are available once the stream
+    ends. A second completion is only needed when tool_calls is non-empty.
+    """
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.content_parts: List[str] = []
+        self.tool_calls: Dict[int, Dict[str, str]] = {}
+        self.finish_reason = None
+        self.usage = None
     
-    async def chat_completion(
-        self,
-        messages: List[Dict[str, str]],
-        system_prompt: str = None
-    ) -> str:
+    async def events(self) -> AsyncGenerator[Dict, None]:
         """
-        Get non-streaming chat completion
+        Iterate the underlying stream
         
-        Args:
-            messages: List of message dicts
-            system_prompt: Optional system prompt
-        
-        Returns:
-            Complete response text
+        Yields:
+            {"type": "content", "data": text} for every text delta and
+            {"type": "tool_call_delta", "data": {"index", "id", "name", "arguments"}}
+            for every tool call fragment (arguments holds only the new fragment)
         """
-        try:
-            # Prepare messages
-            full_messages = []
+        async for chunk in self.stream:
+            if getattr(chunk, "usage", None):
+                # Usage arrives on the final chunk (stream_options.include_usage)
+                self.usage = chunk.usage
+            if not chunk.choices:
+                continue
             
-            if system_prompt:
-                full_messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+            if delta is None:
+                continue
             
-            full_messages.extend(messages)
+            if delta.content:
+                self.content_parts.append(delta.content)
+                yield {"type": "content", "data": delta.content}
             
-            # Create completion
-            response = await self.client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=full_messages,
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            return response.choices[0].message.content
-        
+            for tool_delta in delta.tool_calls or []:
+                call = self.tool_calls.setdefault(
+                    tool_delta.index, {"id": "", "name": "", "arguments": ""}
+                )
+                fragment = ""
+                if tool_delta.id:
+                    call["id"] = tool_delta.id
+                if tool_delta.function:
+                    if tool_delta.function.name:
+                        call["name"] += tool_delta.function.name
+                    if tool_delta.function.arguments:
+                        fragment = tool_delta.function.arguments
+                        call["arguments"] += fragment
+                yield {
+                    "type": "tool_call_delta",
+                    "data": {
+                        "index": tool_delta.index,
+                        "id": call["id"],
+                        "name": call["name"],
+                        "arguments": fragment
+                    }
+                }
+    
+    async def aclose(self) -> None:
+        """Close the upstream HTTP response (stops token generation on abort)"""
+        close = getattr(self.stream, "close", None)
+        if close is None:
+            return
+        try:
+            await close()
         except Exception as e:
-            raise OpenAIException(
-                message=f"OpenAI request failed: {str(e)}",
-                details={"error": str(e)}
-            )
+            logger.debug(f"Closing completion stream failed: {str(e)}")
+    
+    @property
+    def content(self) -> str:
+        """Text streamed so far"""
+        return "".join(self.content_parts)
+    
+    def get_tool_calls(self) -> List[Dict[str, str]]:
+        """Completed tool calls in index order"""
+        return [self.tool_calls[index] for index in sorted(self.tool_calls)]
+    
+    def assistant_message(self) -> Dict:
+        """The assistant message to append before the tool result messages"""
+        return {
+            "role": "assistant",
+            "content": self.content or None,
+            "tool_calls": [
+                {
+                    "id": call["id"],
+                    "type": "function",
+                    "function": {"name": call["name"], "arguments": call["arguments"]}
+                }
+                for call in self.get_tool_calls()
+            ]
+        }
@@ -1,7 +1,9 @@
 """Authentication API endpoints"""
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas.user import UserCreate, UserLogin
 from app.schemas.auth import Token, AuthResponse
 from app.schemas.user import UserResponse
@@ -19,7 +21,7 @@ router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 @router.post("/signup", response_model=AuthResponse)
 async def signup(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user
@@ -27,42 +29,43 @@ async def signup(
     If guest_session_id provided, merge guest conversations to user account
     """
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User).where(User.email == user_data.email))
     if existing_user:
         raise AlreadyExistsException("User with this email")
     
     # Create new user
     new_user = User(
         email=user_data.email,
-        hashed_password=hash_password(user_data.password)
+        # bcrypt is deliberately slow: hash off the event loop so open streams keep flowing
+        hashed_password=await asyncio.to_thread(hash_password, user_data.password)
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Merge guest data if guest_session_id provided
     if user_data.guest_session_id:
-        guest_session = db.query(GuestSession).filter(
+        guest_session = await db.scalar(select(GuestSession).where(
             GuestSession.session_id == user_data.guest_session_id
-        ).first()
+        ))
         
         if guest_session:
             # Transfer conversations to user
-            db.query(Conversation).filter(
-                Conversation.guest_session_id == guest_session.id
-            ).update({
-                "user_id": new_user.id,
-                "guest_session_id": None
-            })
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.guest_session_id == guest_session.id)
+                .values(user_id=new_user.id, guest_session_id=None)
+                .execution_options(synchronize_session=False)
+            )
             
             # Transfer usage count
             new_user.questions_used = guest_session.questions_used
             
             # Delete guest session
-            db.delete(guest_session)
-            db.commit()
-            db.refresh(new_user)
+            await db.delete(guest_session)
+            await db.commit()
+            await db.refresh(new_user)
     
     # Create access token
     access_token = create_access_token(new_user.id)
@@ -76,13 +79,13 @@ async def signup(
 @router.post("/login", response_model=AuthResponse)
 async def login(
     credentials: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login with email and password"""
     # Find user
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == credentials.email))
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await asyncio.to_thread(verify_password, credentials.password, user.hashed_password):
         raise UnauthorizedException("Invalid email or password")
     
     # Create access token
@@ -1,18 +1,28 @@
 """Chat API endpoint with streaming support"""
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, Query, Request
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import Optional
-import json
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncGenerator, Optional
+import asyncio
+import time
+import uuid
+from app.config import settings
+from app.database import get_async_db, AsyncSessionLocal
 from app.schemas.chat import ChatRequest
 from app.models.user import User
 from app.models.guest_session import GuestSession
 from app.models.conversation import Conversation
-from app.models.message import Message
 from app.dependencies import get_current_user
-from app.agent.agent import MedicalChatAgent
+from app.agent.agent import get_agent
+from app.services.conversation_memory import get_conversation_memory
+from app.services.summary_worker import get_summary_worker
+from app.services.memory_index import recall_messages
+from app.core.metrics import stream_metrics
+from app.services.stream_buffer import get_stream_store, format_event_id, parse_event_id
+from app.utils.errors import NotFoundException, UnauthorizedException
+from app.utils.sse import SSEFramer, TextBuffer, paced_events, sse_event
 from app.core.plans import check_plan_limit
+from app.core.messages import add_message, load_unsummarized_messages
 from app.core.usage import increment_user_usage, increment_guest_usage, get_or_create_guest_session
 from app.utils.constants import PlanType, PLAN_LIMITS
 
@@ -21,18 +31,156 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+# Generation tasks that outlive their HTTP response (kept referenced until done)
+_producers = set()
+
+
+def stream_owner(current_user: Optional[User], guest_session_id: Optional[str]) -> Optional[str]:
+    """Identity allowed to resume a buffered stream"""
+    if current_user:
+        return f"user:{current_user.id}"
+    if guest_session_id:
+        return f"guest:{guest_session_id}"
+    return None
+
+
+async def save_assistant_message(conversation_id: int, question: str, content: str, meta_data: dict) -> int:
+    """
+    Persist the assistant answer in its own short-lived session.
+    
+    Generation may outlive the request (resumable streams), so it cannot rely on
+    the request-scoped session.
+    
+    Returns:
+        The new message id
+    """
+    async with AsyncSessionLocal() as db:
+        assistant_message = await add_message(db, conversation_id, "assistant", content, meta_data)
+        
+        # Update conversation title if first exchange
+        conversation = await db.get(Conversation, conversation_id)
+        if conversation is not None and not conversation.title:
+            # Use first 50 chars of user message as title
+            conversation.title = question[:50] + ("..." if len(question) > 50 else "")
+        
+        await db.commit()
+        return assistant_message.id
+
+
+def sse_response(frames: AsyncGenerator[bytes, None], stream_id: str) -> StreamingResponse:
+    """Wrap a buffered stream reader in an SSE response"""
+    return StreamingResponse(
+        frames,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable nginx buffering
+            "X-Stream-Id": stream_id
+        }
+    )
+
+
+async def tail_stream(
+    stream_id: str,
+    after_seq: int,
+    http_request: Request,
+    producer: Optional[asyncio.Task] = None
+) -> AsyncGenerator[bytes, None]:
+    """
+    Send buffered frames after `after_seq`, then follow the live stream until it finishes.
+    
+    Every frame carries `id: <stream_id>:<seq>` so the client can resume with
+    Last-Event-ID. The reader heartbeats the stream while it is attached.
+    
+    Args:
+        producer: Generation task of this stream; cancelled as soon as this reader
+            goes away when resumable streams are disabled
+    """
+    store = get_stream_store()
+    last_touch = 0.0
+    try:
+        while True:
+            result = await store.read(stream_id, after_seq)
+            if result is None:
+                yield sse_event({"type": "error", "data": {"error": "Stream is no longer available"}})
+                return
+            
+            frames, finished = result
+            for seq, frame in frames:
+                yield f"id: {format_event_id(stream_id, seq)}\n".encode() + frame
+                after_seq = seq
+            if finished:
+                return
+            if await http_request.is_disconnected():
+                return
+            
+            if time.monotonic() - last_touch >= settings.DISCONNECT_POLL_SECONDS:
+                await store.touch(stream_id)
+                last_touch = time.monotonic()
+            await store.wait(stream_id, after_seq, timeout=settings.DISCONNECT_POLL_SECONDS)
+    finally:
+        # Nobody can reconnect: stop generating for a client that is gone
+        if producer is not None and not settings.STREAM_RESUME_ENABLED and not producer.done():
+            producer.cancel()
+
+
+async def watch_readers(stream_id: str, producer: asyncio.Task) -> None:
+    """
+    Cancel generation once no client has been attached for the grace period.
+    
+    A reconnect within STREAM_RESUME_GRACE_SECONDS keeps the answer going;
+    otherwise the OpenAI stream and tool tasks are cancelled. Without resumable
+    streams the reader cancels the producer itself; this only catches a reader
+    that never heartbeats.
+    """
+    store = get_stream_store()
+    grace = settings.STREAM_RESUME_GRACE_SECONDS if settings.STREAM_RESUME_ENABLED else 2 * settings.DISCONNECT_POLL_SECONDS
+    while not producer.done():
+        await asyncio.sleep(settings.DISCONNECT_POLL_SECONDS)
+        last_seen = await store.last_seen(stream_id)
+        if last_seen is None or time.time() - last_seen > grace:
+            producer.cancel()
+            return
+
+
+async def resume_stream(last_event_id: str, owner: Optional[str], http_request: Request) -> StreamingResponse:
+    """Resume a buffered stream after the given event id (no new question is charged)"""
+    parsed = parse_event_id(last_event_id)
+    if parsed is None:
+        from app.utils.errors import ValidationException
+        raise ValidationException("Invalid Last-Event-ID")
+    
+    stream_id, after_seq = parsed
+    # Unknown and foreign streams look the same to the caller
+    if not settings.STREAM_RESUME_ENABLED or owner is None or await get_stream_store().get_owner(stream_id) != owner:
+        raise NotFoundException("Stream")
+    
+    logger.info(f"Resuming stream {stream_id} after event {after_seq}")
+    return sse_response(tail_stream(stream_id, after_seq, http_request), stream_id)
+
+
 @router.post("/chat")
 async def chat(
     request: ChatRequest,
+    http_request: Request,
     current_user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
 ):
     """
     Chat endpoint with streaming support
     
     Supports both authenticated users and guest sessions.
     Enforces plan limits before calling OpenAI.
+    A request carrying Last-Event-ID resumes that stream instead of asking again.
     """
+    owner = stream_owner(current_user, request.guest_session_id)
+    if last_event_id:
+        # Resuming needs no database work: give the connection back first
+        await db.close()
+        return await resume_stream(last_event_id, owner, http_request)
+    
     # Determine if user or guest
     user_id = None
     guest_session = None
@@ -46,12 +194,11 @@ async def chat(
         plan_type = current_user.plan_type
     elif request.guest_session_id:
         # Guest session
-        guest_session = get_or_create_guest_session(db, request.guest_session_id)
+        guest_session = await get_or_create_guest_session(db, request.guest_session_id)
         questions_used = guest_session.questions_used
         plan_type = PlanType.FREE
     else:
         # No auth and no guest session - error
-        from app.utils.errors import UnauthorizedException
         raise UnauthorizedException("Authentication or guest session ID required")
     
     # Check plan limit BEFORE calling OpenAI
@@ -60,12 +207,9 @@ async def chat(
     # Get or create conversation
     conversation = None
     if request.conversation_id:
-        conversation = db.query(Conversation).filter(
-            Conversation.id == request.conversation_id
-        ).first()
+        conversation = await db.get(Conversation, request.conversation_id)
         
         if not conversation:
-            from app.utils.errors import NotFoundException
             raise NotFoundException("Conversation")
     else:
         # Create new conversation
@@ -74,39 +218,63 @@ async def chat(
             guest_session_id=guest_session.id if guest_session else None
         )
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
+        await db.commit()
+        await db.refresh(conversation)
     
-    # Get conversation history
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation.id
-    ).order_by(Message.created_at).all()
+    # Get conversation history: only the messages after the summary watermark.
+    # The summary worker normally keeps this within the window; if it has not
+    # caught up yet, fall back to truncation instead of summarizing inline
+    memory = get_conversation_memory(
+        window_size=settings.CONVERSATION_WINDOW_SIZE, token_budget=settings.CONTEXT_TOKEN_BUDGET
+    )
+    evicted, recent = memory.split_window(await load_unsummarized_messages(db, conversation))
+    conversation_summary = conversation.summary
+    if evicted:
+        logger.info(f"Summary not ready (ConvID: {conversation.id}): dropping {len(evicted)} older messages from context")
+        get_summary_worker().schedule(conversation.id)
     
+    # Stored token counts travel with the history so the agent never re-tokenizes it;
+    # earlier gatekeeper intents feed its compact view of the conversation
     conversation_history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in messages
+        {
+            "role": msg.role,
+            "content": msg.content,
+            "token_count": msg.token_count,
+            "intent": (msg.meta_data or {}).get("decision")
+        }
+        for msg in recent
     ]
     
+    # Long-term memory: older messages relevant to this question
+    recalled_history = []
+    if settings.LONG_TERM_MEMORY == "retrieval" and conversation.summarized_through_message_id is not None:
+        recalled_history = [
+            {"role": msg.role, "content": msg.content, "token_count": msg.token_count}
+            for msg in await recall_messages(
+                db,
+                conversation.id,
+                request.message,
+                top_k=settings.MEMORY_RECALL_TOP_K,
+                token_budget=settings.MEMORY_RECALL_TOKEN_BUDGET,
+                min_score=settings.MEMORY_RECALL_MIN_SCORE
+            )
+        ]
+    
     # Save user message
-    user_message = Message(
-        conversation_id=conversation.id,
-        role="user",
-        content=request.message
-    )
-    db.add(user_message)
-    db.commit()
+    await add_message(db, conversation.id, "user", request.message)
+    await db.commit()
     
     # Log user input
     logger.info(f"User Input (ConvID: {conversation.id}): {request.message}")
     
     # Increment usage count
     if current_user:
-        increment_user_usage(db, current_user.id)
+        await increment_user_usage(db, current_user.id)
     else:
-        increment_guest_usage(db, guest_session.id)
+        await increment_guest_usage(db, guest_session.id)
     
-    # Process message with agent
-    agent = MedicalChatAgent()
+    # Process message with the shared agent
+    agent = get_agent()
     
     # Convert attachments to dict format if present
     attachments_data = None
@@ -121,92 +289,150 @@ async def chat(
             for att in request.attachments
         ]
     
-    async def event_stream():
-        """Stream events to client"""
-        assistant_message_content = ""
+    conversation_id = conversation.id
+    
+    # All reads and writes needed before streaming are done: return the connection
+    # to the pool now instead of holding it for the whole response. Persistence
+    # in the done handler uses its own short-lived session (save_assistant_message)
+    await db.close()
+    
+    stream_id = uuid.uuid4().hex
+    store = get_stream_store()
+    await store.create(stream_id, owner)
+    
+    async def produce():
+        """Run the agent and write its events into the stream buffer"""
+        # Answer text accumulates in a list-backed buffer; deltas are coalesced into fewer SSE frames
+        answer_buffer = TextBuffer()
+        framer = SSEFramer(window_ms=settings.SSE_COALESCE_MS, max_bytes=settings.SSE_COALESCE_BYTES)
+        content_deltas = 0
         metadata = {}
         
-        # Initialize request-level cost tracking
-        request_total_cost = 0.0
-        request_total_input_tokens = 0
-        request_total_output_tokens = 0
-        request_cost_breakdown = []
+        async def emit(event: dict) -> None:
+            pending = framer.flush()
+            if pending:
+                await store.append(stream_id, pending)
+            await store.append(stream_id, sse_event(event))
         
+        agent_events = agent.process_message(
+            request.message,
+            conversation_history,
+            attachments_data,
+            conversation_summary=conversation_summary,
+            recalled_messages=recalled_history
+        )
         try:
-            async for chunk in agent.process_message(request.message, conversation_history, attachments_data):
-                # Send chunk as Server-Sent Event
-                if chunk["type"] == "content":
-                    assistant_message_content += chunk["data"]
-                    yield f"data: {json.dumps(chunk)}\n\n"
+            async for chunk in paced_events(agent_events, framer):
+                if isinstance(chunk, bytes):
+                    # Coalescing window expired while the agent was silent
+                    await store.append(stream_id, chunk)
+                
+                elif chunk["type"] == "content":
+                    answer_buffer.append(chunk["data"])
+                    content_deltas += 1
+                    frame = framer.content(chunk["data"])
+                    if frame:
+                        await store.append(stream_id, frame)
                 
                 elif chunk["type"] == "metadata":
                     metadata.update(chunk["data"])
-                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await emit(chunk)
                 
                 elif chunk["type"] == "done":
                     metadata.update(chunk["data"])
-                    
-                    # Extract cost data from agent metadata
-                    request_total_cost = chunk["data"].get("total_cost", 0.0)
-                    request_total_input_tokens = chunk["data"].get("total_input_tokens", 0)
-                    request_total_output_tokens = chunk["data"].get("total_output_tokens", 0)
-                    request_cost_breakdown = chunk["data"].get("cost_breakdown", [])
+                    assistant_message_content = answer_buffer.getvalue()
                     
                     # Save assistant message
-                    assistant_message = Message(
-                        conversation_id=conversation.id,
-                        role="assistant",
-                        content=assistant_message_content,
-                        meta_data=metadata
+                    logger.info(f"Assistant Output (ConvID: {conversation_id}): {assistant_message_content[:200]}...") # Log first 200 chars to avoid clutter
+                    message_id = await save_assistant_message(
+                        conversation_id, request.message, assistant_message_content, metadata
                     )
                     
-                    # Log assistant output
-                    logger.info(f"Assistant Output (ConvID: {conversation.id}): {assistant_message_content[:200]}...") # Log first 200 chars to avoid clutter
-                    db.add(assistant_message)
-                    
-                    # Update conversation title if first exchange
-                    if not conversation.title:
-                        # Use first 50 chars of user message as title
-                        conversation.title = request.message[:50] + ("..." if len(request.message) > 50 else "")
-                    
-                    db.commit()
-                    db.refresh(assistant_message)
-                    
                     # Log grand total cost for the entire request
+                    request_total_cost = chunk["data"].get("total_cost", 0.0)
+                    request_total_output_tokens = chunk["data"].get("total_output_tokens", 0)
                     if request_total_cost > 0:
                         from app.utils.cost_calculator import log_grand_total_cost
                         log_grand_total_cost(
                             total_cost=request_total_cost,
-                            total_input_tokens=request_total_input_tokens,
+                            total_input_tokens=chunk["data"].get("total_input_tokens", 0),
                             total_output_tokens=request_total_output_tokens,
-                            step_breakdown=request_cost_breakdown
+                            step_breakdown=chunk["data"].get("cost_breakdown", []),
+                            total_cached_tokens=chunk["data"].get("total_cached_tokens", 0)
                         )
+                    if not chunk["data"].get("cache_hit") and "error" not in chunk["data"]:
+                        stream_metrics.record_completed(request_total_output_tokens)
                     
                     # Send final metadata with IDs
-                    final_chunk = {
+                    await emit({
                         "type": "done",
                         "data": {
                             **chunk["data"],
-                            "conversation_id": conversation.id,
-                            "message_id": assistant_message.id
+                            "conversation_id": conversation_id,
+                            "message_id": message_id,
+                            "stream_id": stream_id
                         }
-                    }
-                    yield f"data: {json.dumps(final_chunk)}\n\n"
+                    })
+                    # Prepare the summary for the next turn once the answer is out
+                    get_summary_worker().schedule(conversation_id)
+
+        except asyncio.CancelledError:
+            # No client attached (within the grace period, if resumable): stop paying for the answer.
+            # Keep the partial answer so the conversation history stays coherent
+            if answer_buffer:
+                await asyncio.shield(save_assistant_message(
+                    conversation_id,
+                    request.message,
+                    answer_buffer.getvalue(),
+                    {**metadata, "truncated": True, "finish_reason": "client_disconnected"}
+                ))
+            saved = stream_metrics.record_aborted(content_deltas)
+            logger.info(
+                f"Client disconnected (ConvID: {conversation_id}) after {content_deltas} deltas; "
+                f"cancelled generation (~{saved} tokens saved)"
+            )
+            # Closes the agent generator if it is still suspended: cancels tool
+            # tasks and closes the upstream OpenAI stream
+            await asyncio.shield(agent_events.aclose())
+            raise
         
         except Exception as e:
             # Send error to client
-            error_chunk = {
-                "type": "error",
-                "data": {"error": str(e)}
-            }
-            yield f"data: {json.dumps(error_chunk)}\n\n"
+            logger.error(f"Chat stream failed (ConvID: {conversation_id}): {str(e)}")
+            await emit({"type": "error", "data": {"error": str(e)}})
+        
+        finally:
+            await asyncio.shield(store.finish(stream_id))
     
-    return StreamingResponse(
-        event_stream(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no"  # Disable nginx buffering
-        }
-    )
+    # Generation is decoupled from the HTTP response: a dropped connection can
+    # reconnect with Last-Event-ID while the answer keeps streaming into the buffer
+    producer = asyncio.create_task(produce())
+    monitor = asyncio.create_task(watch_readers(stream_id, producer))
+    _producers.update((producer, monitor))
+    producer.add_done_callback(_producers.discard)
+    monitor.add_done_callback(_producers.discard)
+    
+    return sse_response(tail_stream(stream_id, 0, http_request, producer), stream_id)
+
+
+@router.get("/chat/streams/{stream_id}")
+async def resume_chat_stream(
+    stream_id: str,
+    http_request: Request,
+    guest_session_id: Optional[str] = Query(None),
+    current_user: Optional[User] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Resume a chat stream (EventSource-style reconnect)
+    
+    Replays frames after Last-Event-ID (or from the start) and follows the
+    stream until it finishes.
+    """
+    owner = stream_owner(current_user, guest_session_id)
+    # Only the auth lookup touches the database: release it before streaming
+    await db.close()
+    parsed = parse_event_id(last_event_id) if last_event_id else None
+    after_seq = parsed[1] if parsed and parsed[0] == stream_id else 0
+    return await resume_stream(format_event_id(stream_id, after_seq), owner, http_request)
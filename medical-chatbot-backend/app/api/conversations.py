@@ -1,89 +1,190 @@
 """Conversation API endpoints"""
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
-from app.schemas.conversation import ConversationResponse, ConversationListResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+from app.database import get_async_db
+from app.schemas.conversation import (
+    ConversationResponse,
+    ConversationListResponse,
+    ConversationListPage,
+    MessageResponse,
+    MessagePage
+)
 from app.models.user import User
 from app.models.conversation import Conversation
-from app.models.guest_session import GuestSession
+from app.models.message import Message
 from app.dependencies import get_current_user
 from app.core.usage import get_or_create_guest_session
-from app.utils.errors import NotFoundException
+from app.utils.errors import NotFoundException, UnauthorizedException
+from app.utils.pagination import encode_cursor, before_cursor
 
 router = APIRouter(prefix="/api/conversations", tags=["Conversations"])
 
+# Page sizes (keyset pagination)
+CONVERSATION_PAGE_SIZE = 20
+MESSAGE_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
 
-@router.get("", response_model=List[ConversationListResponse])
+
+async def get_owned_conversation(
+    db: AsyncSession,
+    conversation_id: int,
+    current_user: Optional[User],
+    guest_session_id: Optional[str]
+) -> Conversation:
+    """
+    Load a conversation that belongs to the caller (messages are not loaded)
+    
+    Raises:
+        NotFoundException: If it does not exist or belongs to someone else
+    """
+    query = select(Conversation).where(Conversation.id == conversation_id)
+    
+    if current_user:
+        query = query.where(Conversation.user_id == current_user.id)
+    elif guest_session_id:
+        guest_session = await get_or_create_guest_session(db, guest_session_id)
+        query = query.where(Conversation.guest_session_id == guest_session.id)
+    else:
+        raise NotFoundException("Conversation")
+    
+    conversation = await db.scalar(query)
+    
+    if not conversation:
+        raise NotFoundException("Conversation")
+    
+    return conversation
+
+
+async def fetch_message_page(
+    db: AsyncSession,
+    conversation_id: int,
+    limit: int,
+    before: Optional[str] = None
+) -> Tuple[List[Message], Optional[str]]:
+    """
+    Newest `limit` messages older than the cursor, returned oldest first
+    
+    Returns:
+        (messages, cursor for the next older page or None)
+    """
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if before:
+        query = query.where(before_cursor(Message.created_at, Message.id, before))
+    
+    # One extra row tells whether an older page exists
+    rows = (await db.scalars(
+        query.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit + 1)
+    )).all()
+    
+    page = list(rows[:limit])
+    next_cursor = encode_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
+    page.reverse()
+    return page, next_cursor
+
+
+@router.get("", response_model=ConversationListPage)
 async def get_conversations(
     guest_session_id: Optional[str] = Query(None),
+    limit: int = Query(CONVERSATION_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = Query(None, description="next_cursor of the previous page"),
     current_user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all conversations for current user or guest session"""
+    """Get conversations for current user or guest session, most recently updated first"""
+    
+    # Only the denormalized list columns: message bodies are never loaded,
+    # so the response time does not grow with the length of each conversation
+    query = select(
+        Conversation.id,
+        Conversation.title,
+        Conversation.preview,
+        Conversation.message_count,
+        Conversation.created_at,
+        Conversation.updated_at
+    )
     
     # Determine if user or guest
     if current_user:
         # Authenticated user
-        conversations = db.query(Conversation).filter(
-            Conversation.user_id == current_user.id
-        ).order_by(Conversation.updated_at.desc()).all()
+        query = query.where(Conversation.user_id == current_user.id)
     
     elif guest_session_id:
         # Guest session
-        guest_session = get_or_create_guest_session(db, guest_session_id)
-        conversations = db.query(Conversation).filter(
-            Conversation.guest_session_id == guest_session.id
-        ).order_by(Conversation.updated_at.desc()).all()
+        guest_session = await get_or_create_guest_session(db, guest_session_id)
+        query = query.where(Conversation.guest_session_id == guest_session.id)
     
     else:
         # No auth and no guest session - return empty list
-        return []
-    
-    result = []
-    for conv in conversations:
-        # Get first user message for preview
-        first_message = next((msg for msg in conv.messages if msg.role == "user"), None)
-        preview = first_message.content[:100] if first_message else ""
-        
-        result.append(ConversationListResponse(
-            id=conv.id,
-            title=conv.title or "محادثة جديدة",
-            summary=preview,
-            created_at=conv.created_at,
-            updated_at=conv.updated_at,
-            message_count=len(conv.messages)
-        ))
-    
-    return result
+        return ConversationListPage(conversations=[])
+    
+    if before:
+        query = query.where(before_cursor(Conversation.updated_at, Conversation.id, before))
+    
+    rows = (await db.execute(
+        query.order_by(Conversation.updated_at.desc(), Conversation.id.desc()).limit(limit + 1)
+    )).all()
+    
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].updated_at, page[-1].id) if len(rows) > limit else None
+    
+    return ConversationListPage(
+        conversations=[
+            ConversationListResponse(
+                id=row.id,
+                title=row.title or "محادثة جديدة",
+                summary=row.preview or "",
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                message_count=row.message_count
+            )
+            for row in page
+        ],
+        next_cursor=next_cursor
+    )
 
 
 @router.get("/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: int,
     guest_session_id: Optional[str] = Query(None),
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     current_user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get specific conversation with messages"""
-    
-    # Build query based on user type
-    query = db.query(Conversation).filter(Conversation.id == conversation_id)
-    
-    if current_user:
-        query = query.filter(Conversation.user_id == current_user.id)
-    elif guest_session_id:
-        guest_session = get_or_create_guest_session(db, guest_session_id)
-        query = query.filter(Conversation.guest_session_id == guest_session.id)
-    else:
-        raise NotFoundException("Conversation")
-    
-    conversation = query.first()
-    
-    if not conversation:
-        raise NotFoundException("Conversation")
-    
-    return ConversationResponse.model_validate(conversation)
+    """Get specific conversation with its latest page of messages"""
+    conversation = await get_owned_conversation(db, conversation_id, current_user, guest_session_id)
+    messages, next_cursor = await fetch_message_page(db, conversation.id, limit)
+    
+    return ConversationResponse(
+        id=conversation.id,
+        title=conversation.title,
+        summary=conversation.summary,
+        created_at=conversation.created_at,
+        updated_at=conversation.updated_at,
+        messages=[MessageResponse.model_validate(msg) for msg in messages],
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/{conversation_id}/messages", response_model=MessagePage)
+async def get_conversation_messages(
+    conversation_id: int,
+    guest_session_id: Optional[str] = Query(None),
+    limit: int = Query(MESSAGE_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: Optional[User] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get older messages of a conversation (keyset pagination, newest page first)"""
+    conversation = await get_owned_conversation(db, conversation_id, current_user, guest_session_id)
+    messages, next_cursor = await fetch_message_page(db, conversation.id, limit, before)
+    
+    return MessagePage(
+        messages=[MessageResponse.model_validate(msg) for msg in messages],
+        next_cursor=next_cursor
+    )
 
 
 @router.delete("/{conversation_id}")
@@ -91,31 +192,16 @@ async def delete_conversation(
     conversation_id: int,
     guest_session_id: Optional[str] = Query(None),
     current_user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a specific conversation"""
-    
-    # Build query based on user type
-    query = db.query(Conversation).filter(Conversation.id == conversation_id)
-    
-    if current_user:
-        query = query.filter(Conversation.user_id == current_user.id)
-    elif guest_session_id:
-        from app.core.usage import get_or_create_guest_session
-        guest_session = get_or_create_guest_session(db, guest_session_id)
-        query = query.filter(Conversation.guest_session_id == guest_session.id)
-    else:
-        from app.utils.errors import UnauthorizedException
+    if not current_user and not guest_session_id:
         raise UnauthorizedException("Authentication or guest session ID required")
     
-    conversation = query.first()
+    conversation = await get_owned_conversation(db, conversation_id, current_user, guest_session_id)
     
-    if not conversation:
-        from app.utils.errors import NotFoundException
-        raise NotFoundException("Conversation")
-    
-    db.delete(conversation)
-    db.commit()
+    # AsyncSession.delete loads the cascaded messages/feedbacks itself
+    await db.delete(conversation)
+    await db.commit()
     
     return {"status": "success", "message": "Conversation deleted"}
-
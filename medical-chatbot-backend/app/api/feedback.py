@@ -1,14 +1,16 @@
 """Feedback API endpoint"""
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas.feedback import FeedbackRequest, FeedbackResponse
 from app.models.user import User
 from app.models.feedback import Feedback
 from app.models.message import Message
 from app.models.conversation import Conversation
 from app.dependencies import get_current_user
-from app.agent.agent import MedicalChatAgent
+from app.core.messages import add_message
+from app.agent.agent import get_agent
 from app.utils.constants import FeedbackType
 from app.utils.errors import NotFoundException
 from typing import Optional
@@ -20,7 +22,7 @@ router = APIRouter(prefix="/api", tags=["Feedback"])
 async def submit_feedback(
     feedback_data: FeedbackRequest,
     current_user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Submit feedback for a message
@@ -29,17 +31,13 @@ async def submit_feedback(
     - Thumbs down: Trigger review agent and generate improved response
     """
     # Verify message exists
-    message = db.query(Message).filter(
-        Message.id == feedback_data.message_id
-    ).first()
+    message = await db.get(Message, feedback_data.message_id)
     
     if not message:
         raise NotFoundException("Message")
     
     # Verify conversation exists and belongs to user
-    conversation = db.query(Conversation).filter(
-        Conversation.id == feedback_data.conversation_id
-    ).first()
+    conversation = await db.get(Conversation, feedback_data.conversation_id)
     
     if not conversation:
         raise NotFoundException("Conversation")
@@ -54,8 +52,8 @@ async def submit_feedback(
     )
     
     db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
+    await db.commit()
+    await db.refresh(feedback)
     
     # If thumbs down, trigger review agent
     if feedback_data.feedback_type == FeedbackType.THUMBS_DOWN:
@@ -68,7 +66,7 @@ async def process_negative_feedback(
     feedback: Feedback,
     original_message: Message,
     conversation: Conversation,
-    db: Session
+    db: AsyncSession
 ):
     """
     Process negative feedback with review agent
@@ -79,10 +77,12 @@ async def process_negative_feedback(
     """
     try:
         # Get conversation history up to the original message
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation.id,
-            Message.created_at <= original_message.created_at
-        ).order_by(Message.created_at).all()
+        messages = (await db.scalars(
+            select(Message).where(
+                Message.conversation_id == conversation.id,
+                Message.created_at <= original_message.created_at
+            ).order_by(Message.created_at)
+        )).all()
         
         # Get the user message that prompted the original response
         user_message = None
@@ -101,7 +101,7 @@ async def process_negative_feedback(
         ]
         
         # Re-run agent with review prompt
-        agent = MedicalChatAgent()
+        agent = get_agent()
         improved_content = ""
         metadata = {}
         
@@ -115,20 +115,21 @@ async def process_negative_feedback(
                 metadata.update(chunk["data"])
         
         # Save improved response
-        improved_message = Message(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=improved_content,
-            meta_data={**metadata, "is_improved": True, "original_message_id": original_message.id}
+        improved_message = await add_message(
+            db,
+            conversation.id,
+            "assistant",
+            improved_content,
+            {**metadata, "is_improved": True, "original_message_id": original_message.id}
         )
-        db.add(improved_message)
+        await db.flush()  # Assigns improved_message.id
         
         # Update feedback
         feedback.reviewed = True
         feedback.improved_response = improved_content
         feedback.improved_message_id = improved_message.id
         
-        db.commit()
+        await db.commit()
         
     except Exception as e:
         print(f"Error processing negative feedback: {str(e)}")
@@ -1,7 +1,7 @@
 """Profile management API endpoints"""
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.schemas.user import UserResponse, UserProfileUpdate
 from app.models.user import User
 from app.dependencies import require_user
@@ -19,7 +19,7 @@ async def get_profile(current_user: User = Depends(require_user)):
 async def update_profile(
     profile_data: UserProfileUpdate,
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update user profile"""
     # Update fields
@@ -32,8 +32,8 @@ async def update_profile(
     if profile_data.gender is not None:
         current_user.gender = profile_data.gender
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return UserResponse.model_validate(current_user)
 
@@ -41,10 +41,10 @@ async def update_profile(
 @router.delete("")
 async def delete_profile(
     current_user: User = Depends(require_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete user account"""
-    db.delete(current_user)
-    db.commit()
+    await db.delete(current_user)
+    await db.commit()
     
     return {"message": "Account deleted successfully"}
@@ -1,6 +1,16 @@
 """Application configuration using Pydantic Settings"""
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List
+from urllib.parse import parse_qsl, urlencode
+
+# libpq connection parameters that asyncpg.connect() accepts under another name
+ASYNCPG_RENAMED_PARAMS = {"sslmode": "ssl"}
+# libpq-only connection parameters asyncpg.connect() rejects; dropped from the async URL
+LIBPQ_ONLY_PARAMS = {
+    "channel_binding", "gssencmode", "connect_timeout", "application_name", "options", "client_encoding",
+    "sslrootcert", "sslcert", "sslkey", "sslcrl", "sslpassword", "sslcompression",
+    "keepalives", "keepalives_idle", "keepalives_interval", "keepalives_count",
+}
 
 
 class Settings(BaseSettings):
@@ -21,8 +31,74 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4o-mini"
     
     # Conversation memory settings
-    CONVERSATION_WINDOW_SIZE: int = 30  # Keep last 30 messages in context
+    CONVERSATION_WINDOW_SIZE: int = 30  # Keep at most the last 30 messages in context
+    CONTEXT_TOKEN_BUDGET: int = 8000  # ...and at most this many tokens of them (older ones go to the summary)
     SUMMARIZATION_MODEL: str = "gpt-4o-mini"  # Model for summarization
+    SUMMARY_WORKER_CONCURRENCY: int = 2  # Background memory updates running at once
+    # Long-term memory: "retrieval" (index older messages, recall the relevant ones) or "summary"
+    LONG_TERM_MEMORY: str = "retrieval"
+    MEMORY_EMBEDDER: str = "hashing"  # "hashing" (local, no network) or "openai"
+    MEMORY_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    MEMORY_EMBEDDING_DIM: int = 512
+    MEMORY_RECALL_TOP_K: int = 8
+    MEMORY_RECALL_TOKEN_BUDGET: int = 1500  # Tokens of recalled older messages per turn
+    MEMORY_RECALL_MIN_SCORE: float = 0.2  # Minimum cosine similarity to recall a message
+    
+    # OpenAI connection pool (shared client registry)
+    OPENAI_MAX_CONNECTIONS: int = 100
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    OPENAI_KEEPALIVE_EXPIRY: float = 120.0  # Seconds an idle connection stays open
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_READ_TIMEOUT: float = 60.0
+    OPENAI_POOL_TIMEOUT: float = 10.0  # Max wait for a free pooled connection
+    
+    # Web search: ddgs is synchronous, so its queries run on a bounded thread pool
+    SEARCH_MAX_WORKERS: int = 8  # Search queries in flight per worker process
+    SEARCH_QUERY_TIMEOUT: float = 8.0  # Per query (WebTeb and other sources run concurrently)
+    # A timed-out or cancelled query keeps its thread until ddgs gives up (its own
+    # per-request timeout); these extra threads keep such queries from starving new ones
+    SEARCH_ABANDONED_RESERVE: int = 4
+    # Offline BM25 knowledge index (scripts/build_knowledge_index.py); live search is the fallback
+    KNOWLEDGE_INDEX_ENABLED: bool = True
+    KNOWLEDGE_INDEX_PATH: str = "data/knowledge_index"
+    KNOWLEDGE_INDEX_TOP_K: int = 8
+    KNOWLEDGE_INDEX_MIN_RESULTS: int = 3  # Fewer well-matched articles than this counts as poor recall
+    KNOWLEDGE_INDEX_MIN_COVERAGE: float = 0.6  # Fraction of query terms an article must match
+    # Search result cache (stale entries are served while a background refresh runs)
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_MAX_ENTRIES: int = 2048  # In-process LRU tier
+    SEARCH_CACHE_TTL_SECONDS: float = 259200.0  # 3 days without a timelimit (d/w/m/y are shorter)
+    SEARCH_CACHE_SQLITE_PATH: str = ""  # e.g. "data/search_cache.db": shared by all workers on the host
+    
+    # Event-loop lag monitor (GET /metrics): how late a periodic timer fires
+    EVENT_LOOP_MONITOR_INTERVAL_MS: float = 100.0
+    EVENT_LOOP_STALL_MS: float = 50.0  # Lag at or above this counts as a stall
+    
+    # Local intent classifier (in front of the LLM DecisionMaker)
+    # No model ships with the repo: until scripts/train_intent_classifier.py has written this
+    # file, the classifier is inactive and every decision goes to the LLM gatekeeper
+    INTENT_CLASSIFIER_PATH: str = "data/intent_classifier.npz"
+    INTENT_CLASSIFIER_THRESHOLD: float = 0.85  # Below this confidence, fall back to the LLM gatekeeper
+    GATEKEEPER_MEMO_MAX_ENTRIES: int = 1024  # LRU memo of LLM gatekeeper decisions per conversation state
+    
+    # Answer cache for repeated standalone questions
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_ENTRIES: int = 512
+    ANSWER_CACHE_TTL_SECONDS: float = 21600.0  # 6 hours
+    
+    # Streaming: how often to check whether the SSE client is still connected
+    DISCONNECT_POLL_SECONDS: float = 0.5
+    # Resumable streams (Last-Event-ID): per-answer ring buffer of SSE frames
+    STREAM_BUFFER_BACKEND: str = "memory"  # "memory" (single worker) or "sqlite" (shared by workers on one host only)
+    STREAM_BUFFER_SQLITE_PATH: str = "data/stream_buffer.db"
+    STREAM_BUFFER_MAX_EVENTS: int = 2000
+    STREAM_BUFFER_TTL_SECONDS: float = 300.0  # How long a finished (or stalled, unfinished) stream is kept
+    STREAM_BUFFER_POLL_SECONDS: float = 0.1  # Reader poll interval for the shared backend
+    STREAM_RESUME_ENABLED: bool = True  # False: cancel generation as soon as the client disconnects
+    STREAM_RESUME_GRACE_SECONDS: float = 5.0  # Keep generating this long after the last client left
+    # SSE framing: content deltas are coalesced for up to this long / this many bytes (0 ms disables)
+    SSE_COALESCE_MS: float = 30.0
+    SSE_COALESCE_BYTES: int = 512
     
     # WebTeb Symptom Checker API
     # مطلوب: احصل على بيانات API من WebTeb
@@ -52,6 +128,31 @@ class Settings(BaseSettings):
             return self.DATABASE_URL.replace("postgres://", "postgresql://", 1)
         return self.DATABASE_URL
 
+    @property
+    def async_database_url(self) -> str:
+        """
+        Same database through an async driver (asyncpg for Postgres, aiosqlite for SQLite)
+        
+        libpq-only Postgres parameters (e.g. channel_binding, connect_timeout) are
+        dropped; the sync engine still receives them through sqlalchemy_database_url.
+        """
+        url = self.sqlalchemy_database_url
+        scheme, sep, rest = url.partition("://")
+        driver = scheme.split("+", 1)[0]
+        if driver == "postgresql":
+            # Query parameters become asyncpg.connect() keyword arguments: rename the
+            # libpq spellings asyncpg knows and drop the ones it would reject
+            location, _, query = rest.partition("?")
+            params = [
+                (ASYNCPG_RENAMED_PARAMS.get(key, key), value)
+                for key, value in parse_qsl(query, keep_blank_values=True)
+                if key not in LIBPQ_ONLY_PARAMS
+            ]
+            return f"postgresql+asyncpg{sep}{location}" + (f"?{urlencode(params)}" if params else "")
+        if driver == "sqlite":
+            return f"sqlite+aiosqlite{sep}{rest}"
+        return url
+
 
 # Global settings instance
 settings = Settings()
@@ -0,0 +1,163 @@
+"""Process-wide upstream client registry
+
+One pooled AsyncOpenAI client per worker process, shared by the agent,
+DecisionMaker, ConversationMemory and FileProcessor, so TLS
+handshakes happen once per connection instead of once per request. The
+registry is opened on application startup and closed on shutdown.
+
+It also owns the bounded thread pool that runs blocking search clients (ddgs)
+off the event loop.
+"""
+from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import httpx
+from openai import AsyncOpenAI
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# httpcore trace events that end a request's hold on its connection (.complete / .failed)
+RESPONSE_CLOSED_EVENTS = ("http11.response_closed.", "http2.response_closed.")
+
+
+class InstrumentedTransport(httpx.AsyncHTTPTransport):
+    """
+    httpx transport that counts pool checkouts, saturation and new connections
+
+    Everything is counted from this transport's own bookkeeping and the public
+    "trace" request extension (httpcore reports every TCP connect and response
+    close through it); the private httpcore pool is never read. A request holds
+    its connection from checkout until its response is closed, so a checkout
+    made while max_connections requests are active has to queue for one
+    (`saturated_checkouts`).
+    """
+
+    def __init__(self, limits: httpx.Limits, **kwargs):
+        super().__init__(limits=limits, **kwargs)
+        self.max_connections = limits.max_connections
+        self.checkouts = 0
+        self.saturated_checkouts = 0
+        self.new_connections = 0
+        self.in_flight_requests = 0
+        self.peak_in_flight_requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.checkouts += 1
+        if self.max_connections is not None and self.in_flight_requests >= self.max_connections:
+            self.saturated_checkouts += 1
+        self.in_flight_requests += 1
+        self.peak_in_flight_requests = max(self.peak_in_flight_requests, self.in_flight_requests)
+        active = [True]
+
+        def release() -> None:
+            if active[0]:
+                active[0] = False
+                self.in_flight_requests -= 1
+
+        caller_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            # Each new connection is a TCP (+ TLS) handshake
+            if event_name in ("connection.connect_tcp.complete", "connection.connect_unix_socket.complete"):
+                self.new_connections += 1
+            # The connection goes back to the pool once the response is closed
+            elif event_name.startswith(RESPONSE_CLOSED_EVENTS) and not event_name.endswith(".started"):
+                release()
+            if caller_trace is not None:
+                await caller_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        try:
+            return await super().handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool counters"""
+        return {
+            "checkouts": self.checkouts,
+            "saturated_checkouts": self.saturated_checkouts,
+            "new_connections": self.new_connections,
+            "in_flight_requests": self.in_flight_requests,
+            "peak_in_flight_requests": self.peak_in_flight_requests,
+            "max_connections": self.max_connections
+        }
+
+
+class ClientRegistry:
+    """Owns the shared, pooled upstream clients for this process"""
+
+    def __init__(self):
+        self._openai: Optional[AsyncOpenAI] = None
+        self._transport: Optional[InstrumentedTransport] = None
+        self._search_executor: Optional[ThreadPoolExecutor] = None
+
+    def get_openai(self) -> AsyncOpenAI:
+        """Return the shared AsyncOpenAI client, creating it on first use"""
+        if self._openai is None:
+            self._transport = InstrumentedTransport(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+                )
+            )
+            http_client = httpx.AsyncClient(
+                transport=self._transport,
+                timeout=httpx.Timeout(
+                    settings.OPENAI_READ_TIMEOUT,
+                    connect=settings.OPENAI_CONNECT_TIMEOUT,
+                    pool=settings.OPENAI_POOL_TIMEOUT
+                )
+            )
+            self._openai = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                http_client=http_client
+            )
+            logger.info(
+                f"OpenAI client pool created (max_connections={settings.OPENAI_MAX_CONNECTIONS}, "
+                f"keepalive={settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS})"
+            )
+        return self._openai
+
+    def get_search_executor(self) -> ThreadPoolExecutor:
+        """Return the bounded thread pool for blocking search calls, creating it on first use"""
+        if self._search_executor is None:
+            # Queries abandoned by their caller still occupy a thread until ddgs returns
+            max_workers = settings.SEARCH_MAX_WORKERS + settings.SEARCH_ABANDONED_RESERVE
+            self._search_executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="search"
+            )
+            logger.info(
+                f"Search thread pool created (max_workers={max_workers}, "
+                f"{settings.SEARCH_ABANDONED_RESERVE} reserved for abandoned queries)"
+            )
+        return self._search_executor
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool statistics for the OpenAI client"""
+        if self._transport is None:
+            return {"initialized": False}
+        return {"initialized": True, **self._transport.stats()}
+
+    async def aclose(self) -> None:
+        """Close pooled connections (application shutdown)"""
+        if self._openai is not None:
+            await self._openai.close()
+        self._openai = None
+        self._transport = None
+        if self._search_executor is not None:
+            # Queued searches are dropped; running ones finish within their ddgs timeout
+            self._search_executor.shutdown(wait=False, cancel_futures=True)
+        self._search_executor = None
+
+
+# Process-wide registry
+clients = ClientRegistry()
+
+def get_openai_client() -> AsyncOpenAI:
+    """Get the shared, pooled AsyncOpenAI client"""
+    return clients.get_openai()
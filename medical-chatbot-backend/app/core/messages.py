@@ -0,0 +1,96 @@
+"""Message writes and the denormalized conversation counters"""
+from typing import List, Optional
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.utils.token_counter import count_tokens
+
+# Length of Conversation.preview (first user message, shown in the sidebar)
+PREVIEW_CHARS = 100
+
+
+async def add_message(
+    db: AsyncSession,
+    conversation_id: int,
+    role: str,
+    content: str,
+    meta_data: Optional[dict] = None
+) -> Message:
+    """
+    Add a message and update the counters of its conversation
+    
+    The sidebar listing reads `message_count` and `preview` from the
+    conversation row instead of loading messages, so every message write must
+    go through here. The caller commits (both statements share its transaction).
+    The content is tokenized here, once, for context budgeting.
+    
+    Returns:
+        The pending Message (id is assigned on flush/commit)
+    """
+    message = Message(
+        conversation_id=conversation_id,
+        role=role,
+        content=content,
+        token_count=count_tokens(content),
+        meta_data=meta_data
+    )
+    db.add(message)
+    
+    values = {"message_count": Conversation.message_count + 1}
+    if role == "user":
+        values["preview"] = func.coalesce(Conversation.preview, content[:PREVIEW_CHARS])
+    # Atomic increment: concurrent writers (user message, streamed answer) cannot lose a count
+    await db.execute(
+        update(Conversation).where(Conversation.id == conversation_id).values(**values)
+    )
+    return message
+
+
+async def load_unsummarized_messages(db: AsyncSession, conversation: Conversation) -> List[Message]:
+    """
+    Messages not yet folded into the conversation summary, oldest first
+    
+    Bounded by roughly the context window once the summary keeps up, instead
+    of the whole conversation.
+    """
+    query = select(Message).where(Message.conversation_id == conversation.id)
+    if conversation.summarized_through_message_id is not None:
+        query = query.where(Message.id > conversation.summarized_through_message_id)
+    return list((await db.scalars(query.order_by(Message.created_at, Message.id))).all())
+
+
+async def save_summary(db: AsyncSession, conversation_id: int, summary: str, through_message_id: int) -> bool:
+    """
+    Persist a folded summary and advance its watermark
+    
+    The watermark only moves forward: a slower concurrent turn cannot
+    overwrite a newer summary. The caller commits.
+    
+    Returns:
+        True if the summary was stored
+    """
+    return await advance_watermark(db, conversation_id, through_message_id, summary=summary)
+
+
+async def advance_watermark(db: AsyncSession, conversation_id: int, through_message_id: int, **values) -> bool:
+    """
+    Move `summarized_through_message_id` forward (messages up to it leave the
+    verbatim history), optionally together with other conversation columns
+    
+    Returns:
+        True if the watermark moved
+    """
+    result = await db.execute(
+        update(Conversation)
+        .where(
+            Conversation.id == conversation_id,
+            or_(
+                Conversation.summarized_through_message_id.is_(None),
+                Conversation.summarized_through_message_id < through_message_id
+            )
+        )
+        .values(summarized_through_message_id=through_message_id, **values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
@@ -0,0 +1,130 @@
+"""Process-wide runtime counters exposed by GET /metrics"""
+from typing import Any, Deque, Dict, Optional
+from collections import deque
+import asyncio
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StreamMetrics:
+    """Counters for chat streams, including streams aborted by a client disconnect"""
+
+    def __init__(self):
+        self.completed_streams = 0
+        self.aborted_streams = 0
+        self.completion_tokens_total = 0
+        self.estimated_tokens_saved = 0
+
+    @property
+    def average_completion_tokens(self) -> float:
+        """Average output tokens of a fully generated answer"""
+        if not self.completed_streams:
+            return 0.0
+        return self.completion_tokens_total / self.completed_streams
+
+    def record_completed(self, output_tokens: int) -> None:
+        """Record a stream that ran to its done event"""
+        self.completed_streams += 1
+        self.completion_tokens_total += output_tokens
+
+    def record_aborted(self, streamed_tokens: int) -> int:
+        """
+        Record a stream cancelled after the client went away
+
+        Args:
+            streamed_tokens: Content deltas already generated (about one token each)
+
+        Returns:
+            Estimated output tokens not generated thanks to the cancellation
+        """
+        saved = max(int(self.average_completion_tokens) - streamed_tokens, 0)
+        self.aborted_streams += 1
+        self.estimated_tokens_saved += saved
+        return saved
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of stream counters"""
+        return {
+            "completed_streams": self.completed_streams,
+            "aborted_streams": self.aborted_streams,
+            "average_completion_tokens": round(self.average_completion_tokens, 1),
+            "estimated_tokens_saved": self.estimated_tokens_saved
+        }
+
+
+class EventLoopMonitor:
+    """
+    Measures event-loop blocking: a timer that should fire every interval is
+    delayed by any synchronous work (blocking I/O, CPU) running on the loop
+    """
+
+    def __init__(self, interval_ms: float = 100.0, stall_ms: float = 50.0, window: int = 600):
+        """
+        Args:
+            interval_ms: Timer period
+            stall_ms: Lag at or above this counts as a stall
+            window: Recent samples kept for percentiles (600 x 100 ms = 1 minute)
+        """
+        self.interval_ms = interval_ms
+        self.stall_ms = stall_ms
+        self._recent: Deque[float] = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+        self.samples = 0
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self.blocked_ms_total = 0.0
+
+    def start(self) -> None:
+        """Start sampling on the running loop (idempotent)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.interval_ms / 1000.0
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.record((loop.time() - expected) * 1000.0)
+
+    def record(self, lag_ms: float) -> None:
+        """Record how late one timer tick fired"""
+        lag_ms = max(lag_ms, 0.0)
+        self.samples += 1
+        self._recent.append(lag_ms)
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms >= self.stall_ms:
+            self.stalls += 1
+            self.blocked_ms_total += lag_ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of loop lag (percentiles over the recent window)"""
+        recent = sorted(self._recent)
+
+        def percentile(p: float) -> float:
+            return round(recent[int(p * (len(recent) - 1))], 1) if recent else 0.0
+
+        return {
+            "samples": self.samples,
+            "p50_lag_ms": percentile(0.50),
+            "p99_lag_ms": percentile(0.99),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "stalls": self.stalls,
+            "blocked_ms_total": round(self.blocked_ms_total, 1)
+        }
+
+
+# Process-wide counters
+stream_metrics = StreamMetrics()
+loop_monitor = EventLoopMonitor(
+    interval_ms=settings.EVENT_LOOP_MONITOR_INTERVAL_MS,
+    stall_ms=settings.EVENT_LOOP_STALL_MS
+)
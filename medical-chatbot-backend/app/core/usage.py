@@ -1,35 +1,39 @@
 """Usage tracking utilities"""
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.user import User
 from app.models.guest_session import GuestSession
 
 
-def increment_user_usage(db: Session, user_id: int) -> None:
+async def increment_user_usage(db: AsyncSession, user_id: int) -> None:
     """Increment question count for user"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.questions_used += 1
-        db.commit()
+    # Single atomic UPDATE: concurrent questions cannot lose an increment
+    await db.execute(
+        update(User).where(User.id == user_id).values(questions_used=User.questions_used + 1)
+    )
+    await db.commit()
 
 
-def increment_guest_usage(db: Session, guest_session_id: int) -> None:
+async def increment_guest_usage(db: AsyncSession, guest_session_id: int) -> None:
     """Increment question count for guest session"""
-    session = db.query(GuestSession).filter(GuestSession.id == guest_session_id).first()
-    if session:
-        session.questions_used += 1
-        db.commit()
+    await db.execute(
+        update(GuestSession)
+        .where(GuestSession.id == guest_session_id)
+        .values(questions_used=GuestSession.questions_used + 1)
+    )
+    await db.commit()
 
 
-def get_or_create_guest_session(db: Session, session_id: str) -> GuestSession:
+async def get_or_create_guest_session(db: AsyncSession, session_id: str) -> GuestSession:
     """Get or create guest session by session ID"""
-    guest_session = db.query(GuestSession).filter(
-        GuestSession.session_id == session_id
-    ).first()
+    guest_session = await db.scalar(
+        select(GuestSession).where(GuestSession.session_id == session_id)
+    )
     
     if not guest_session:
         guest_session = GuestSession(session_id=session_id)
         db.add(guest_session)
-        db.commit()
-        db.refresh(guest_session)
+        await db.commit()
+        await db.refresh(guest_session)
     
     return guest_session
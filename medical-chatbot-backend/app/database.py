@@ -1,5 +1,12 @@
-"""Database configuration and session management"""
-from sqlalchemy import create_engine
+"""Database configuration and session management
+
+Two engines point at the same database:
+1. engine / SessionLocal - synchronous, used by Alembic and offline scripts
+2. async_engine / AsyncSessionLocal - asyncpg / aiosqlite, used by the API so
+   queries never block the event loop that serves the chat streams
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
@@ -12,17 +19,60 @@ engine = create_engine(
     max_overflow=20
 )
 
-# Create session factory
+# Async engine for the API (same pool limits as the sync engine)
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20
+)
+
+# Connection checkout counters of the API engine (exposed by GET /metrics)
+_pool_counters = {"checked_out": 0, "peak_checked_out": 0, "checkouts": 0}
+
+
+@event.listens_for(async_engine.sync_engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _pool_counters["checkouts"] += 1
+    _pool_counters["checked_out"] += 1
+    _pool_counters["peak_checked_out"] = max(_pool_counters["peak_checked_out"], _pool_counters["checked_out"])
+
+
+@event.listens_for(async_engine.sync_engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    _pool_counters["checked_out"] -= 1
+
+
+def pool_stats() -> dict:
+    """Database connection pool usage for this worker"""
+    pool = async_engine.sync_engine.pool
+    return {
+        **_pool_counters,
+        "pool_size": getattr(pool, "size", lambda: None)(),
+        "max_overflow": getattr(pool, "_max_overflow", None)
+    }
+
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes stay readable after commit without an
+# implicit (and in async code, forbidden) lazy refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 # Base class for all models
 Base = declarative_base()
 
 
 def get_db():
-    """Dependency for getting database session"""
+    """Dependency for getting a synchronous database session (scripts, migrations)"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for getting an async database session per request"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,8 +1,8 @@
 """FastAPI dependencies"""
 from typing import Optional
 from fastapi import Depends, Header
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.user import User
 from app.models.guest_session import GuestSession
 from app.core.auth import decode_access_token, extract_token_from_header
@@ -10,9 +10,9 @@ from app.core.usage import get_or_create_guest_session
 from app.utils.errors import UnauthorizedException
 
 
-def get_current_user(
+async def get_current_user(
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[User]:
     """
     Get current authenticated user from JWT token
@@ -27,7 +27,7 @@ def get_current_user(
         raise UnauthorizedException("Invalid authorization header")
     
     user_id = decode_access_token(token)
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise UnauthorizedException("User not found")
@@ -35,9 +35,9 @@ def get_current_user(
     return user
 
 
-def require_user(
+async def require_user(
     authorization: str = Header(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """
     Require authenticated user (for protected endpoints)
@@ -48,7 +48,7 @@ def require_user(
         raise UnauthorizedException("Authentication required")
     
     user_id = decode_access_token(token)
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise UnauthorizedException("User not found")
@@ -56,12 +56,12 @@ def require_user(
     return user
 
 
-def get_guest_session(
+async def get_guest_session(
     guest_session_id: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[GuestSession]:
     """Get or create guest session if guest_session_id provided"""
     if not guest_session_id:
         return None
     
-    return get_or_create_guest_session(db, guest_session_id)
+    return await get_or_create_guest_session(db, guest_session_id)
@@ -6,6 +6,12 @@ from app.config import settings
 from app.utils.errors import AppException
 from app.schemas.error import ErrorResponse, ErrorDetail
 from app.api import auth, chat, conversations, profile, feedback
+from app.core.clients import clients
+from app.core.metrics import stream_metrics, loop_monitor
+from app.database import async_engine, pool_stats as db_pool_stats
+from app.agent.agent import get_agent
+from app.services.answer_cache import get_answer_cache
+from app.services.summary_worker import get_summary_worker
 
 # Create FastAPI app
 app = FastAPI(
@@ -21,6 +27,23 @@ from app.core.logging_config import setup_logging
 async def startup_event():
     """Initialize services on startup"""
     setup_logging()
+    # Event-loop lag sampling for /metrics (shows blocking calls on the loop)
+    loop_monitor.start()
+    # Open the shared, pooled upstream clients once per worker
+    clients.get_openai()
+    # Build the shared agent and warm it before the first request
+    await get_agent().warm_up()
+    # Conversation summaries are prepared in the background between turns
+    get_summary_worker().start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and release pooled upstream and database connections"""
+    await get_summary_worker().stop()
+    await loop_monitor.stop()
+    await clients.aclose()
+    await async_engine.dispose()
 
 # CORS middleware - Allow all origins for production testing
 app.add_middleware(
@@ -87,6 +110,22 @@ async def health_check():
     }
 
 
+# Runtime metrics endpoint
+@app.get("/metrics")
+async def metrics():
+    """Upstream connection pool and cache statistics for this worker"""
+    return {
+        "openai_pool": clients.pool_stats(),
+        "answer_cache": get_answer_cache().stats(),
+        "gatekeeper_memo": get_agent().decision_maker.memo_stats(),
+        "streams": stream_metrics.stats(),
+        "db_pool": db_pool_stats(),
+        "summary_worker": get_summary_worker().stats(),
+        "search": get_agent().search_tool.stats(),
+        "event_loop": loop_monitor.stats()
+    }
+
+
 # Helper to serve chat template
 def get_chat_template():
     import os
@@ -1,5 +1,5 @@
 """Conversation model"""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -8,6 +8,11 @@ from app.database import Base
 class Conversation(Base):
     """Conversation model for chat sessions"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Conversation lists: WHERE user_id / guest_session_id = ? ORDER BY updated_at DESC
+        Index("ix_conversations_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_conversations_guest_session_id_updated_at", "guest_session_id", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -17,7 +22,12 @@ class Conversation(Base):
     
     # Conversation metadata
     title = Column(String, nullable=True)  # Auto-generated from first message
-    summary = Column(Text, nullable=True)  # AI-generated summary
+    summary = Column(Text, nullable=True)  # AI-generated rolling summary of older messages
+    summarized_through_message_id = Column(Integer, nullable=True)  # Messages with id <= this are in long-term memory (index or `summary`)
+    
+    # Denormalized for the sidebar listing (maintained by app.core.messages.add_message)
+    message_count = Column(Integer, default=0, server_default="0", nullable=False)
+    preview = Column(String(100), nullable=True)  # First user message, truncated
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -15,7 +15,7 @@ class Feedback(Base):
     # Foreign keys
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
-    message_id = Column(Integer, ForeignKey("messages.id"), nullable=False)
+    message_id = Column(Integer, ForeignKey("messages.id"), nullable=False, index=True)
     
     # Feedback data
     feedback_type = Column(SQLEnum(FeedbackType), nullable=False)
@@ -0,0 +1,28 @@
+"""Conversation memory index model"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.orm import relationship, backref
+from datetime import datetime
+from app.database import Base
+
+
+class ConversationMemoryIndex(Base):
+    """Embeddings of the older messages of a conversation (long-term memory)"""
+    __tablename__ = "memory_indexes"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), primary_key=True)
+
+    # Embedder that produced the vectors ("hashing-256", "openai:text-embedding-3-small:256")
+    embedder = Column(String(100), nullable=False)
+    # NumPy arrays as raw bytes: int64 message ids and float16 (n, dim) unit vectors
+    message_ids = Column(LargeBinary, nullable=False)
+    vectors = Column(LargeBinary, nullable=False)
+    indexed_through_message_id = Column(Integer, nullable=False)  # Messages with id <= this are indexed
+
+    # Timestamps
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships (deleted together with the conversation)
+    conversation = relationship(
+        "Conversation",
+        backref=backref("memory_index", uselist=False, cascade="all, delete-orphan")
+    )
@@ -1,5 +1,5 @@
 """Message model"""
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -8,6 +8,10 @@ from app.database import Base
 class Message(Base):
     """Message model for individual chat messages"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # History load: WHERE conversation_id = ? ORDER BY created_at
+        Index("ix_messages_conversation_id_created_at", "conversation_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
@@ -15,6 +19,8 @@ class Message(Base):
     # Message content
     role = Column(String, nullable=False)  # "user" or "assistant"
     content = Column(Text, nullable=False)
+    # Tokens of `content`, counted once at write time (context window budgeting)
+    token_count = Column(Integer, nullable=True)
     
     # Metadata for assistant messages
     meta_data = Column(JSON, nullable=True)  # {"tools_used": [...], "sources": [...], "is_emergency": false}
@@ -22,7 +22,8 @@ class ConversationResponse(BaseModel):
     summary: Optional[str] = None
     created_at: datetime
     updated_at: datetime
-    messages: List[MessageResponse] = []
+    messages: List[MessageResponse] = []  # Latest page, oldest first
+    next_cursor: Optional[str] = None  # Pass as `before` to /messages for older messages
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -37,3 +38,15 @@ class ConversationListResponse(BaseModel):
     message_count: int
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class ConversationListPage(BaseModel):
+    """One page of the conversation list (most recently updated first)"""
+    conversations: List[ConversationListResponse]
+    next_cursor: Optional[str] = None  # Pass as `before` for the next page; None on the last page
+
+
+class MessagePage(BaseModel):
+    """One page of a conversation's messages (oldest first within the page)"""
+    messages: List[MessageResponse]
+    next_cursor: Optional[str] = None  # Pass as `before` for older messages; None at the start
@@ -4,8 +4,40 @@ from app.services.conversation_memory import (
     ConversationMemory,
     get_conversation_memory
 )
+from app.services.answer_cache import (
+    AnswerCache,
+    get_answer_cache
+)
+from app.services.stream_buffer import (
+    StreamBufferStore,
+    get_stream_store
+)
+from app.services.search_cache import (
+    SearchCache,
+    get_search_cache
+)
+from app.services.memory_index import (
+    MemoryIndex,
+    get_embedder,
+    recall_messages
+)
+from app.services.summary_worker import (
+    SummaryWorker,
+    get_summary_worker
+)
 
 __all__ = [
     "ConversationMemory",
-    "get_conversation_memory"
+    "get_conversation_memory",
+    "AnswerCache",
+    "get_answer_cache",
+    "StreamBufferStore",
+    "get_stream_store",
+    "SearchCache",
+    "get_search_cache",
+    "MemoryIndex",
+    "get_embedder",
+    "recall_messages",
+    "SummaryWorker",
+    "get_summary_worker"
 ]
@@ -0,0 +1,151 @@
+"""Answer Cache - replay answers to repeated standalone questions
+
+Much of the traffic is the same few dozen questions ("ما هي أعراض السكري",
+"what is hypertension"). This in-process cache stores the final answer of a
+standalone question (no prior conversation, no attachments) keyed on:
+1. The normalized question text (diacritics, letter variants, punctuation folded)
+2. The detected language
+3. The tool path the gatekeeper chose (direct_answer / requires_tools)
+
+Entries are evicted least-recently-used once the size cap is reached and expire
+after a TTL, so answers built from web search do not go stale indefinitely.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import time
+from app.config import settings
+from app.utils.language_detector import detect_language
+from app.utils.text_normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+TOOL_PATHS = ("requires_tools", "direct_answer")
+
+
+class AnswerCache:
+    """LRU + TTL cache of complete answers"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 21600.0, max_answer_chars: int = 20000):
+        """
+        Initialize the answer cache
+
+        Args:
+            max_entries: Size cap; least recently used entries are evicted beyond it
+            ttl_seconds: Lifetime of an entry
+            max_answer_chars: Longer answers are not cached
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_answer_chars = max_answer_chars
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(question: str, tool_path: str) -> Optional[str]:
+        """
+        Build the cache key for a question
+
+        Returns:
+            Hex digest, or None when the question normalizes to nothing
+        """
+        normalized = normalize_text(question)
+        if not normalized:
+            return None
+        raw = f"{detect_language(question)}|{tool_path}|{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_cacheable(
+        conversation_history: Optional[List[Dict[str, str]]],
+        attachments: Optional[List[Dict[str, Any]]]
+    ) -> bool:
+        """Only standalone questions are cached: prior context changes the answer"""
+        return not conversation_history and not attachments
+
+    def get(self, question: str, tool_paths: Tuple[str, ...] = TOOL_PATHS) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached answer, trying the given tool paths in order
+
+        Returns:
+            The cached entry (with "tool_path"), or None on a miss
+        """
+        now = time.monotonic()
+        for tool_path in tool_paths:
+            key = self.make_key(question, tool_path)
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                continue
+            if entry["expires_at"] <= now:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        question: str,
+        tool_path: str,
+        content: str,
+        sources: Optional[List[Dict[str, Any]]] = None,
+        tools_used: Optional[List[str]] = None,
+        decision: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Store a complete answer
+
+        Returns:
+            True if the answer was cached
+        """
+        key = self.make_key(question, tool_path)
+        if not key or not content or len(content) > self.max_answer_chars:
+            return False
+
+        self._entries[key] = {
+            "tool_path": tool_path,
+            "content": content,
+            "sources": sources or [],
+            "tools_used": tools_used or [],
+            "decision": decision or {},
+            "expires_at": time.monotonic() + self.ttl_seconds
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Singleton instance
+_answer_cache_instance = None
+
+def get_answer_cache() -> AnswerCache:
+    """Get or create the answer cache singleton"""
+    global _answer_cache_instance
+    if _answer_cache_instance is None:
+        _answer_cache_instance = AnswerCache(
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+        )
+    return _answer_cache_instance
@@ -4,28 +4,85 @@ This service manages conversation history by:
 1. Keeping only the last 10-15 exchanges (20-30 messages) in direct context
 2. Summarizing older messages in Arabic when conversation grows beyond window
 3. Optimizing token usage for cost reduction with GPT-4o-mini
+4. Keeping the system prompt as an unchanged prefix so OpenAI prompt caching applies
+5. Folding newly evicted messages into a persisted rolling summary, so each turn
+   summarizes a couple of messages instead of the whole older transcript
+6. Sizing the window by a token budget (stored per-message token counts), so a
+   few pasted documents cannot blow up the prompt
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, TypeVar
 import logging
-from openai import AsyncOpenAI
 from app.config import settings
+from app.core.clients import get_openai_client
+from app.utils.token_counter import message_tokens
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+SUMMARY_FALLBACK = "محادثة سابقة تحتوي على معلومات طبية عامة."
+
+
+def build_summary_message(summary: str) -> Dict[str, str]:
+    """Context message carrying the rolling summary, placed after the static system prompt"""
+    return {
+        "role": "system",
+        "content": f"""**ملخص المحادثة السابقة / Previous Conversation Summary:**
+{summary}
+
+استمر في الإجابة بناءً على المحادثة الحالية والسياق السابق.
+Continue responding based on current conversation and previous context."""
+    }
+
+
+def chat_message(message: Dict[str, str]) -> Dict[str, str]:
+    """History entry as sent to OpenAI (drops bookkeeping keys such as token_count)"""
+    return {"role": message["role"], "content": message["content"]}
+
+
+def build_recall_message(recalled: List[Dict[str, str]]) -> Dict[str, str]:
+    """Context message carrying older messages recalled from the memory index"""
+    recalled_text = "\n".join(f"{msg['role']}: {msg['content']}" for msg in recalled)
+    return {
+        "role": "system",
+        "content": f"""**رسائل سابقة ذات صلة من هذه المحادثة / Relevant earlier messages from this conversation:**
+{recalled_text}"""
+    }
+
 
 class ConversationMemory:
     """Manages conversation history with sliding window and summarization"""
     
-    def __init__(self, window_size: int = 30):
+    def __init__(self, window_size: int = 30, token_budget: Optional[int] = None):
         """
         Initialize conversation memory manager
         
         Args:
-            window_size: Number of recent messages to keep in direct context (default: 30)
+            window_size: Maximum number of recent messages kept in direct context (default: 30)
+            token_budget: Maximum tokens of recent messages kept in direct context
+                (None: limit by message count only)
         """
         self.window_size = window_size
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.token_budget = token_budget
+    
+    def window_start(self, messages: List[T]) -> int:
+        """
+        Index of the oldest message that still fits the window
+        
+        Walks back from the newest message until either the message count or
+        the token budget is reached. Token counts come from the stored
+        `token_count` (Message rows or message dicts), so nothing is re-tokenized.
+        """
+        start = max(0, len(messages) - self.window_size)
+        if self.token_budget is None:
+            return start
+        used = 0
+        for index in range(len(messages) - 1, start - 1, -1):
+            used += message_tokens(messages[index])
+            if used > self.token_budget:
+                return index + 1
+        return start
         
     def should_summarize(self, conversation_history: List[Dict[str, str]]) -> bool:
         """
@@ -35,9 +92,24 @@ class ConversationMemory:
             conversation_history: List of message dicts with 'role' and 'content'
             
         Returns:
-            True if history exceeds window size and needs summarization
+            True if history exceeds the window (message count or token budget)
         """
-        return len(conversation_history) > self.window_size
+        return self.window_start(conversation_history) > 0
+    
+    def split_window(self, messages: List[T]) -> Tuple[List[T], List[T]]:
+        """
+        Split messages into (evicted, recent) around the window
+        
+        Returns:
+            Messages that fall out of the window, and the most recent messages
+            that fit it
+        """
+        start = self.window_start(messages)
+        return messages[:start], messages[start:]
+    
+    def history_tokens(self, messages: List[T]) -> int:
+        """Context tokens of the given messages (from their stored counts)"""
+        return sum(message_tokens(msg) for msg in messages)
     
     async def summarize_old_messages(
         self, 
@@ -52,12 +124,39 @@ class ConversationMemory:
         Returns:
             Arabic summary string
         """
+        summary = await self.update_summary(None, messages_to_summarize)
+        # Fallback: return simple truncation notice
+        return summary if summary is not None else SUMMARY_FALLBACK
+    
+    async def update_summary(
+        self,
+        previous_summary: Optional[str],
+        new_messages: List[Dict[str, str]]
+    ) -> Optional[str]:
+        """
+        Fold messages into an existing summary (incremental summarization)
+        
+        Args:
+            previous_summary: Summary of everything before `new_messages` (None if none yet)
+            new_messages: Messages that just left the context window
+            
+        Returns:
+            Updated Arabic summary, or None if summarization failed (the caller
+            keeps the previous summary and retries with the same messages later)
+        """
         # Build conversation text for summarization
         conversation_text = "\n".join([
             f"{msg['role']}: {msg['content']}" 
-            for msg in messages_to_summarize
+            for msg in new_messages
         ])
         
+        previous_section = ""
+        if previous_summary:
+            previous_section = f"""
+الملخص الحالي للمحادثة (حدّثه بالرسائل الجديدة ولا تحذف منه معلومات طبية مهمة):
+{previous_summary}
+"""
+        
         summarization_prompt = f"""أنت مساعد طبي ذكي. يُرجى تلخيص هذه المحادثة السابقة في فقرة واحدة موجزة بالعربية، 
 مع الحفاظ على:
 1. الأعراض أو الحالات الطبية المذكورة
@@ -66,15 +165,15 @@ class ConversationMemory:
 4. المصادر الطبية المستخدمة
 
 كن موجزاً ولا تتجاوز 150 كلمة.
-
+{previous_section}
 المحادثة السابقة:
 {conversation_text}
 
 الملخص بالعربية:"""
 
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = await get_openai_client().chat.completions.create(
+                model=settings.SUMMARIZATION_MODEL,
                 messages=[
                     {"role": "user", "content": summarization_prompt}
                 ],
@@ -86,46 +185,56 @@ class ConversationMemory:
             
             # Log summarization for monitoring
             logger.info(
-                f"Summarized {len(messages_to_summarize)} messages "
+                f"Summarized {len(new_messages)} messages "
+                f"({'incremental' if previous_summary else 'initial'}) "
                 f"into {len(summary.split())} words"
             )
             
             # Log cost
             if response.usage:
-                from app.utils.cost_calculator import log_ai_cost
+                from app.utils.cost_calculator import log_ai_cost, cached_prompt_tokens
                 log_ai_cost(
-                    model="gpt-4o-mini",
+                    model=settings.SUMMARIZATION_MODEL,
                     input_tokens=response.usage.prompt_tokens,
                     output_tokens=response.usage.completion_tokens,
-                    context="Conversation Summarization"
+                    context="Conversation Summarization",
+                    cached_tokens=cached_prompt_tokens(response.usage)
                 )
             
             return summary
             
         except Exception as e:
             logger.error(f"Summarization failed: {str(e)}")
-            # Fallback: return simple truncation notice
-            return "محادثة سابقة تحتوي على معلومات طبية عامة."
+            return None
     
     async def process_conversation_history(
         self,
         conversation_history: List[Dict[str, str]],
-        system_prompt: str
+        system_prompt: str,
+        summary: Optional[str] = None,
+        recalled: Optional[List[Dict[str, str]]] = None
     ) -> List[Dict[str, str]]:
         """
         Process conversation history with sliding window and summarization
         
         Args:
-            conversation_history: Full conversation history
+            conversation_history: Conversation history (the full history, or only
+                the messages after the persisted summary's watermark)
             system_prompt: Base system prompt
+            summary: Persisted summary of the messages before `conversation_history`
+            recalled: Older messages recalled from the memory index for this turn
             
         Returns:
             Optimized message list for OpenAI API
         """
-        # If conversation is short, return as-is with system prompt
+        # Short history: return as-is with system prompt (and the stored summary, if any)
         if not self.should_summarize(conversation_history):
             messages = [{"role": "system", "content": system_prompt}]
-            messages.extend(conversation_history)
+            if summary:
+                messages.append(build_summary_message(summary))
+            if recalled:
+                messages.append(build_recall_message(recalled))
+            messages.extend(chat_message(msg) for msg in conversation_history)
             return messages
         
         # Trigger summarization for long conversations
@@ -135,26 +244,23 @@ class ConversationMemory:
         )
         
         # Split: old messages to summarize vs recent to keep
-        messages_to_summarize = conversation_history[:-self.window_size]
-        recent_messages = conversation_history[-self.window_size:]
+        messages_to_summarize, recent_messages = self.split_window(conversation_history)
         
-        # Get summary
-        summary = await self.summarize_old_messages(messages_to_summarize)
-        
-        # Build enhanced system prompt with summary
-        enhanced_system_prompt = f"""{system_prompt}
-
----
-**ملخص المحادثة السابقة / Previous Conversation Summary:**
-{summary}
----
-
-استمر في الإجابة بناءً على المحادثة الحالية والسياق السابق.
-Continue responding based on current conversation and previous context."""
+        # Get summary (folded into the stored one when there is one)
+        if summary:
+            summary = await self.update_summary(summary, messages_to_summarize) or summary
+        else:
+            summary = await self.summarize_old_messages(messages_to_summarize)
         
-        # Build final message list
-        messages = [{"role": "system", "content": enhanced_system_prompt}]
-        messages.extend(recent_messages)
+        # Build final message list. The static system prompt stays byte-identical
+        # across requests (OpenAI prefix caching); the summary goes after it.
+        messages = [
+            {"role": "system", "content": system_prompt},
+            build_summary_message(summary)
+        ]
+        if recalled:
+            messages.append(build_recall_message(recalled))
+        messages.extend(chat_message(msg) for msg in recent_messages)
         
         logger.info(
             f"Context optimized: {len(conversation_history)} messages "
@@ -167,9 +273,9 @@ Continue responding based on current conversation and previous context."""
 # Singleton instance for efficiency
 _memory_instance = None
 
-def get_conversation_memory(window_size: int = 30) -> ConversationMemory:
+def get_conversation_memory(window_size: int = 30, token_budget: Optional[int] = None) -> ConversationMemory:
     """Get or create conversation memory singleton"""
     global _memory_instance
     if _memory_instance is None:
-        _memory_instance = ConversationMemory(window_size=window_size)
+        _memory_instance = ConversationMemory(window_size=window_size, token_budget=token_budget)
     return _memory_instance
@@ -0,0 +1,292 @@
+"""Long-term conversation memory - retrieval over older messages
+
+Messages that leave the context window are embedded (by the summary worker,
+off the critical path) into a per-conversation index: one NumPy array of unit
+vectors plus the matching message ids, stored as a single row. Each turn embeds
+the new question, takes the top-k most similar older messages and sends those
+that fit MEMORY_RECALL_TOKEN_BUDGET along with the recent window.
+
+Unlike a 150-word summary, a detail mentioned 80 turns ago (a medication
+allergy) reaches the model verbatim when the current question is about it.
+
+1. HashingEmbedder: local, deterministic, no network (default; used in tests)
+2. OpenAIEmbedder: text-embedding-3-small with reduced dimensions
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import zlib
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.core.clients import get_openai_client
+from app.models.memory_index import ConversationMemoryIndex
+from app.models.message import Message
+from app.utils.text_normalizer import normalize_text
+from app.utils.token_counter import message_tokens
+
+logger = logging.getLogger(__name__)
+
+# Only the start of very long messages (pasted documents) is embedded
+MAX_EMBED_CHARS = 8000
+# Inputs per embeddings request
+EMBED_BATCH_SIZE = 64
+
+
+class HashingEmbedder:
+    """Signed feature hashing of words and character trigrams (no model, no network)"""
+
+    def __init__(self, dim: int = 512):
+        """
+        Args:
+            dim: Vector dimension
+        """
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[Tuple[str, float]]:
+        features = []
+        for word in normalize_text(text[:MAX_EMBED_CHARS]).split():
+            features.append((f"w:{word}", 1.0))
+            # Trigrams match inflected forms (الحساسية / حساسية, allergy / allergies)
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                features.append((f"c:{padded[i:i + 3]}", 0.5))
+        return features
+
+    def embed_one(self, text: str) -> np.ndarray:
+        """Unit vector of one text (zero vector for empty text)"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            # crc32 is stable across processes (unlike the salted built-in hash)
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 array of unit vectors (blocking)"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed_one(text) for text in texts])
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 array of unit vectors"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        # Hashing a batch of messages is CPU work: keep it off the event loop
+        return await asyncio.to_thread(self.embed_batch, texts)
+
+
+class OpenAIEmbedder:
+    """OpenAI embeddings API (shortened vectors keep the index compact)"""
+
+    def __init__(self, model: str = "text-embedding-3-small", dim: int = 512):
+        """
+        Args:
+            model: Embedding model
+            dim: Requested vector dimension
+        """
+        self.model = model
+        self.dim = dim
+        self.name = f"openai:{model}:{dim}"
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 array of unit vectors"""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        rows = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            batch = [text[:MAX_EMBED_CHARS] or " " for text in texts[start:start + EMBED_BATCH_SIZE]]
+            response = await get_openai_client().embeddings.create(
+                model=self.model,
+                input=batch,
+                dimensions=self.dim
+            )
+            rows.extend(item.embedding for item in response.data)
+            if response.usage:
+                from app.utils.cost_calculator import log_ai_cost
+                log_ai_cost(
+                    model=self.model,
+                    input_tokens=response.usage.prompt_tokens,
+                    output_tokens=0,
+                    context="Memory Embeddings"
+                )
+        vectors = np.asarray(rows, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class MemoryIndex:
+    """In-memory view of a conversation's index: message ids and their unit vectors"""
+
+    def __init__(self, message_ids: np.ndarray, vectors: np.ndarray):
+        self.message_ids = message_ids.astype(np.int64)
+        self.vectors = vectors.astype(np.float16)
+
+    @classmethod
+    def empty(cls, dim: int) -> "MemoryIndex":
+        return cls(np.zeros(0, dtype=np.int64), np.zeros((0, dim), dtype=np.float16))
+
+    @classmethod
+    def from_row(cls, row: ConversationMemoryIndex) -> "MemoryIndex":
+        """Decode the stored arrays"""
+        message_ids = np.frombuffer(row.message_ids, dtype=np.int64)
+        vectors = np.frombuffer(row.vectors, dtype=np.float16).reshape(len(message_ids), -1)
+        return cls(message_ids, vectors)
+
+    def __len__(self) -> int:
+        return len(self.message_ids)
+
+    def extend(self, message_ids: Sequence[int], vectors: np.ndarray) -> "MemoryIndex":
+        """New index with the given messages appended"""
+        return MemoryIndex(
+            np.concatenate([self.message_ids, np.asarray(message_ids, dtype=np.int64)]),
+            np.concatenate([self.vectors, vectors.astype(np.float16)])
+        )
+
+    def search(self, query: np.ndarray, top_k: int, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Most similar messages to a query vector
+
+        Returns:
+            (message id, cosine similarity) pairs, best first
+        """
+        if not len(self) or top_k <= 0:
+            return []
+        scores = self.vectors.astype(np.float32) @ query.astype(np.float32)
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [(int(self.message_ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+async def pending_messages(
+    db: AsyncSession,
+    conversation_id: int,
+    through_message_id: int,
+    embedder
+) -> Tuple[MemoryIndex, Optional[int], List[Message]]:
+    """
+    Messages up to `through_message_id` that are not in the index yet
+
+    An index built by another embedder is rebuilt from scratch.
+
+    Returns:
+        (current index, its indexed_through_message_id or None, messages to embed)
+    """
+    row = await db.get(ConversationMemoryIndex, conversation_id)
+    index, indexed_through = MemoryIndex.empty(embedder.dim), None
+    if row is not None and row.embedder == embedder.name:
+        index, indexed_through = MemoryIndex.from_row(row), row.indexed_through_message_id
+
+    query = select(Message).where(
+        Message.conversation_id == conversation_id,
+        Message.id <= through_message_id
+    )
+    if indexed_through is not None:
+        query = query.where(Message.id > indexed_through)
+    messages = list((await db.scalars(query.order_by(Message.id))).all())
+    return index, (row.indexed_through_message_id if row is not None else None), messages
+
+
+async def store_index(
+    db: AsyncSession,
+    conversation_id: int,
+    index: MemoryIndex,
+    embedder_name: str,
+    through_message_id: int,
+    previous_through: Optional[int]
+) -> bool:
+    """
+    Save an extended index (the caller commits)
+
+    Optimistic: nothing is written if another worker stored a newer index since
+    `previous_through` was read.
+
+    Returns:
+        True if the index was stored
+    """
+    values = {
+        "embedder": embedder_name,
+        "message_ids": index.message_ids.tobytes(),
+        "vectors": index.vectors.tobytes(),
+        "indexed_through_message_id": through_message_id
+    }
+    if previous_through is None:
+        # First index of the conversation: must be the first write of the transaction
+        db.add(ConversationMemoryIndex(conversation_id=conversation_id, **values))
+        try:
+            await db.flush()
+            return True
+        except IntegrityError:
+            await db.rollback()
+            return False
+    result = await db.execute(
+        update(ConversationMemoryIndex)
+        .where(
+            ConversationMemoryIndex.conversation_id == conversation_id,
+            ConversationMemoryIndex.indexed_through_message_id == previous_through
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+async def recall_messages(
+    db: AsyncSession,
+    conversation_id: int,
+    query: str,
+    top_k: int,
+    token_budget: int,
+    min_score: float = 0.0
+) -> List[Message]:
+    """
+    Older messages relevant to the query, within a token budget
+
+    Returns:
+        Recalled messages in chronological order (empty without an index)
+    """
+    embedder = get_embedder()
+    row = await db.get(ConversationMemoryIndex, conversation_id)
+    if row is None or row.embedder != embedder.name:
+        return []
+
+    query_vector = (await embedder.embed([query]))[0]
+    hits = MemoryIndex.from_row(row).search(query_vector, top_k, min_score)
+    if not hits:
+        return []
+
+    by_id: Dict[int, Message] = {
+        msg.id: msg
+        for msg in await db.scalars(select(Message).where(Message.id.in_([message_id for message_id, _ in hits])))
+    }
+    recalled, used = [], 0
+    for message_id, score in hits:
+        msg = by_id.get(message_id)
+        if msg is None:
+            continue
+        tokens = message_tokens(msg)
+        if used + tokens > token_budget:
+            continue
+        recalled.append(msg)
+        used += tokens
+
+    logger.info(f"Recalled {len(recalled)} older messages ({used} tokens) for ConvID: {conversation_id}")
+    return sorted(recalled, key=lambda msg: msg.id)
+
+
+# Singleton instance
+_embedder_instance = None
+
+def get_embedder():
+    """Get or create the configured embedder (MEMORY_EMBEDDER)"""
+    global _embedder_instance
+    if _embedder_instance is None:
+        if settings.MEMORY_EMBEDDER == "openai":
+            _embedder_instance = OpenAIEmbedder(settings.MEMORY_EMBEDDING_MODEL, settings.MEMORY_EMBEDDING_DIM)
+        else:
+            _embedder_instance = HashingEmbedder(settings.MEMORY_EMBEDDING_DIM)
+    return _embedder_instance
@@ -0,0 +1,218 @@
+"""Search Cache - medical_search results with stale-while-revalidate
+
+The same searches ("diabetes symptoms", "أعراض السكري") reach DuckDuckGo over
+and over, each costing seconds and counting against its rate limits. Results
+are cached on (normalized query, timelimit) in two tiers:
+1. An in-process LRU
+2. An optional SQLite file shared by all workers on the host
+   (SEARCH_CACHE_SQLITE_PATH); a hit there is promoted into the LRU
+
+Entries are fresh for a TTL that depends on the timelimit (a "past day" search
+goes stale much sooner than an unrestricted one). For one more TTL after that,
+the stale entry is still served and SearchTool refreshes it in the background.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from app.config import settings
+from app.utils.text_normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Freshness per ddgs timelimit (d/w/m/y); unrestricted searches use SEARCH_CACHE_TTL_SECONDS
+TIMELIMIT_TTL_SECONDS = {
+    "d": 1800.0,
+    "w": 3 * 3600.0,
+    "m": 12 * 3600.0,
+    "y": 24 * 3600.0,
+}
+
+# Lookup states (also reported to the client in the done event)
+CACHE_HIT = "hit"
+CACHE_STALE = "stale"
+CACHE_MISS = "miss"
+
+
+class SearchCache:
+    """Two-tier (LRU + optional shared SQLite) cache of search results"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 259200.0, sqlite_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Size of the in-process LRU tier
+            ttl_seconds: Freshness of searches without a timelimit
+            sqlite_path: Shared SQLite tier (None/empty: in-process only)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path or None
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+        if self.sqlite_path:
+            Path(self.sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS search_cache ("
+                    "key TEXT PRIMARY KEY, payload TEXT NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+                )
+            finally:
+                conn.close()
+
+    @staticmethod
+    def make_key(query: str, timelimit: Optional[str]) -> Optional[str]:
+        """
+        Build the cache key for a search
+
+        Returns:
+            Hex digest, or None when the query normalizes to nothing
+        """
+        normalized = normalize_text(query)
+        if not normalized:
+            return None
+        return hashlib.sha256(f"{timelimit or ''}|{normalized}".encode("utf-8")).hexdigest()
+
+    def ttl_for(self, timelimit: Optional[str]) -> float:
+        """Freshness of a search with the given timelimit"""
+        return TIMELIMIT_TTL_SECONDS.get(timelimit, self.ttl_seconds)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.sqlite_path, timeout=5.0, isolation_level=None)
+
+    def _run(self, fn, *args):
+        """Run a blocking SQLite operation in the default thread pool"""
+        def call():
+            conn = self._connect()
+            try:
+                return fn(conn, *args)
+            finally:
+                conn.close()
+        return asyncio.to_thread(call)
+
+    def _read_shared(self, conn: sqlite3.Connection, key: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute(
+            "SELECT payload, stored_at FROM search_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return {"result": json.loads(row[0]), "stored_at": row[1]}
+
+    def _write_shared(self, conn: sqlite3.Connection, key: str, payload: str, stored_at: float, expires_at: float) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (stored_at,))
+        conn.execute(
+            "INSERT OR REPLACE INTO search_cache (key, payload, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, payload, stored_at, expires_at)
+        )
+        conn.execute("COMMIT")
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, query: str, timelimit: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Look up cached results
+
+        Returns:
+            (cached result dict, CACHE_HIT / CACHE_STALE), or (None, CACHE_MISS)
+        """
+        key = self.make_key(query, timelimit)
+        if key is None:
+            self.misses += 1
+            return None, CACHE_MISS
+
+        ttl = self.ttl_for(timelimit)
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry["stored_at"] >= 2 * ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None and self.sqlite_path:
+            try:
+                entry = await self._run(self._read_shared, key)
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache read failed: {str(e)}")
+                entry = None
+            if entry is not None:
+                self.shared_hits += 1
+                self._remember(key, entry)
+        if entry is None:
+            self.misses += 1
+            return None, CACHE_MISS
+
+        self._entries.move_to_end(key)
+        if now - entry["stored_at"] < ttl:
+            self.hits += 1
+            return entry["result"], CACHE_HIT
+        self.stale_hits += 1
+        return entry["result"], CACHE_STALE
+
+    async def put(self, query: str, timelimit: Optional[str], result: Dict[str, Any]) -> bool:
+        """
+        Store search results (a JSON-serializable dict)
+
+        Returns:
+            True if the results were cached
+        """
+        key = self.make_key(query, timelimit)
+        if key is None:
+            return False
+
+        stored_at = time.time()
+        self._remember(key, {"result": result, "stored_at": stored_at})
+        if self.sqlite_path:
+            try:
+                payload = json.dumps(result, ensure_ascii=False)
+                await self._run(self._write_shared, key, payload, stored_at, stored_at + 2 * self.ttl_for(timelimit))
+            except sqlite3.Error as e:
+                logger.warning(f"Search cache write failed: {str(e)}")
+        return True
+
+    def clear(self) -> None:
+        """Drop the in-process entries"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "shared": bool(self.sqlite_path),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
+
+
+# Singleton instance
+_search_cache_instance = None
+
+def get_search_cache() -> SearchCache:
+    """Get or create the search cache singleton"""
+    global _search_cache_instance
+    if _search_cache_instance is None:
+        _search_cache_instance = SearchCache(
+            max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+            sqlite_path=settings.SEARCH_CACHE_SQLITE_PATH
+        )
+        logger.info(f"Search cache: LRU {settings.SEARCH_CACHE_MAX_ENTRIES} entries, shared tier: {settings.SEARCH_CACHE_SQLITE_PATH or 'off'}")
+    return _search_cache_instance
@@ -0,0 +1,373 @@
+"""Stream Buffer - resumable chat streams
+
+Every streamed answer is written frame by frame into a bounded ring buffer
+with sequential ids. The HTTP response only tails that buffer, so a client that
+loses its connection can reconnect with `Last-Event-ID: <stream_id>:<seq>` and
+continue from where it stopped, whether the generation is still running or has
+already finished.
+
+Two backends:
+1. InMemoryStreamStore - per-process, wakes waiting readers immediately
+2. SQLiteStreamStore - a SQLite file shared by all workers on one host, so a
+   reconnect routed to another worker can still resume. Streams are not shared
+   across hosts: a multi-host deployment needs sticky sessions for resumes
+
+Readers heartbeat the stream while attached; the producer uses the last
+heartbeat to decide when nobody is listening any more.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import asyncio
+import logging
+import sqlite3
+import time
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (seq, encoded SSE frame)
+BufferedEvent = Tuple[int, bytes]
+
+
+def format_event_id(stream_id: str, seq: int) -> str:
+    """SSE event id for a buffered frame"""
+    return f"{stream_id}:{seq}"
+
+
+def parse_event_id(event_id: str) -> Optional[Tuple[str, int]]:
+    """
+    Parse a Last-Event-ID header value
+
+    Returns:
+        (stream_id, seq) or None if the value is malformed
+    """
+    stream_id, _, seq = (event_id or "").strip().rpartition(":")
+    if not stream_id or not seq.isdigit():
+        return None
+    return stream_id, int(seq)
+
+
+class StreamBufferStore(ABC):
+    """Interface shared by the stream buffer backends"""
+
+    def __init__(self, max_events: int = 2000, ttl_seconds: float = 300.0):
+        """
+        Args:
+            max_events: Ring buffer size per stream (older frames are dropped)
+            ttl_seconds: How long a finished stream stays resumable, and how long
+                an unfinished one may go without a new frame before it is dropped
+                (its producer crashed or was cancelled without finishing it)
+        """
+        self.max_events = max_events
+        self.ttl_seconds = ttl_seconds
+
+    @abstractmethod
+    async def create(self, stream_id: str, owner: str) -> None:
+        """Start a new stream (expired streams are purged)"""
+        pass
+
+    @abstractmethod
+    async def append(self, stream_id: str, frame: bytes) -> int:
+        """
+        Append an encoded frame; returns its sequence number
+
+        Raises:
+            asyncio.CancelledError: The stream no longer exists (expired), so
+                the producer stops as if its client had gone away
+        """
+        pass
+
+    @abstractmethod
+    async def finish(self, stream_id: str) -> None:
+        """Mark the stream complete (no more frames will be appended)"""
+        pass
+
+    @abstractmethod
+    async def get_owner(self, stream_id: str) -> Optional[str]:
+        """Owner of the stream, or None if it does not exist (or expired)"""
+        pass
+
+    @abstractmethod
+    async def read(self, stream_id: str, after_seq: int) -> Optional[Tuple[List[BufferedEvent], bool]]:
+        """
+        Frames after `after_seq` and whether the stream is finished
+
+        Returns:
+            None if the stream is unknown or `after_seq` fell out of the ring buffer
+        """
+        pass
+
+    @abstractmethod
+    async def touch(self, stream_id: str) -> None:
+        """Reader heartbeat"""
+        pass
+
+    @abstractmethod
+    async def last_seen(self, stream_id: str) -> Optional[float]:
+        """Time (time.time()) of the last reader heartbeat"""
+        pass
+
+    async def wait(self, stream_id: str, after_seq: int, timeout: float) -> None:
+        """Wait until frames after `after_seq` may be available (or timeout)"""
+        await asyncio.sleep(min(timeout, settings.STREAM_BUFFER_POLL_SECONDS))
+
+
+class _MemoryStream:
+    """State of one buffered stream in the in-memory backend"""
+
+    def __init__(self, owner: str, max_events: int):
+        self.owner = owner
+        self.frames: deque = deque(maxlen=max_events)
+        self.next_seq = 1
+        self.finished = False
+        self.last_seen = time.time()
+        self.updated_at = time.time()
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake every reader waiting for new frames"""
+        self.updated_at = time.time()
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class InMemoryStreamStore(StreamBufferStore):
+    """Per-process ring buffers (single worker deployments)"""
+
+    def __init__(self, max_events: int = 2000, ttl_seconds: float = 300.0):
+        super().__init__(max_events, ttl_seconds)
+        self._streams: Dict[str, _MemoryStream] = {}
+
+    def _purge_expired(self) -> None:
+        # Finished or not: an unfinished stream without a frame for a whole TTL
+        # has lost its producer and would otherwise stay in memory forever
+        cutoff = time.time() - self.ttl_seconds
+        for stream_id in [sid for sid, s in self._streams.items() if s.updated_at < cutoff]:
+            del self._streams[stream_id]
+
+    async def create(self, stream_id: str, owner: str) -> None:
+        self._purge_expired()
+        self._streams[stream_id] = _MemoryStream(owner, self.max_events)
+
+    async def append(self, stream_id: str, frame: bytes) -> int:
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            logger.warning(f"Stream {stream_id} expired while its producer was running")
+            raise asyncio.CancelledError()
+        seq = stream.next_seq
+        stream.frames.append((seq, frame))
+        stream.next_seq += 1
+        stream.notify()
+        return seq
+
+    async def finish(self, stream_id: str) -> None:
+        stream = self._streams.get(stream_id)
+        if stream is not None:
+            stream.finished = True
+            stream.notify()
+
+    async def get_owner(self, stream_id: str) -> Optional[str]:
+        stream = self._streams.get(stream_id)
+        return stream.owner if stream is not None else None
+
+    async def read(self, stream_id: str, after_seq: int) -> Optional[Tuple[List[BufferedEvent], bool]]:
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            return None
+        if stream.frames and after_seq < stream.frames[0][0] - 1:
+            return None
+        return [event for event in stream.frames if event[0] > after_seq], stream.finished
+
+    async def touch(self, stream_id: str) -> None:
+        stream = self._streams.get(stream_id)
+        if stream is not None:
+            stream.last_seen = time.time()
+
+    async def last_seen(self, stream_id: str) -> Optional[float]:
+        stream = self._streams.get(stream_id)
+        return stream.last_seen if stream is not None else None
+
+    async def wait(self, stream_id: str, after_seq: int, timeout: float) -> None:
+        stream = self._streams.get(stream_id)
+        if stream is None or stream.finished or stream.next_seq - 1 > after_seq:
+            return
+        try:
+            await asyncio.wait_for(stream.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class SQLiteStreamStore(StreamBufferStore):
+    """
+    Ring buffers in a SQLite file shared by all workers on one host
+
+    The file lives on local disk, so only workers of the same host see each
+    other's streams. Each store keeps one connection, owned by a dedicated
+    thread that runs every operation in order.
+    """
+
+    def __init__(self, path: str, max_events: int = 2000, ttl_seconds: float = 300.0):
+        super().__init__(max_events, ttl_seconds)
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-buffer")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor.submit(self._setup).result()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Only ever called on the store thread, which owns the connection
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        return self._conn
+
+    def _setup(self) -> None:
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream_buffers ("
+            "stream_id TEXT PRIMARY KEY, owner TEXT NOT NULL, next_seq INTEGER NOT NULL, "
+            "finished INTEGER NOT NULL DEFAULT 0, last_seen REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stream_events ("
+            "stream_id TEXT NOT NULL, seq INTEGER NOT NULL, frame BLOB NOT NULL, "
+            "PRIMARY KEY (stream_id, seq))"
+        )
+
+    def _run(self, fn, *args):
+        """Run a blocking SQLite operation on the store thread"""
+        def call():
+            conn = self._connection()
+            try:
+                return fn(conn, *args)
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        return asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    def close(self) -> None:
+        """Close the connection and stop the store thread"""
+        def close_connection():
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        self._executor.submit(close_connection).result()
+        self._executor.shutdown()
+
+    def _create(self, conn: sqlite3.Connection, stream_id: str, owner: str) -> None:
+        now = time.time()
+        cutoff = now - self.ttl_seconds
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "DELETE FROM stream_events WHERE stream_id IN "
+            "(SELECT stream_id FROM stream_buffers WHERE updated_at < ?)", (cutoff,)
+        )
+        conn.execute("DELETE FROM stream_buffers WHERE updated_at < ?", (cutoff,))
+        conn.execute(
+            "INSERT OR REPLACE INTO stream_buffers (stream_id, owner, next_seq, finished, last_seen, updated_at) "
+            "VALUES (?, ?, 1, 0, ?, ?)", (stream_id, owner, now, now)
+        )
+        conn.execute("COMMIT")
+
+    def _append(self, conn: sqlite3.Connection, stream_id: str, frame: bytes) -> Optional[int]:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT next_seq FROM stream_buffers WHERE stream_id = ?", (stream_id,)
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        (seq,) = row
+        conn.execute("INSERT INTO stream_events (stream_id, seq, frame) VALUES (?, ?, ?)", (stream_id, seq, frame))
+        conn.execute(
+            "DELETE FROM stream_events WHERE stream_id = ? AND seq <= ?", (stream_id, seq - self.max_events)
+        )
+        conn.execute(
+            "UPDATE stream_buffers SET next_seq = ?, updated_at = ? WHERE stream_id = ?",
+            (seq + 1, time.time(), stream_id)
+        )
+        conn.execute("COMMIT")
+        return seq
+
+    def _read(self, conn: sqlite3.Connection, stream_id: str, after_seq: int):
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(
+                "SELECT finished FROM stream_buffers WHERE stream_id = ?", (stream_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            (first_seq,) = conn.execute(
+                "SELECT MIN(seq) FROM stream_events WHERE stream_id = ?", (stream_id,)
+            ).fetchone()
+            if first_seq is not None and after_seq < first_seq - 1:
+                return None
+            events = conn.execute(
+                "SELECT seq, frame FROM stream_events WHERE stream_id = ? AND seq > ? ORDER BY seq",
+                (stream_id, after_seq)
+            ).fetchall()
+            return [(seq, bytes(frame)) for seq, frame in events], bool(row[0])
+        finally:
+            conn.execute("COMMIT")
+
+    async def create(self, stream_id: str, owner: str) -> None:
+        await self._run(self._create, stream_id, owner)
+
+    async def append(self, stream_id: str, frame: bytes) -> int:
+        seq = await self._run(self._append, stream_id, frame)
+        if seq is None:
+            logger.warning(f"Stream {stream_id} expired while its producer was running")
+            raise asyncio.CancelledError()
+        return seq
+
+    async def finish(self, stream_id: str) -> None:
+        await self._run(lambda conn: conn.execute(
+            "UPDATE stream_buffers SET finished = 1, updated_at = ? WHERE stream_id = ?", (time.time(), stream_id)
+        ))
+
+    async def get_owner(self, stream_id: str) -> Optional[str]:
+        row = await self._run(lambda conn: conn.execute(
+            "SELECT owner FROM stream_buffers WHERE stream_id = ?", (stream_id,)
+        ).fetchone())
+        return row[0] if row else None
+
+    async def read(self, stream_id: str, after_seq: int) -> Optional[Tuple[List[BufferedEvent], bool]]:
+        return await self._run(self._read, stream_id, after_seq)
+
+    async def touch(self, stream_id: str) -> None:
+        await self._run(lambda conn: conn.execute(
+            "UPDATE stream_buffers SET last_seen = ? WHERE stream_id = ?", (time.time(), stream_id)
+        ))
+
+    async def last_seen(self, stream_id: str) -> Optional[float]:
+        row = await self._run(lambda conn: conn.execute(
+            "SELECT last_seen FROM stream_buffers WHERE stream_id = ?", (stream_id,)
+        ).fetchone())
+        return row[0] if row else None
+
+
+# Singleton instance
+_stream_store_instance = None
+
+def get_stream_store() -> StreamBufferStore:
+    """Get or create the configured stream buffer backend"""
+    global _stream_store_instance
+    if _stream_store_instance is None:
+        if settings.STREAM_BUFFER_BACKEND == "sqlite":
+            _stream_store_instance = SQLiteStreamStore(
+                settings.STREAM_BUFFER_SQLITE_PATH,
+                max_events=settings.STREAM_BUFFER_MAX_EVENTS,
+                ttl_seconds=settings.STREAM_BUFFER_TTL_SECONDS
+            )
+        else:
+            _stream_store_instance = InMemoryStreamStore(
+                max_events=settings.STREAM_BUFFER_MAX_EVENTS,
+                ttl_seconds=settings.STREAM_BUFFER_TTL_SECONDS
+            )
+        logger.info(f"Stream buffer backend: {type(_stream_store_instance).__name__}")
+    return _stream_store_instance
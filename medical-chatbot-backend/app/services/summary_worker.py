@@ -0,0 +1,207 @@
+"""Summary Worker - long-term memory updates off the critical path
+
+After an answer has been streamed (`done` sent), the chat endpoint schedules
+the conversation here. The worker folds the messages that will no longer fit
+the next turn's context window into long-term memory, so the next request
+finds it ready and never waits on a summarization or embedding call:
+- LONG_TERM_MEMORY="retrieval": the messages are added to the conversation's
+  memory index (app/services/memory_index.py)
+- LONG_TERM_MEMORY="summary": they are folded into the persisted rolling summary
+
+1. Scheduling a conversation that is already queued is coalesced into the
+   queued job (each job reads the latest state from the database)
+2. A conversation scheduled while it is being updated runs once more
+   afterwards, never concurrently with itself
+3. The database session is closed during the LLM / embeddings call
+"""
+
+from typing import Dict, List, Set
+import asyncio
+import logging
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.conversation import Conversation
+from app.core.messages import load_unsummarized_messages, save_summary, advance_watermark
+from app.services.conversation_memory import get_conversation_memory
+from app.services.memory_index import get_embedder, pending_messages, store_index
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryWorker:
+    """Background queue of conversations whose long-term memory needs updating"""
+
+    def __init__(self, concurrency: int = 2):
+        """
+        Args:
+            concurrency: Number of memory updates that may run at once
+        """
+        self.concurrency = concurrency
+        self._queue: "asyncio.Queue[int]" = None
+        self._queued: Set[int] = set()
+        self._running: Set[int] = set()
+        self._dirty: Set[int] = set()
+        self._tasks: List[asyncio.Task] = []
+        self.scheduled = 0
+        self.coalesced = 0
+        self.runs = 0
+        self.updated = 0
+        self.failures = 0
+
+    def start(self) -> None:
+        """Start the worker tasks (idempotent; call from the event loop)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+        logger.info(f"Summary worker started ({self.concurrency} tasks)")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks; unfinished jobs are picked up again on the next turn"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queued.clear()
+        self._running.clear()
+        self._dirty.clear()
+
+    def schedule(self, conversation_id: int) -> None:
+        """Queue a memory update for the conversation (coalesced with pending ones)"""
+        if not self._tasks:
+            self.start()
+        self.scheduled += 1
+        if conversation_id in self._running:
+            # Re-run after the current job: it may have read the state before the newest messages
+            if conversation_id in self._dirty:
+                self.coalesced += 1
+            self._dirty.add(conversation_id)
+            return
+        if conversation_id in self._queued:
+            self.coalesced += 1
+            return
+        self._queued.add(conversation_id)
+        self._queue.put_nowait(conversation_id)
+
+    async def _work(self) -> None:
+        while True:
+            conversation_id = await self._queue.get()
+            self._queued.discard(conversation_id)
+            self._running.add(conversation_id)
+            try:
+                self.runs += 1
+                if await self.fold(conversation_id):
+                    self.updated += 1
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Background memory update failed (ConvID: {conversation_id}): {str(e)}")
+            finally:
+                self._running.discard(conversation_id)
+                if conversation_id in self._dirty:
+                    self._dirty.discard(conversation_id)
+                    self._queued.add(conversation_id)
+                    self._queue.put_nowait(conversation_id)
+
+    async def fold(self, conversation_id: int) -> bool:
+        """
+        Fold the messages that fall out of the window into long-term memory
+
+        Returns:
+            True if the memory was updated
+        """
+        if settings.LONG_TERM_MEMORY == "retrieval":
+            return await self.index(conversation_id)
+        return await self.summarize(conversation_id)
+
+    async def index(self, conversation_id: int) -> bool:
+        """
+        Embed the messages that fall out of the window into the memory index
+
+        Returns:
+            True if the index was extended
+        """
+        memory = get_conversation_memory(
+            window_size=settings.CONVERSATION_WINDOW_SIZE, token_budget=settings.CONTEXT_TOKEN_BUDGET
+        )
+        embedder = get_embedder()
+        async with AsyncSessionLocal() as db:
+            conversation = await db.get(Conversation, conversation_id)
+            if conversation is None:
+                return False
+            evicted, _ = memory.split_window(await load_unsummarized_messages(db, conversation))
+            if not evicted:
+                return False
+            through_message_id = evicted[-1].id
+            index, previous_through, messages = await pending_messages(db, conversation_id, through_message_id, embedder)
+
+        vectors = await embedder.embed([msg.content for msg in messages])
+        index = index.extend([msg.id for msg in messages], vectors)
+
+        async with AsyncSessionLocal() as db:
+            stored = await store_index(db, conversation_id, index, embedder.name, through_message_id, previous_through)
+            if not stored:
+                return False
+            await advance_watermark(db, conversation_id, through_message_id)
+            await db.commit()
+        logger.info(
+            f"Memory index updated in background (ConvID: {conversation_id}, "
+            f"{len(messages)} messages embedded, {len(index)} indexed)"
+        )
+        return True
+
+    async def summarize(self, conversation_id: int) -> bool:
+        """
+        Fold the messages that fall out of the window into the stored summary
+
+        Returns:
+            True if a new summary was stored
+        """
+        memory = get_conversation_memory(
+            window_size=settings.CONVERSATION_WINDOW_SIZE, token_budget=settings.CONTEXT_TOKEN_BUDGET
+        )
+        async with AsyncSessionLocal() as db:
+            conversation = await db.get(Conversation, conversation_id)
+            if conversation is None:
+                return False
+            evicted, _ = memory.split_window(await load_unsummarized_messages(db, conversation))
+            previous_summary = conversation.summary
+
+        if not evicted:
+            return False
+
+        summary = await memory.update_summary(
+            previous_summary,
+            [{"role": msg.role, "content": msg.content} for msg in evicted]
+        )
+        if summary is None:
+            self.failures += 1
+            return False
+
+        async with AsyncSessionLocal() as db:
+            stored = await save_summary(db, conversation_id, summary, evicted[-1].id)
+            await db.commit()
+        logger.info(f"Summary updated in background (ConvID: {conversation_id}, {len(evicted)} messages folded)")
+        return stored
+
+    def stats(self) -> Dict[str, int]:
+        """Worker counters for monitoring"""
+        return {
+            "pending": len(self._queued) + len(self._dirty),
+            "running": len(self._running),
+            "scheduled": self.scheduled,
+            "coalesced": self.coalesced,
+            "runs": self.runs,
+            "updated": self.updated,
+            "failures": self.failures
+        }
+
+
+# Singleton instance
+_summary_worker_instance = None
+
+def get_summary_worker() -> SummaryWorker:
+    """Get or create the summary worker singleton"""
+    global _summary_worker_instance
+    if _summary_worker_instance is None:
+        _summary_worker_instance = SummaryWorker(concurrency=settings.SUMMARY_WORKER_CONCURRENCY)
+    return _summary_worker_instance
@@ -10,6 +10,7 @@ class ToolResult(BaseModel):
     data: Any = None
     error: str = None
     sources: List[Dict[str, str]] = []
+    metadata: Dict[str, Any] = {}
 
 
 class BaseTool(ABC):
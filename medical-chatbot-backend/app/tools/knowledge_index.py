@@ -0,0 +1,322 @@
+"""Offline medical knowledge index - BM25 over approved-domain articles
+
+A local inverted index over a crawled corpus (WebTeb, MedlinePlus, ...) built
+by scripts/build_knowledge_index.py. medical_search answers from it in a few
+milliseconds and only falls back to live DuckDuckGo search when recall is poor.
+
+On-disk format (a directory, every array memory-mapped on load):
+- meta.json: corpus statistics and BM25 parameters
+- terms.npy: sorted uint64 term hashes
+- offsets.npy: int64 (n_terms + 1) start of each term's postings
+- postings_doc.npy / postings_tf.npy: int32 doc ids / uint16 term frequencies
+- doc_len.npy: int32 tokens per document
+- doc_priority.npy: int8 DOMAIN_PRIORITY of each document's domain
+- docs.jsonl + doc_offsets.npy: title/url/text per document, read by byte offset
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+import math
+import mmap
+import re
+import threading
+import numpy as np
+from app.config import settings
+from app.utils.constants import APPROVED_DOMAINS, DOMAIN_PRIORITY
+from app.utils.text_normalizer import normalize_text
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Characters of article text kept for snippets
+MAX_DOC_CHARS = 4000
+SNIPPET_CHARS = 300
+
+# Prefixes: definite article with attached conjunctions/prepositions (و ف ب ك ل)
+ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+# Suffixes after normalize_text (ة → ه): plurals, nisba, attached pronouns
+ARABIC_SUFFIXES = ("ات", "ون", "ين", "يه", "ها", "ه", "ي")
+
+STOPWORDS = {
+    # English
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i",
+    "in", "is", "it", "my", "of", "on", "or", "the", "to", "what", "when", "which", "who", "why", "with",
+    # Arabic (normalized)
+    "في", "من", "علي", "الي", "عن", "ما", "ماذا", "هل", "هو", "هي", "كيف", "متي", "لماذا", "او", "و",
+    "ان", "هذا", "هذه", "ذلك", "التي", "الذي", "مع", "عند", "كل", "لا", "لي", "انا",
+}
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?؟\n])\s+')
+
+
+def _stem(token: str) -> str:
+    """Light stemming: Arabic article/affixes and English plurals (keeps stems >= 3 chars)"""
+    if token.isascii():
+        if len(token) > 4 and token.endswith("ies"):
+            return token[:-3] + "y"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            return token[:-1]
+        return token
+    for prefix in ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            token = token[len(prefix):]
+            break
+    for suffix in ARABIC_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized, stemmed tokens without stopwords (Arabic and English)"""
+    return [
+        _stem(token) for token in normalize_text(text).split()
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a term"""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def domain_priority(url: str) -> int:
+    """DOMAIN_PRIORITY of a URL (999 for unknown domains)"""
+    for domain, priority in DOMAIN_PRIORITY.items():
+        if domain in url:
+            return priority
+    return 999
+
+
+class KnowledgeIndex:
+    """Memory-mapped BM25 index"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Index directory written by build()
+        """
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if self.meta.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported knowledge index version: {self.meta.get('version')}")
+
+        def load(name: str) -> np.ndarray:
+            return np.load(self.path / f"{name}.npy", mmap_mode="r")
+
+        self.terms = load("terms")
+        self.offsets = load("offsets")
+        self.postings_doc = load("postings_doc")
+        self.postings_tf = load("postings_tf")
+        self.doc_len = load("doc_len")
+        self.doc_priority = load("doc_priority")
+        self.doc_offsets = load("doc_offsets")
+        self.num_docs = int(self.meta["num_docs"])
+        self.avg_doc_len = float(self.meta["avg_doc_len"]) or 1.0
+        # BM25 length normalization is fixed per document: computed once
+        self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * np.asarray(self.doc_len, dtype=np.float32) / self.avg_doc_len)
+
+        self._docs_file = open(self.path / "docs.jsonl", "rb")
+        self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ) if self.num_docs else None
+
+    def __len__(self) -> int:
+        return self.num_docs
+
+    def close(self) -> None:
+        if self._docs is not None:
+            self._docs.close()
+        self._docs_file.close()
+
+    def document(self, doc_id: int) -> Dict[str, str]:
+        """Stored title/url/text of a document"""
+        start, end = int(self.doc_offsets[doc_id]), int(self.doc_offsets[doc_id + 1])
+        return json.loads(self._docs[start:end])
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        h = np.uint64(term_hash(term))
+        i = int(np.searchsorted(self.terms, h))
+        if i >= len(self.terms) or self.terms[i] != h:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.postings_doc[start:end], self.postings_tf[start:end]
+
+    def search(self, query: str, top_k: int = 8) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        BM25 search; equal scores are ordered by DOMAIN_PRIORITY
+
+        Returns:
+            (hits with doc_id, score, coverage (fraction of query terms matched),
+            priority, title, url, text; number of distinct query terms)
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or not self.num_docs:
+            return [], len(query_terms)
+
+        scores = np.zeros(self.num_docs, dtype=np.float32)
+        matched = np.zeros(self.num_docs, dtype=np.int16)
+        for term in query_terms:
+            docs, tfs = self._postings(term)
+            if not len(docs):
+                continue
+            idf = math.log(1 + (self.num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            tf = tfs.astype(np.float32)
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + self.length_norm[docs])
+            matched[docs] += 1
+
+        candidates = np.flatnonzero(matched)
+        if not len(candidates):
+            return [], len(query_terms)
+        # Rounded so near-identical scores fall back to the domain priority
+        order = np.lexsort((
+            candidates,
+            np.asarray(self.doc_priority, dtype=np.int16)[candidates],
+            -np.round(scores[candidates], 4)
+        ))[:top_k]
+
+        hits = []
+        for doc_id in candidates[order]:
+            doc = self.document(int(doc_id))
+            hits.append({
+                "doc_id": int(doc_id),
+                "score": float(scores[doc_id]),
+                "coverage": int(matched[doc_id]) / len(query_terms),
+                "priority": int(self.doc_priority[doc_id]),
+                **doc
+            })
+        return hits, len(query_terms)
+
+
+def make_snippet(text: str, query: str, max_chars: int = SNIPPET_CHARS) -> str:
+    """Sentence(s) of the text sharing the most terms with the query"""
+    query_terms = set(tokenize(query))
+    sentences = [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+    if not sentences:
+        return ""
+    best = max(range(len(sentences)), key=lambda i: (len(query_terms & set(tokenize(sentences[i]))), -i))
+    snippet = sentences[best]
+    for sentence in sentences[best + 1:]:
+        if len(snippet) + 1 + len(sentence) > max_chars:
+            break
+        snippet += " " + sentence
+    return snippet[:max_chars]
+
+
+def build(documents: Iterable[Dict[str, str]], path: str) -> Dict[str, Any]:
+    """
+    Build an index directory from documents ({"url", "title", "text"})
+
+    Documents outside APPROVED_DOMAINS, without text, or with a URL already
+    seen are skipped.
+
+    Returns:
+        The written meta.json content
+    """
+    out = Path(path)
+    out.mkdir(parents=True, exist_ok=True)
+
+    postings: Dict[int, List[Tuple[int, int]]] = {}
+    doc_len, doc_priority, doc_offsets = [], [], [0]
+    seen_urls = set()
+    skipped = 0
+
+    with open(out / "docs.jsonl", "wb") as docs_file:
+        for doc in documents:
+            url, title, text = doc.get("url") or "", doc.get("title") or "", doc.get("text") or ""
+            if not text.strip() or url in seen_urls or not any(domain in url for domain in APPROVED_DOMAINS):
+                skipped += 1
+                continue
+            seen_urls.add(url)
+
+            doc_id = len(doc_len)
+            tokens = tokenize(f"{title} {title} {text}")  # Title counted twice
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term_hash(term), []).append((doc_id, min(tf, 65535)))
+            doc_len.append(len(tokens))
+            doc_priority.append(min(domain_priority(url), 127))
+
+            line = json.dumps({"title": title, "url": url, "text": text[:MAX_DOC_CHARS]}, ensure_ascii=False).encode("utf-8") + b"\n"
+            docs_file.write(line)
+            doc_offsets.append(doc_offsets[-1] + len(line))
+
+    hashes = sorted(postings)
+    offsets = np.zeros(len(hashes) + 1, dtype=np.int64)
+    for i, h in enumerate(hashes):
+        offsets[i + 1] = offsets[i] + len(postings[h])
+    pairs = [pair for h in hashes for pair in postings[h]]
+
+    np.save(out / "terms.npy", np.array(hashes, dtype=np.uint64))
+    np.save(out / "offsets.npy", offsets)
+    np.save(out / "postings_doc.npy", np.array([d for d, _ in pairs], dtype=np.int32))
+    np.save(out / "postings_tf.npy", np.array([tf for _, tf in pairs], dtype=np.uint16))
+    np.save(out / "doc_len.npy", np.array(doc_len, dtype=np.int32))
+    np.save(out / "doc_priority.npy", np.array(doc_priority, dtype=np.int8))
+    np.save(out / "doc_offsets.npy", np.array(doc_offsets, dtype=np.int64))
+
+    meta = {
+        "version": INDEX_FORMAT_VERSION,
+        "num_docs": len(doc_len),
+        "num_terms": len(hashes),
+        "num_postings": len(pairs),
+        "avg_doc_len": (sum(doc_len) / len(doc_len)) if doc_len else 0.0,
+        "skipped": skipped
+    }
+    (out / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return meta
+
+
+# Singleton instance (None when no index has been built), reloaded when the index is rebuilt
+_index_instance = None
+_index_loaded = False
+_index_signature = None
+_index_lock = threading.Lock()
+
+
+def index_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Identity of a built index: (inode, mtime) of its meta.json, or None if there is none"""
+    try:
+        stat = (Path(path) / "meta.json").stat()
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def get_knowledge_index() -> Optional[KnowledgeIndex]:
+    """
+    Current knowledge index; returns None if disabled or not built
+
+    Every lookup stats meta.json (a blocking call: use it off the event loop).
+    The build script swaps in a new index directory, so a changed meta.json means
+    a rebuild and the new index is loaded. The previous one is not closed, since
+    searches may still be running on it; it is released when unreferenced.
+    """
+    global _index_instance, _index_loaded, _index_signature
+    path = settings.KNOWLEDGE_INDEX_PATH
+    signature = index_signature(path) if settings.KNOWLEDGE_INDEX_ENABLED and path else None
+    # Unchanged, or meta.json briefly missing while a rebuild is swapped in
+    if _index_loaded and (signature is None or signature == _index_signature):
+        return _index_instance
+
+    with _index_lock:
+        if _index_loaded and (signature is None or signature == _index_signature):
+            return _index_instance
+        reloading = _index_loaded
+        _index_loaded = True
+        if signature is None:
+            logger.info("No knowledge index found, medical_search uses live search only")
+            return None
+        # Not retried until the index changes again
+        _index_signature = signature
+        try:
+            _index_instance = KnowledgeIndex(path)
+            logger.info(f"Knowledge index {'reloaded' if reloading else 'loaded'} from {path} ({len(_index_instance)} documents)")
+        except Exception as e:
+            logger.error(f"Failed to load knowledge index from {path}: {str(e)}")
+    return _index_instance
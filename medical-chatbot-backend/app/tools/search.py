@@ -1,12 +1,39 @@
 """Robust search tool using DuckDuckGo library with WebTeb prioritization"""
-from typing import List, Dict
+from typing import Any, List, Dict, Optional
+from concurrent.futures import Future
+import asyncio
+import logging
+import threading
+import time
 from ddgs import DDGS
+from app.config import settings
+from app.core.clients import clients
+from app.services.search_cache import CACHE_MISS, CACHE_STALE, get_search_cache
 from app.tools.base import BaseTool, ToolResult
+from app.tools.knowledge_index import get_knowledge_index, make_snippet
 from app.utils.constants import APPROVED_DOMAINS, DOMAIN_PRIORITY
 
+logger = logging.getLogger(__name__)
+
+
 class SearchTool(BaseTool):
     """Medical search tool that prioritizes WebTeb, then searches other trusted sources"""
     
+    def __init__(self):
+        self.queries = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.refreshes = 0
+        self.index_answers = 0
+        self.index_fallbacks = 0
+        # ddgs calls still running after their caller timed out or was cancelled
+        # (a thread cannot be interrupted); decremented from the worker thread
+        self.abandoned_queries = 0
+        self.abandoned_running = 0
+        self._abandoned_lock = threading.Lock()
+        # Background refreshes of stale cache entries, one per cache key
+        self._refreshing: Dict[str, asyncio.Task] = {}
+    
     @property
     def name(self) -> str:
         return "medical_search"
@@ -46,72 +73,254 @@ class SearchTool(BaseTool):
                     return "MedlinePlus"
         return "Medical Source"
 
-    async def execute(self, query: str, timelimit: str = None) -> ToolResult:
+    def _ddgs_text(self, query: str, max_results: int, timelimit: Optional[str]) -> List[Dict]:
+        """Blocking ddgs query (runs on the search thread pool, never on the event loop)"""
+        # One client per call: DDGS instances are not shared between threads
+        with DDGS(timeout=max(1, int(settings.SEARCH_QUERY_TIMEOUT))) as ddgs:
+            return ddgs.text(query, max_results=max_results, timelimit=timelimit)
+
+    async def _run_query(self, label: str, query: str, max_results: int, timelimit: Optional[str]) -> Optional[List[Dict]]:
+        """
+        Run one search query off the event loop with its own timeout
+
+        Returns:
+            Raw results, or None if the query failed or timed out
+        """
+        self.queries += 1
+        started = time.perf_counter()
+        job = clients.get_search_executor().submit(self._ddgs_text, query, max_results, timelimit)
         try:
-            all_results = []
-            
-            with DDGS() as ddgs:
-                # STEP 1: Search WebTeb FIRST (Primary Source)
-                webteb_query = f"site:webteb.com {query}"
-                try:
-                    # Added timelimit parameter for recency
-                    webteb_results = ddgs.text(
-                        webteb_query, 
-                        max_results=5,
-                        timelimit=timelimit
-                    )
-                    for r in webteb_results:
-                        all_results.append({
-                            "title": r.get("title"),
-                            "url": r.get("href"),
-                            "snippet": r.get("body"),
-                            "source": "WebTeb",
-                            "priority": 0
-                        })
-                except:
-                    pass  # Continue even if WebTeb search fails
-                
-                # STEP 2: Search other trusted sources (if needed)
-                other_domains = [d for d in APPROVED_DOMAINS if d != "webteb.com"]
-                sites_query = " OR ".join([f"site:{domain}" for domain in other_domains])
-                full_query = f"({sites_query}) {query}"
-                
-                other_results = ddgs.text(
-                    full_query, 
-                    max_results=6,
-                    timelimit=timelimit
-                )
-                for r in other_results:
-                    url = r.get("href", "")
-                    all_results.append({
-                        "title": r.get("title"),
-                        "url": url,
-                        "snippet": r.get("body"),
-                        "source": self._extract_domain_name(url),
-                        "priority": self._get_domain_priority(url)
-                    })
-            
-            # Sort by priority (WebTeb first, then by domain priority)
-            all_results.sort(key=lambda x: x["priority"])
-            
-            # Extract sources for the agent to cite
-            sources = [
-                {"title": r["title"], "url": r["url"], "source": r["source"]} 
-                for r in all_results
-            ]
-            
+            results = await asyncio.wait_for(asyncio.wrap_future(job), timeout=settings.SEARCH_QUERY_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Search query '{label}' timed out after {settings.SEARCH_QUERY_TIMEOUT}s")
+            return None
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Search query '{label}' failed: {str(e)}")
+            return None
+        finally:
+            # Timed out or cancelled (e.g. a superseded early search) while running:
+            # the thread stays busy until ddgs returns on its own
+            if not job.done():
+                self._abandon(job, label)
+        logger.info(f"Search query '{label}': {len(results)} results in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return results
+
+    def _abandon(self, job: Future, label: str) -> None:
+        """Count a running ddgs call nobody waits for until its thread is free again"""
+        def finished(_: Future) -> None:
+            with self._abandoned_lock:
+                self.abandoned_running -= 1
+
+        with self._abandoned_lock:
+            self.abandoned_queries += 1
+            self.abandoned_running += 1
+            running = self.abandoned_running
+        job.add_done_callback(finished)
+        if running > settings.SEARCH_ABANDONED_RESERVE:
+            logger.warning(
+                f"Search query '{label}' abandoned: {running} search threads busy with abandoned queries "
+                f"(reserve {settings.SEARCH_ABANDONED_RESERVE})"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Search query and cache counters for monitoring"""
+        return {
+            "queries": self.queries,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "refreshes": self.refreshes,
+            "index_answers": self.index_answers,
+            "index_fallbacks": self.index_fallbacks,
+            "abandoned_queries": self.abandoned_queries,
+            "abandoned_running": self.abandoned_running,
+            "cache": get_search_cache().stats() if settings.SEARCH_CACHE_ENABLED else None
+        }
+
+    def _query_index(self, query: str) -> Optional[List[Dict]]:
+        """
+        Blocking BM25 search plus snippets (page faults on the memory-mapped index
+        and the rebuild check included)
+
+        Returns:
+            Hits, or None when there is no index
+        """
+        index = get_knowledge_index()
+        if index is None:
+            return None
+        hits, _ = index.search(query, settings.KNOWLEDGE_INDEX_TOP_K)
+        hits = [hit for hit in hits if hit["coverage"] >= settings.KNOWLEDGE_INDEX_MIN_COVERAGE]
+        if len(hits) < settings.KNOWLEDGE_INDEX_MIN_RESULTS:
+            return hits
+        for hit in hits:
+            hit["snippet"] = make_snippet(hit["text"], query)
+        return hits
+
+    async def _search_index(self, query: str) -> Optional[ToolResult]:
+        """
+        Answer from the offline knowledge index
+
+        Runs on the search thread pool, like the live queries.
+
+        Returns:
+            Results shaped like live search, or None when there is no index or
+            recall is poor (too few articles matching most of the query terms)
+        """
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        hits = await loop.run_in_executor(clients.get_search_executor(), self._query_index, query)
+        if hits is None:
+            return None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if len(hits) < settings.KNOWLEDGE_INDEX_MIN_RESULTS:
+            self.index_fallbacks += 1
+            logger.info(f"Knowledge index: {len(hits)} good matches in {elapsed_ms:.1f}ms, falling back to live search")
+            return None
+
+        self.index_answers += 1
+        logger.info(f"Knowledge index: {len(hits)} results in {elapsed_ms:.1f}ms")
+        # Already ranked by BM25 score (DOMAIN_PRIORITY breaks ties)
+        all_results = [
+            {
+                "title": hit["title"],
+                "url": hit["url"],
+                "snippet": hit["snippet"],
+                "source": self._extract_domain_name(hit["url"]),
+                "priority": hit["priority"]
+            }
+            for hit in hits
+        ]
+        return ToolResult(
+            success=True,
+            data=all_results,
+            sources=[{"title": r["title"], "url": r["url"], "source": r["source"]} for r in all_results],
+            metadata={
+                "webteb_results": sum(1 for r in all_results if r["source"] == "WebTeb"),
+                "total_results": len(all_results),
+                "backend": "knowledge_index",
+                "search_note": "Answered from the offline index of trusted medical sources"
+            }
+        )
+
+    async def execute(self, query: str, timelimit: str = None) -> ToolResult:
+        """
+        Search the offline knowledge index, then live search through the result cache
+
+        Time-limited (news) searches always go live. A stale cache entry is
+        returned at once and refreshed in the background; metadata["cache"]
+        reports "hit", "stale" or "miss" for live searches.
+        """
+        if timelimit is None:
+            indexed = await self._search_index(query)
+            if indexed is not None:
+                return indexed
+
+        if not settings.SEARCH_CACHE_ENABLED:
+            return await self._search_live(query, timelimit)
+
+        cache = get_search_cache()
+        cached, status = await cache.get(query, timelimit)
+        if cached is not None:
+            if status == CACHE_STALE:
+                self._schedule_refresh(query, timelimit)
             return ToolResult(
                 success=True,
-                data=all_results,
-                sources=sources,
-                metadata={
-                    "webteb_results": sum(1 for r in all_results if r["source"] == "WebTeb"),
-                    "total_results": len(all_results),
-                    "search_note": "Searched WebTeb.com first, then other trusted medical sources"
-                }
+                data=cached["data"],
+                sources=cached["sources"],
+                metadata={**cached["metadata"], "cache": status}
             )
-        except Exception as e:
+
+        result = await self._search_live(query, timelimit)
+        await self._store(query, timelimit, result)
+        result.metadata["cache"] = CACHE_MISS
+        return result
+
+    async def _store(self, query: str, timelimit: Optional[str], result: ToolResult) -> None:
+        """Cache complete results only (a partial result is retried next time)"""
+        if not result.success or not result.data or result.metadata.get("failed_queries"):
+            return
+        await get_search_cache().put(query, timelimit, {
+            "data": result.data,
+            "sources": result.sources,
+            "metadata": dict(result.metadata)
+        })
+
+    def _schedule_refresh(self, query: str, timelimit: Optional[str]) -> None:
+        """Re-run a stale search in the background (at most one refresh per key)"""
+        key = get_search_cache().make_key(query, timelimit)
+        if key is None or key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                await self._store(query, timelimit, await self._search_live(query, timelimit))
+                self.refreshes += 1
+            except Exception as e:
+                logger.warning(f"Search cache refresh failed: {str(e)}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    async def _search_live(self, query: str, timelimit: Optional[str] = None) -> ToolResult:
+        # STEP 1: WebTeb (primary source) and STEP 2: other trusted sources,
+        # both in flight at once on the search thread pool
+        other_domains = [d for d in APPROVED_DOMAINS if d != "webteb.com"]
+        sites_query = " OR ".join([f"site:{domain}" for domain in other_domains])
+        
+        webteb_results, other_results = await asyncio.gather(
+            # Added timelimit parameter for recency
+            self._run_query("webteb", f"site:webteb.com {query}", 5, timelimit),
+            self._run_query("trusted_sources", f"({sites_query}) {query}", 6, timelimit)
+        )
+        
+        if webteb_results is None and other_results is None:
             return ToolResult(
                 success=False,
-                error=f"Search failed: {str(e)}"
+                error="Search failed: no search backend responded"
             )
+        
+        all_results = []
+        for r in webteb_results or []:
+            all_results.append({
+                "title": r.get("title"),
+                "url": r.get("href"),
+                "snippet": r.get("body"),
+                "source": "WebTeb",
+                "priority": 0
+            })
+        for r in other_results or []:
+            url = r.get("href", "")
+            all_results.append({
+                "title": r.get("title"),
+                "url": url,
+                "snippet": r.get("body"),
+                "source": self._extract_domain_name(url),
+                "priority": self._get_domain_priority(url)
+            })
+        
+        # Sort by priority (WebTeb first, then by domain priority)
+        all_results.sort(key=lambda x: x["priority"])
+        
+        # Extract sources for the agent to cite
+        sources = [
+            {"title": r["title"], "url": r["url"], "source": r["source"]} 
+            for r in all_results
+        ]
+        
+        return ToolResult(
+            success=True,
+            data=all_results,
+            sources=sources,
+            metadata={
+                "webteb_results": sum(1 for r in all_results if r["source"] == "WebTeb"),
+                "total_results": len(all_results),
+                "failed_queries": [
+                    label for label, results in (("webteb", webteb_results), ("trusted_sources", other_results))
+                    if results is None
+                ],
+                "backend": "live",
+                "search_note": "Searched WebTeb.com and other trusted medical sources concurrently"
+            }
+        )
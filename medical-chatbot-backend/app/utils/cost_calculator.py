@@ -12,10 +12,12 @@ PRICING = {
     # If "gpt-4o" is first, "gpt-4o-mini" will incorrectly match to expensive gpt-4o rates.
     "gpt-4o-mini": {
         "input": 0.15 / 1_000_000,   # $0.15 per 1M input tokens
+        "cached_input": 0.075 / 1_000_000,  # $0.075 per 1M cached input tokens
         "output": 0.60 / 1_000_000   # $0.60 per 1M output tokens
     },
     "gpt-4o": {
         "input": 2.50 / 1_000_000,   # $2.50 per 1M input tokens
+        "cached_input": 1.25 / 1_000_000,  # $1.25 per 1M cached input tokens
         "output": 10.00 / 1_000_000  # $10.00 per 1M output tokens
     },
     "gpt-4-turbo": {
@@ -29,6 +31,14 @@ PRICING = {
     "gpt-3.5-turbo": {
         "input": 0.50 / 1_000_000,   # $0.50 per 1M input tokens
         "output": 1.50 / 1_000_000   # $1.50 per 1M output tokens
+    },
+    "text-embedding-3-small": {
+        "input": 0.02 / 1_000_000,   # $0.02 per 1M input tokens
+        "output": 0.0
+    },
+    "text-embedding-3-large": {
+        "input": 0.13 / 1_000_000,   # $0.13 per 1M input tokens
+        "output": 0.0
     }
 }
 
@@ -38,7 +48,20 @@ DEFAULT_PRICING = {
     "output": 30.00 / 1_000_000
 }
 
-def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+def cached_prompt_tokens(usage) -> int:
+    """
+    Number of prompt tokens served from OpenAI's prompt cache.
+    
+    Args:
+        usage: OpenAI usage object (prompt_tokens_details may be missing)
+    
+    Returns:
+        Cached token count (0 when not reported)
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+def calculate_cost(model: str, input_tokens: int, output_tokens: int, cached_tokens: int = 0) -> float:
     """
     Calculate the cost of an OpenAI API call in dollars.
     
@@ -46,6 +69,7 @@ def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
         model: The model name (e.g., "gpt-4o-mini", "gpt-4o")
         input_tokens: Number of input tokens used
         output_tokens: Number of output tokens generated
+        cached_tokens: Input tokens served from the prompt cache (part of input_tokens)
     
     Returns:
         Total cost in USD as a float
@@ -61,14 +85,18 @@ def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
         logger.warning(f"No pricing found for model '{model}', using default pricing")
         model_pricing = DEFAULT_PRICING
         
+    # Cached prompt tokens are billed at the discounted rate (if the model has one)
+    cached_tokens = min(max(cached_tokens or 0, 0), input_tokens)
+    cached_price = model_pricing.get("cached_input", model_pricing["input"])
+    
     # Calculate total cost
-    input_cost = input_tokens * model_pricing["input"]
+    input_cost = (input_tokens - cached_tokens) * model_pricing["input"] + cached_tokens * cached_price
     output_cost = output_tokens * model_pricing["output"]
     total_cost = input_cost + output_cost
     
     return total_cost
 
-def log_ai_cost(model: str, input_tokens: int, output_tokens: int, context: str = ""):
+def log_ai_cost(model: str, input_tokens: int, output_tokens: int, context: str = "", cached_tokens: int = 0):
     """
     Calculate and log AI cost to terminal with detailed breakdown.
     
@@ -77,11 +105,12 @@ def log_ai_cost(model: str, input_tokens: int, output_tokens: int, context: str
         input_tokens: Number of input tokens
         output_tokens: Number of output tokens
         context: Optional context string (e.g., "Agent Initial", "Decision Maker")
+        cached_tokens: Input tokens served from the prompt cache
     
     Returns:
         Total cost in USD
     """
-    cost = calculate_cost(model, input_tokens, output_tokens)
+    cost = calculate_cost(model, input_tokens, output_tokens, cached_tokens)
     total_tokens = input_tokens + output_tokens
     
     # Format cost display based on magnitude
@@ -96,7 +125,7 @@ def log_ai_cost(model: str, input_tokens: int, output_tokens: int, context: str
     log_msg = (
         f"💰 AI COST{context_str}: {cost_str} | "
         f"Model: {model} | "
-        f"Tokens: {total_tokens:,} (Input: {input_tokens:,}, Output: {output_tokens:,})"
+        f"Tokens: {total_tokens:,} (Input: {input_tokens:,}, Cached: {cached_tokens:,}, Output: {output_tokens:,})"
     )
     
     # Print directly to terminal for high visibility
@@ -121,6 +150,7 @@ def get_model_pricing_info(model: str) -> dict:
             return {
                 "model": m,
                 "input_per_1m": pricing["input"] * 1_000_000,
+                "cached_input_per_1m": pricing.get("cached_input", pricing["input"]) * 1_000_000,
                 "output_per_1m": pricing["output"] * 1_000_000,
                 "input_per_token": pricing["input"],
                 "output_per_token": pricing["output"]
@@ -134,7 +164,13 @@ def get_model_pricing_info(model: str) -> dict:
         "output_per_token": DEFAULT_PRICING["output"]
     }
 
-def log_grand_total_cost(total_cost: float, total_input_tokens: int, total_output_tokens: int, step_breakdown: list = None):
+def log_grand_total_cost(
+    total_cost: float,
+    total_input_tokens: int,
+    total_output_tokens: int,
+    step_breakdown: list = None,
+    total_cached_tokens: int = 0
+):
     """
     Log the grand total cost for an entire request with detailed breakdown.
     
@@ -143,6 +179,7 @@ def log_grand_total_cost(total_cost: float, total_input_tokens: int, total_outpu
         total_input_tokens: Total input tokens across all steps
         total_output_tokens: Total output tokens across all steps
         step_breakdown: Optional list of dicts with per-step breakdown [{"step": "name", "cost": 0.00, "tokens": 100}, ...]
+        total_cached_tokens: Input tokens served from the prompt cache across all steps
     """
     total_tokens = total_input_tokens + total_output_tokens
     
@@ -157,7 +194,8 @@ def log_grand_total_cost(total_cost: float, total_input_tokens: int, total_outpu
     # Build the main log message
     log_msg = (
         f"💰 GRAND TOTAL COST [Request Complete]: {cost_str} | "
-        f"Total Tokens: {total_tokens:,} (Input: {total_input_tokens:,}, Output: {total_output_tokens:,})"
+        f"Total Tokens: {total_tokens:,} (Input: {total_input_tokens:,}, Cached: {total_cached_tokens:,}, "
+        f"Output: {total_output_tokens:,})"
     )
     
     # Print main summary
@@ -171,6 +209,7 @@ def log_grand_total_cost(total_cost: float, total_input_tokens: int, total_outpu
             step_name = step_info.get("step", "Unknown")
             step_cost = step_info.get("cost", 0.0)
             step_tokens = step_info.get("tokens", 0)
+            step_cached = step_info.get("cached_tokens", 0)
             
             # Format step cost
             if step_cost < 0.000001:
@@ -180,7 +219,8 @@ def log_grand_total_cost(total_cost: float, total_input_tokens: int, total_outpu
             else:
                 step_cost_str = f"${step_cost:.4f}"
             
-            print(f"   • {step_name}: {step_cost_str} ({step_tokens:,} tokens)", flush=True)
+            cached_str = f", {step_cached:,} cached" if step_cached else ""
+            print(f"   • {step_name}: {step_cost_str} ({step_tokens:,} tokens{cached_str})", flush=True)
         print(f"{'='*80}\n", flush=True)
     else:
         print(f"{'='*80}\n", flush=True)
@@ -3,11 +3,9 @@ import base64
 import io
 import logging
 from typing import Dict, Any, Optional
-from openai import AsyncOpenAI
-from app.config import settings
+from app.core.clients import get_openai_client
 
 logger = logging.getLogger(__name__)
-client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
 
 
 class FileProcessor:
@@ -32,7 +30,7 @@ class FileProcessor:
             data_url = f"data:{file_type};base64,{file_data}"
             
             # Call GPT-4 Vision
-            response = await client.chat.completions.create(
+            response = await get_openai_client().chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -118,7 +116,7 @@ class FileProcessor:
             audio_file.name = f"audio.{extension}"
             
             # Transcribe using Whisper
-            transcription = await client.audio.transcriptions.create(
+            transcription = await get_openai_client().audio.transcriptions.create(
                 model="whisper-1",
                 file=audio_file,
                 language="ar"  # Primarily Arabic, but Whisper auto-detects
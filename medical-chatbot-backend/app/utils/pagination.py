@@ -0,0 +1,49 @@
+"""Keyset (cursor) pagination helpers
+
+Pages are addressed by the sort key of the last row the client has seen,
+e.g. (updated_at, id) for conversations and (created_at, id) for messages,
+instead of OFFSET. Fetching page N costs the same as fetching page 1 and rows
+inserted meanwhile do not shift later pages.
+
+Cursors are opaque to clients: base64url("<iso timestamp>|<id>").
+"""
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Tuple
+from sqlalchemy import and_, or_
+from app.utils.errors import ValidationException
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Cursor pointing just past the given row"""
+    raw = f"{timestamp.isoformat()}|{row_id}"
+    return urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parse a cursor produced by encode_cursor
+
+    Raises:
+        ValidationException: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, _, row_id = urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").partition("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeError):
+        raise ValidationException("Invalid pagination cursor", details={"cursor": cursor})
+
+
+def before_cursor(timestamp_column, id_column, cursor: str):
+    """
+    WHERE clause selecting rows that sort after the cursor in (timestamp DESC, id DESC) order
+
+    The redundant `timestamp <= t` bound lets the planner use a range scan on
+    the (owner, timestamp) indexes.
+    """
+    timestamp, row_id = decode_cursor(cursor)
+    return and_(
+        timestamp_column <= timestamp,
+        or_(timestamp_column < timestamp, and_(timestamp_column == timestamp, id_column < row_id))
+    )
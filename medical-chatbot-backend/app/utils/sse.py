@@ -0,0 +1,166 @@
+"""Server-Sent Events framing for the chat stream
+
+OpenAI usually streams one token per delta. Encoding and writing every delta
+as its own SSE frame costs a JSON encode, an f-string and a socket write per
+token. SSEFramer coalesces consecutive content deltas until a time window or
+byte budget is reached (paced_events() enforces the window as a deadline while
+the agent is silent), encodes with orjson when it is installed, and keeps
+the full answer in a list-backed TextBuffer instead of repeated string +=.
+"""
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Union
+import asyncio
+import json
+import time
+
+try:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON"""
+        return orjson.dumps(obj)
+except ImportError:  # pragma: no cover - orjson is optional
+    def dumps(obj: Any) -> bytes:
+        """Serialize to compact UTF-8 JSON"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def sse_event(event: Dict[str, Any]) -> bytes:
+    """Encode one event as an SSE data frame"""
+    return b"data: " + dumps(event) + b"\n\n"
+
+
+class TextBuffer:
+    """Append-only text accumulator (avoids quadratic string +=)"""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._value: Optional[str] = ""
+
+    def append(self, text: str) -> None:
+        self._parts.append(text)
+        self._value = None
+
+    def getvalue(self) -> str:
+        """The accumulated text (joined once, cached until the next append)"""
+        if self._value is None:
+            self._value = "".join(self._parts)
+            self._parts = [self._value]
+        return self._value
+
+    def __len__(self) -> int:
+        return len(self.getvalue())
+
+    def __bool__(self) -> bool:
+        return any(self._parts)
+
+
+class SSEFramer:
+    """
+    Coalesce content deltas into fewer, larger SSE frames.
+
+    Content is held back until `window_ms` has passed since the first pending
+    delta or `max_bytes` of text are pending; any non-content event flushes the
+    pending content first so event order is preserved. A window of 0 disables
+    coalescing. The window is only a deadline when the event source is read
+    through paced_events(), which flushes on time even if no delta follows.
+    """
+
+    def __init__(
+        self,
+        window_ms: float = 30.0,
+        max_bytes: int = 512,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            window_ms: Max time a content delta may wait for more deltas (see paced_events)
+            max_bytes: Pending text size (UTF-8 bytes) that forces a flush
+            clock: Time source in seconds (injectable for benchmarks)
+        """
+        self.window = window_ms / 1000.0
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+        self._pending_since = 0.0
+        self.frames = 0
+
+    def content(self, text: str) -> Optional[bytes]:
+        """
+        Add a content delta
+
+        Returns:
+            An encoded frame when the window/byte budget is reached, else None
+        """
+        if not self._pending:
+            self._pending_since = self.clock()
+        self._pending.append(text)
+        self._pending_bytes += len(text.encode("utf-8")) if not text.isascii() else len(text)
+
+        if (
+            self.window <= 0
+            or self._pending_bytes >= self.max_bytes
+            or self.clock() - self._pending_since >= self.window
+        ):
+            return self.flush()
+        return None
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until pending content is due (None if nothing is pending)"""
+        if not self._pending:
+            return None
+        return max(0.0, self.window - (self.clock() - self._pending_since))
+
+    def event(self, event: Dict[str, Any]) -> bytes:
+        """Encode a non-content event, preceded by any pending content"""
+        pending = self.flush() or b""
+        self.frames += 1
+        return pending + sse_event(event)
+
+    def flush(self) -> Optional[bytes]:
+        """Encode pending content as one frame (None if nothing is pending)"""
+        if not self._pending:
+            return None
+        text = self._pending[0] if len(self._pending) == 1 else "".join(self._pending)
+        self._pending = []
+        self._pending_bytes = 0
+        self.frames += 1
+        return sse_event({"type": "content", "data": text})
+
+
+async def paced_events(
+    events: AsyncIterator[Dict[str, Any]],
+    framer: SSEFramer
+) -> AsyncIterator[Union[Dict[str, Any], bytes]]:
+    """
+    Read events while enforcing the framer's window as a deadline
+
+    Yields the events of `events` and, whenever pending content comes due while
+    the source is silent (a tool is running, a slow token), the flushed frame
+    as bytes. The pending read is never cancelled by the deadline: cancelling
+    it would throw into the agent generator.
+    """
+    next_event: Optional[asyncio.Task] = None
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({next_event}, timeout=framer.time_left())
+            if not done:
+                frame = framer.flush()
+                if frame:
+                    yield frame
+                continue
+            task, next_event = next_event, None
+            try:
+                event = task.result()
+            except StopAsyncIteration:
+                return
+            yield event
+    finally:
+        if next_event is not None and not next_event.done():
+            next_event.cancel()
+            try:
+                await next_event
+            except (asyncio.CancelledError, Exception):
+                pass
@@ -0,0 +1,46 @@
+"""Text normalization for matching Arabic/English user text"""
+import re
+import unicodedata
+
+# Arabic diacritics (tashkeel), Quranic marks and tatweel
+ARABIC_DIACRITICS = re.compile(r'[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')
+
+# Letter variants that users type interchangeably
+ARABIC_LETTER_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    # Arabic-Indic digits → ASCII digits
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+
+# Anything that is not a letter, digit or whitespace (covers ؟ ، ؛ as well)
+PUNCTUATION = re.compile(r'[^\w\s]', flags=re.UNICODE)
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so that trivially different spellings compare equal.
+
+    Lowercases Latin text, strips Arabic diacritics/tatweel, unifies alef/ya/ta
+    marbuta variants, removes punctuation and collapses whitespace.
+
+    Args:
+        text: Raw user text
+
+    Returns:
+        Normalized text
+    """
+    if not text:
+        return ""
+
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    normalized = ARABIC_DIACRITICS.sub("", normalized)
+    normalized = normalized.translate(ARABIC_LETTER_MAP)
+    normalized = PUNCTUATION.sub(" ", normalized)
+    normalized = normalized.replace("_", " ")
+
+    return WHITESPACE.sub(" ", normalized).strip()
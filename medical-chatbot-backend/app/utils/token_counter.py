@@ -0,0 +1,99 @@
+"""Local token counting for context budgeting
+
+Message token counts are computed once, when the message is written, and
+stored in `messages.token_count`; context assembly sums the stored values.
+
+Uses tiktoken with the encoding of the chat model when it is installed. Without
+it (or if the encoding files cannot be loaded) a character-based estimate is
+used; it errs on the high side for Arabic text so the budget is not exceeded.
+"""
+from functools import lru_cache
+from typing import Any, Mapping
+import asyncio
+import logging
+from app.config import settings
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is optional
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing in the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Fallback estimate: characters per token
+ASCII_CHARS_PER_TOKEN = 4
+NON_ASCII_CHARS_PER_TOKEN = 2
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """tiktoken encoding for the chat model, or None to use the estimate"""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(settings.OPENAI_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {str(e)}")
+        return None
+
+
+async def warm_up_encoding() -> bool:
+    """
+    Load the tiktoken encoding off the event loop (startup hook)
+
+    The first load may download and parse the BPE file; without this it would
+    happen synchronously inside the first chat request of each worker.
+
+    Returns:
+        True if exact counting is available
+    """
+    return await asyncio.to_thread(_get_encoding) is not None
+
+
+def estimate_tokens(text: str) -> int:
+    """Character-based token estimate (used when tiktoken is unavailable)"""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    non_ascii_chars = len(text) - ascii_chars
+    return -(-ascii_chars // ASCII_CHARS_PER_TOKEN) + -(-non_ascii_chars // NON_ASCII_CHARS_PER_TOKEN)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text
+
+    Args:
+        text: Message content
+
+    Returns:
+        Token count (exact with tiktoken, estimated otherwise)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: Any) -> int:
+    """
+    Context cost of a chat message, including the per-message overhead
+
+    Accepts Message rows and message dicts. The stored `token_count` is used
+    when present; older rows without one are counted on the fly.
+    """
+    if isinstance(message, Mapping):
+        token_count = message.get("token_count")
+        content = message.get("content")
+    else:
+        token_count = getattr(message, "token_count", None)
+        content = getattr(message, "content", None)
+    if token_count is None:
+        token_count = count_tokens(content or "")
+    return token_count + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1 @@
+"""Maintenance, training and benchmark scripts"""
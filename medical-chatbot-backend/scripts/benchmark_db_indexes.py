@@ -0,0 +1,201 @@
+"""Benchmark: hot-path queries with and without the composite indexes
+
+Seeds a throwaway database with users, guest sessions, conversations, messages
+(default one million) and feedback. It then times the queries behind the hottest
+endpoints twice: first with only the primary-key indexes, then with the indexes
+added by migration f9cb83bec501. The query plan is printed for each query
+(EXPLAIN QUERY PLAN on SQLite, EXPLAIN ANALYZE on PostgreSQL).
+
+Hot paths:
+1. history   - messages WHERE conversation_id = ? ORDER BY created_at  (/api/chat)
+2. user_list - conversations WHERE user_id = ? ORDER BY updated_at DESC  (/api/conversations)
+3. guest_list - conversations WHERE guest_session_id = ? ORDER BY updated_at DESC
+4. feedback  - feedbacks WHERE message_id = ?
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.benchmark_db_indexes                      # temporary SQLite file
+    python -m scripts.benchmark_db_indexes --messages 200000
+    python -m scripts.benchmark_db_indexes --database-url postgresql://localhost/bench   # empty database!
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The models import app.config; allow running without a .env file
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='db_indexes_')}/benchmark.db")
+
+from sqlalchemy import create_engine, insert, text
+
+from app.config import settings
+from app.database import Base
+# Import all models so every table is registered
+from app.models.user import User
+from app.models.guest_session import GuestSession
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.feedback import Feedback
+
+HOT_PATH_INDEXES = [
+    "ix_messages_conversation_id_created_at",
+    "ix_conversations_user_id_updated_at",
+    "ix_conversations_guest_session_id_updated_at",
+    "ix_feedbacks_message_id",
+]
+
+QUERIES = {
+    "history": (
+        "SELECT id, role, content FROM messages WHERE conversation_id = :id ORDER BY created_at",
+        "conversation"
+    ),
+    "user_list": (
+        "SELECT id, title, updated_at FROM conversations WHERE user_id = :id ORDER BY updated_at DESC",
+        "user"
+    ),
+    "guest_list": (
+        "SELECT id, title, updated_at FROM conversations WHERE guest_session_id = :id ORDER BY updated_at DESC",
+        "guest"
+    ),
+    "feedback": (
+        "SELECT id, feedback_type FROM feedbacks WHERE message_id = :id",
+        "message"
+    ),
+}
+
+BATCH_SIZE = 10000
+
+
+def hot_path_indexes():
+    """Index objects of the hot-path indexes, taken from the model metadata"""
+    by_name = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    return [by_name[name] for name in HOT_PATH_INDEXES]
+
+
+def insert_batches(conn, model, rows) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(model), batch)
+
+
+def seed(engine, args) -> Dict[str, int]:
+    """Create the tables without the hot-path indexes and fill them"""
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for index in hot_path_indexes():
+            index.drop(conn, checkfirst=True)
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    conversations = max(1, args.messages // args.messages_per_conversation)
+    users = max(1, conversations // (2 * args.conversations_per_owner))
+    guests = max(1, conversations // (2 * args.conversations_per_owner))
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        insert_batches(conn, User, (
+            {"id": i, "email": f"bench{i}@example.com", "hashed_password": "x", "plan_type": "FREE",
+             "questions_used": 0, "created_at": now, "updated_at": now}
+            for i in range(1, users + 1)
+        ))
+        insert_batches(conn, GuestSession, (
+            {"id": i, "session_id": f"bench-{i}", "questions_used": 0, "created_at": now, "updated_at": now}
+            for i in range(1, guests + 1)
+        ))
+        # Conversations are shuffled across owners so an owner's rows are not adjacent on disk
+        insert_batches(conn, Conversation, (
+            {"id": i, "title": f"Conversation {i}", "created_at": now,
+             "updated_at": now - timedelta(minutes=rng.randrange(500000)),
+             "user_id": rng.randint(1, users) if i % 2 else None,
+             "guest_session_id": None if i % 2 else rng.randint(1, guests)}
+            for i in range(1, conversations + 1)
+        ))
+        insert_batches(conn, Message, (
+            {"id": i, "conversation_id": rng.randint(1, conversations), "role": "user" if i % 2 else "assistant",
+             "content": f"benchmark message {i}", "created_at": now - timedelta(seconds=rng.randrange(10 ** 7))}
+            for i in range(1, args.messages + 1)
+        ))
+        feedbacks = args.messages // 20
+        insert_batches(conn, Feedback, (
+            {"id": i, "conversation_id": rng.randint(1, conversations), "message_id": rng.randint(1, args.messages),
+             "feedback_type": "THUMBS_UP", "reviewed": False, "created_at": now}
+            for i in range(1, feedbacks + 1)
+        ))
+    print(f"Seeded {args.messages:,} messages, {conversations:,} conversations, {users:,} users, "
+          f"{guests:,} guests, {feedbacks:,} feedbacks in {time.perf_counter() - started:.1f}s")
+    return {"conversation": conversations, "user": users, "guest": guests, "message": args.messages}
+
+
+def explain(conn, sql: str, params: dict) -> str:
+    if conn.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+        return " | ".join(row[-1] for row in rows)
+    rows = conn.execute(text(f"EXPLAIN ANALYZE {sql}"), params).fetchall()
+    return " | ".join(row[0].strip() for row in rows[:3])
+
+
+def run_queries(engine, id_ranges: Dict[str, int], repeats: int) -> Dict[str, float]:
+    """Median latency (ms) of each hot-path query over random ids"""
+    rng = random.Random(7)
+    results = {}
+    with engine.connect() as conn:
+        for name, (sql, id_kind) in QUERIES.items():
+            print(f"  {name:<10} plan: {explain(conn, sql, {'id': 1})}")
+            timings = []
+            for _ in range(repeats):
+                params = {"id": rng.randint(1, id_ranges[id_kind])}
+                started = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL, help="Use an empty, throwaway database")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--messages-per-conversation", type=int, default=20)
+    parser.add_argument("--conversations-per-owner", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=50, help="Timed executions per query")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    engine = create_engine(settings.__class__().sqlalchemy_database_url)
+    id_ranges = seed(engine, args)
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print("\nBefore (primary-key indexes only):")
+    before = run_queries(engine, id_ranges, args.repeats)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for index in hot_path_indexes():
+            index.create(conn)
+        conn.execute(text("ANALYZE"))
+    print(f"\nCreated {len(HOT_PATH_INDEXES)} indexes in {time.perf_counter() - started:.1f}s")
+    print("After:")
+    after = run_queries(engine, id_ranges, args.repeats)
+
+    print(f"\n{'query':<10} {'before':>12} {'after':>12} {'speedup':>9}")
+    for name in QUERIES:
+        print(f"{name:<10} {before[name]:>10.3f}ms {after[name]:>10.3f}ms {before[name] / max(after[name], 1e-6):>8.0f}x")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
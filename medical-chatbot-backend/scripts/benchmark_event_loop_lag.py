@@ -0,0 +1,156 @@
+"""Benchmark: event-loop lag of chat streams under database load
+
+Simulates open SSE streams (one frame every --frame-ms per stream) on the event
+loop while workers keep running the conversation-listing query, and measures
+how late each frame goes out. Two modes:
+1. sync  - the query runs on a synchronous Session inside the event loop
+           (how the `async def` endpoints used the database before)
+2. async - the same query on an AsyncSession (aiosqlite / asyncpg)
+
+With the sync driver every query freezes all streams of the worker; with the
+async driver the frames keep their cadence.
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.benchmark_event_loop_lag --streams 50 --workers 8 --seconds 5
+    python -m scripts.benchmark_event_loop_lag --database-url postgresql://... (uses existing tables)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The models import app.config; allow running without a .env file
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+_tmp_dir = tempfile.mkdtemp(prefix="loop_lag_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp_dir}/benchmark.db")
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, selectinload
+
+from app.config import settings
+from app.database import Base
+# Import all models so every foreign key target is registered
+from app.models.user import User  # noqa: F401
+from app.models.guest_session import GuestSession
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.models.feedback import Feedback  # noqa: F401
+
+
+def seed(engine, conversations: int, messages_per_conversation: int) -> int:
+    """Create one guest with a conversation history; returns the guest id"""
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        guest = GuestSession(session_id=f"loop-lag-{time.time_ns()}")
+        db.add(guest)
+        db.flush()
+        for c in range(conversations):
+            conversation = Conversation(guest_session_id=guest.id, title=f"Conversation {c}")
+            conversation.messages = [
+                Message(role="user" if i % 2 == 0 else "assistant", content=f"message {i} " * 40)
+                for i in range(messages_per_conversation)
+            ]
+            db.add(conversation)
+        db.commit()
+        return guest.id
+
+
+def listing_query(guest_id: int):
+    return (
+        select(Conversation)
+        .options(selectinload(Conversation.messages))
+        .where(Conversation.guest_session_id == guest_id)
+        .order_by(Conversation.updated_at.desc())
+    )
+
+
+async def stream(frame_ms: float, stop: asyncio.Event, delays: List[float]) -> None:
+    """One SSE stream: records how late every frame is (ms)"""
+    interval = frame_ms / 1000.0
+    expected = time.perf_counter() + interval
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, expected - time.perf_counter()))
+        now = time.perf_counter()
+        delays.append(max(0.0, (now - expected) * 1000))
+        expected = max(expected + interval, now)
+
+
+async def sync_worker(engine, guest_id: int, stop: asyncio.Event, queries: List[int]) -> None:
+    while not stop.is_set():
+        with Session(engine) as db:
+            db.scalars(listing_query(guest_id)).all()
+        queries[0] += 1
+        await asyncio.sleep(0)
+
+
+async def async_worker(engine, guest_id: int, stop: asyncio.Event, queries: List[int]) -> None:
+    while not stop.is_set():
+        async with AsyncSession(engine) as db:
+            (await db.scalars(listing_query(guest_id))).all()
+        queries[0] += 1
+
+
+async def run_mode(mode: str, sync_engine, async_engine, guest_id: int, args) -> Dict[str, float]:
+    stop = asyncio.Event()
+    delays: List[float] = []
+    queries = [0]
+    streams = [asyncio.create_task(stream(args.frame_ms, stop, delays)) for _ in range(args.streams)]
+    if mode == "sync":
+        workers = [asyncio.create_task(sync_worker(sync_engine, guest_id, stop, queries)) for _ in range(args.workers)]
+    else:
+        workers = [asyncio.create_task(async_worker(async_engine, guest_id, stop, queries)) for _ in range(args.workers)]
+
+    await asyncio.sleep(args.seconds)
+    stop.set()
+    await asyncio.gather(*streams, *workers)
+
+    ordered = sorted(delays)
+    return {
+        "frames": len(delays),
+        "queries_per_s": queries[0] / args.seconds,
+        "p50": statistics.median(ordered),
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "max": ordered[-1]
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--streams", type=int, default=50, help="Concurrent simulated SSE streams")
+    parser.add_argument("--frame-ms", type=float, default=30.0, help="Frame interval of each stream")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent DB query loops")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each mode")
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=20, help="Messages per conversation")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url
+    sync_url = settings.__class__().sqlalchemy_database_url
+    async_url = settings.__class__().async_database_url
+    sync_engine = create_engine(sync_url)
+    async_engine = create_async_engine(async_url, pool_size=args.workers)
+    guest_id = seed(sync_engine, args.conversations, args.messages)
+
+    print(f"{args.streams} streams @ {args.frame_ms:.0f} ms, {args.workers} DB workers, "
+          f"{args.conversations}x{args.messages} messages per listing, {args.seconds:.0f}s per mode")
+    print(f"{'mode':<6} {'frames':>8} {'queries/s':>10} {'p50 lag':>10} {'p99 lag':>10} {'max lag':>10}")
+    for mode in ("sync", "async"):
+        r = await run_mode(mode, sync_engine, async_engine, guest_id, args)
+        print(f"{mode:<6} {r['frames']:>8} {r['queries_per_s']:>10.1f} {r['p50']:>8.1f}ms "
+              f"{r['p99']:>8.1f}ms {r['max']:>8.1f}ms")
+
+    await async_engine.dispose()
+    sync_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""Benchmark: gatekeeper (DecisionMaker) input tokens per request
+
+Replays synthetic conversations (short user questions, long cited assistant
+answers, the usual greetings and thanks) through the gatekeeper prompt builder
+and counts the input tokens of each gatekeeper request:
+
+- before: the last 10 messages verbatim in the prompt, no memo
+- after:  the compact view (last user turns, truncated, plus earlier intents)
+          and the decision memo; a memo hit sends no request at all
+
+Tokens are counted with app/utils/token_counter.py (tiktoken when installed).
+No OpenAI calls are made.
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.benchmark_gatekeeper_tokens
+    python -m scripts.benchmark_gatekeeper_tokens --conversations 500 --turns 12
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config needs these; no request is sent
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from app.agent.decision_maker import GATEKEEPER_SYSTEM_PROMPT, DecisionMaker, compact_history_view
+from app.utils.token_counter import MESSAGE_OVERHEAD_TOKENS, count_tokens
+
+QUESTIONS = [
+    "ما هي أعراض السكري؟",
+    "What are the side effects of metformin?",
+    "هل يمكن أن يسبب الضغط صداعاً؟",
+    "I have a headache and fever since yesterday",
+    "ما هو العلاج المناسب للربو عند الأطفال؟",
+    "Is it safe to take ibuprofen with lisinopril?",
+]
+FOLLOW_UPS = ["شكراً", "Thank you", "تمام", "وكيف أقي نفسي منه؟", "what about children?", "مرحبا"]
+ANSWER_PARAGRAPH = (
+    "وفقاً لمصادر طبية موثوقة مثل منظمة الصحة العالمية ومايو كلينك، "
+    "According to the Mayo Clinic and the NHS, this condition is usually managed with lifestyle changes "
+    "and medication; consult your doctor before changing any treatment. [1] [2] "
+)
+
+
+def legacy_prompt(history: List[Dict[str, str]], user_message: str) -> str:
+    """Gatekeeper prompt before the compact view (last 10 messages verbatim)"""
+    history_str = ""
+    for msg in history[-10:]:
+        history_str += f"{msg.get('role', 'user')}: {msg.get('content', '')}\n"
+    return f"""**Conversation History:**
+{history_str if history_str else "No previous messages"}
+
+**User Message:**
+{user_message}"""
+
+
+def compact_prompt(history: List[Dict[str, str]], user_message: str) -> str:
+    """Gatekeeper prompt built the way DecisionMaker.decide_with_llm builds it"""
+    history_view = compact_history_view(history)
+    return f"""**Conversation History:**
+{history_view if history_view else "No previous messages"}
+
+**User Message:**
+{user_message}"""
+
+
+def request_tokens(prompt: str, system_tokens: int) -> int:
+    return system_tokens + count_tokens(prompt) + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+def make_conversation(rng: random.Random, turns: int) -> List[Dict[str, str]]:
+    """Alternating user/assistant messages; assistant answers are long and cited"""
+    messages = []
+    for turn in range(turns):
+        question = rng.choice(QUESTIONS) if turn == 0 or rng.random() < 0.5 else rng.choice(FOLLOW_UPS)
+        intent = "direct_answer" if question in FOLLOW_UPS else "requires_tools"
+        messages.append({"role": "user", "content": question})
+        paragraphs = 1 if intent == "direct_answer" else rng.randint(3, 8)
+        messages.append({"role": "assistant", "content": ANSWER_PARAGRAPH * paragraphs, "intent": intent})
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=10, help="User turns per conversation")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    system_tokens = count_tokens(GATEKEEPER_SYSTEM_PROMPT)
+    before, after = [], []
+    memo = set()
+    memo_hits = 0
+
+    for _ in range(args.conversations):
+        conversation = make_conversation(rng, args.turns)
+        for index in range(0, len(conversation), 2):
+            history, user_message = conversation[:index], conversation[index]["content"]
+            before.append(request_tokens(legacy_prompt(history, user_message), system_tokens))
+
+            key = DecisionMaker.memo_key(compact_history_view(history), user_message)
+            if key in memo:
+                memo_hits += 1
+                after.append(0)
+            else:
+                memo.add(key)
+                after.append(request_tokens(compact_prompt(history, user_message), system_tokens))
+
+    requests = len(before)
+    sent = [tokens for tokens in after if tokens]
+    print(f"{requests:,} gatekeeper decisions ({args.conversations} conversations x {args.turns} turns)")
+    print(f"static system prompt: {system_tokens} tokens\n")
+    print(f"{'':<28} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+    for name, values in [("before (verbatim, no memo)", before), ("after (compact view)", sent), ("after, incl. memo hits", after)]:
+        ordered = sorted(values)
+        print(
+            f"{name:<28} {statistics.mean(values):>8.0f} {statistics.median(values):>8.0f} "
+            f"{ordered[int(0.95 * (len(ordered) - 1))]:>8} {ordered[-1]:>8}"
+        )
+    print(f"\nmemo hits: {memo_hits:,}/{requests:,} ({memo_hits / requests:.1%}); "
+          f"input tokens per request {statistics.mean(before):.0f} -> {statistics.mean(after):.0f} "
+          f"({1 - sum(after) / sum(before):.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark the local intent classifier against the LLM gatekeeper
+
+Reports accuracy, latency percentiles and how often the local path would fall
+back to the LLM at the configured confidence threshold. Without --dataset, a
+model is trained in memory on the seed examples and only latency is meaningful;
+--max-p99-ms turns the latency budget into an exit status (for CI on a quiet
+runner; the unit tests make no timing assertions).
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.benchmark_intent_classifier --max-p99-ms 1.0
+    python -m scripts.benchmark_intent_classifier --dataset data/intent_classifier_eval.jsonl
+    python -m scripts.benchmark_intent_classifier --dataset ... --with-llm   # needs OPENAI_API_KEY
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.agent.intent_classifier import IntentClassifier
+from scripts.train_intent_classifier import SEED_EXAMPLES, load_jsonl
+
+# Long enough to exercise the n-gram featurizer like a real question
+LATENCY_PROBE = "ما هي أعراض ارتفاع ضغط الدم عند كبار السن وكيف يمكن علاجه"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def report(name: str, latencies_ms: List[float], correct: int, total: int, extra: str = ""):
+    print(
+        f"{name:<28} accuracy={correct / total:.3f}  "
+        f"p50={statistics.median(latencies_ms):.3f}ms  "
+        f"p99={percentile(latencies_ms, 0.99):.3f}ms  "
+        f"mean={statistics.mean(latencies_ms):.3f}ms{extra}"
+    )
+
+
+async def run_llm(texts: List[str], intents: List[str]):
+    from app.agent.decision_maker import DecisionMaker
+
+    decision_maker = DecisionMaker()
+    latencies, correct, input_tokens = [], 0, 0
+    for text, intent in zip(texts, intents):
+        started = time.perf_counter()
+        decision = await decision_maker.decide_with_llm(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+        correct += decision.get("intent") == intent
+        input_tokens += decision.get("input_tokens", 0)
+    report("LLM gatekeeper", latencies, correct, len(texts),
+           f"  avg_input_tokens={input_tokens / len(texts):.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", help="Labeled JSONL ({\"text\", \"intent\"}); default: seed examples")
+    parser.add_argument("--model", default=settings.INTENT_CLASSIFIER_PATH)
+    parser.add_argument("--threshold", type=float, default=settings.INTENT_CLASSIFIER_THRESHOLD)
+    parser.add_argument("--with-llm", action="store_true", help="Also benchmark the LLM gatekeeper (costs tokens)")
+    parser.add_argument("--max-p99-ms", type=float, help="Exit with status 1 if the p99 latency exceeds this")
+    args = parser.parse_args()
+
+    if args.dataset:
+        examples = load_jsonl(args.dataset)
+        classifier = IntentClassifier.load(args.model)
+        print(f"{len(examples)} labeled examples from {args.dataset}\n")
+    else:
+        examples = SEED_EXAMPLES
+        classifier = IntentClassifier.train([t for t, _ in examples], [i for _, i in examples])
+        print(f"No dataset: model trained in memory on {len(examples)} seed examples (accuracy is training accuracy)\n")
+    texts = [t for t, _ in examples]
+    intents = [i for _, i in examples]
+    classifier.predict(texts[0])  # warm-up
+
+    latencies, correct, confident, confident_correct = [], 0, 0, 0
+    for text, intent in zip(texts, intents):
+        started = time.perf_counter()
+        predicted, confidence = classifier.predict(text)
+        latencies.append((time.perf_counter() - started) * 1000)
+        correct += predicted == intent
+        if confidence >= args.threshold:
+            confident += 1
+            confident_correct += predicted == intent
+
+    report("Local classifier (all)", latencies, correct, len(texts))
+    if confident:
+        print(
+            f"{'Local classifier (confident)':<28} accuracy={confident_correct / confident:.3f}  "
+            f"coverage={confident / len(texts):.1%}  "
+            f"llm_fallback_rate={1 - confident / len(texts):.1%}  threshold={args.threshold}"
+        )
+
+    probe = []
+    for _ in range(200):
+        started = time.perf_counter()
+        classifier.predict(LATENCY_PROBE)
+        probe.append((time.perf_counter() - started) * 1000)
+    p99 = percentile(probe, 0.99)
+    print(f"{'Latency probe (long query)':<28} p50={statistics.median(probe):.3f}ms  p99={p99:.3f}ms")
+
+    if args.with_llm:
+        asyncio.run(run_llm(texts, intents))
+
+    if args.max_p99_ms is not None and p99 > args.max_p99_ms:
+        print(f"p99 latency {p99:.3f}ms exceeds the {args.max_p99_ms}ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
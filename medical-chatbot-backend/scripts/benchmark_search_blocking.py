@@ -0,0 +1,91 @@
+"""Benchmark: event-loop blocking caused by web search
+
+Runs --searches concurrent medical_search executions while an EventLoopMonitor
+(the one behind GET /metrics) samples loop lag. The ddgs call is replaced by a
+blocking sleep of --query-ms per query (no network), in two modes:
+1. blocking - both queries called synchronously inside the coroutine, one
+              after the other (how SearchTool.execute used to run)
+2. executor - SearchTool as shipped: both queries in flight at once on the
+              bounded search thread pool
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.benchmark_search_blocking
+    python -m scripts.benchmark_search_blocking --searches 20 --query-ms 400
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config needs these; no request is sent
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from app.core.clients import clients
+from app.core.metrics import EventLoopMonitor
+from app.tools.search import SearchTool
+
+
+class FakeSearchTool(SearchTool):
+    """SearchTool whose ddgs query is a blocking sleep"""
+
+    def __init__(self, query_ms: float):
+        super().__init__()
+        self.query_ms = query_ms
+
+    def _ddgs_text(self, query, max_results, timelimit):
+        time.sleep(self.query_ms / 1000.0)
+        return [{"title": query, "href": "https://www.webteb.com/x", "body": "..."}]
+
+
+class BlockingSearchTool(FakeSearchTool):
+    """The previous execute(): synchronous queries on the event loop, one after the other"""
+
+    async def execute(self, query, timelimit=None):
+        results = self._ddgs_text(f"site:webteb.com {query}", 5, timelimit)
+        results += self._ddgs_text(f"(other sources) {query}", 6, timelimit)
+        return results
+
+
+async def run(tool: SearchTool, searches: int) -> dict:
+    monitor = EventLoopMonitor(interval_ms=10.0, stall_ms=50.0)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    async def timed_search(i: int) -> float:
+        started = time.perf_counter()
+        await tool.execute(f"query {i}")
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*[timed_search(i) for i in range(searches)])
+    wall_ms = (time.perf_counter() - started) * 1000
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    return {"wall_ms": wall_ms, "search_p50_ms": statistics.median(latencies), **monitor.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=10, help="Concurrent searches")
+    parser.add_argument("--query-ms", type=float, default=300.0, help="Simulated latency of one ddgs query")
+    args = parser.parse_args()
+
+    print(f"{args.searches} concurrent searches, 2 queries each, {args.query_ms:.0f}ms per query\n")
+    print(f"{'mode':<10} {'wall':>9} {'search p50':>11} {'loop max lag':>13} {'stalls':>7} {'blocked':>10}")
+    for name, tool in [("blocking", BlockingSearchTool(args.query_ms)), ("executor", FakeSearchTool(args.query_ms))]:
+        result = asyncio.run(run(tool, args.searches))
+        print(
+            f"{name:<10} {result['wall_ms']:>7.0f}ms {result['search_p50_ms']:>9.0f}ms "
+            f"{result['max_lag_ms']:>11.0f}ms {result['stalls']:>7} {result['blocked_ms_total']:>8.0f}ms"
+        )
+    asyncio.run(clients.aclose())
+
+
+if __name__ == "__main__":
+    main()
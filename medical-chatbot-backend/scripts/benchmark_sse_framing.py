@@ -0,0 +1,87 @@
+"""Benchmark SSE framing CPU cost per 1k streamed tokens
+
+Compares the previous per-delta framing (json.dumps + f-string + string +=)
+with SSEFramer (coalescing + orjson + list-backed buffer). Token arrival is
+simulated with a fake clock, so the result is pure CPU time.
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.benchmark_sse_framing
+    python -m scripts.benchmark_sse_framing --tokens 2000 --interval-ms 15 --window-ms 30
+"""
+import argparse
+import json
+import sys
+import os
+import time
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.sse import SSEFramer, TextBuffer
+
+
+def make_deltas(count: int) -> List[str]:
+    """Mixed Arabic/English deltas of roughly one token each"""
+    words = ["السكري", " مرض", " مزمن", " يؤثر", " على", " diabetes", " is", " a", " chronic", ","]
+    return [words[i % len(words)] for i in range(count)]
+
+
+def per_delta(deltas: List[str]) -> int:
+    """Previous framing: one JSON encode, f-string and string += per delta"""
+    content = ""
+    frames = 0
+    for delta in deltas:
+        chunk = {"type": "content", "data": delta}
+        content += delta
+        frame = f"data: {json.dumps(chunk)}\n\n"
+        frames += 1
+    frame = f"data: {json.dumps({'type': 'done', 'data': {'tokens_used': len(content.split())}})}\n\n"
+    return frames + 1
+
+
+def coalesced(deltas: List[str], interval_ms: float, window_ms: float, max_bytes: int) -> int:
+    """SSEFramer framing with a simulated token clock"""
+    now = [0.0]
+    framer = SSEFramer(window_ms=window_ms, max_bytes=max_bytes, clock=lambda: now[0])
+    buffer = TextBuffer()
+    for delta in deltas:
+        now[0] += interval_ms / 1000.0
+        buffer.append(delta)
+        framer.content(delta)
+    framer.event({"type": "done", "data": {"tokens_used": len(buffer.getvalue().split())}})
+    return framer.frames
+
+
+def measure(fn, *args, repeat: int) -> float:
+    started = time.process_time()
+    for _ in range(repeat):
+        result = fn(*args)
+    return (time.process_time() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--interval-ms", type=float, default=10.0, help="Simulated time between deltas")
+    parser.add_argument("--window-ms", type=float, default=30.0)
+    parser.add_argument("--max-bytes", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    deltas = make_deltas(args.tokens)
+    scale = 1000.0 / args.tokens
+
+    before, before_frames = measure(per_delta, deltas, repeat=args.repeat)
+    after, after_frames = measure(
+        coalesced, deltas, args.interval_ms, args.window_ms, args.max_bytes, repeat=args.repeat
+    )
+
+    print(f"{args.tokens} deltas, one every {args.interval_ms}ms, window={args.window_ms}ms, max_bytes={args.max_bytes}\n")
+    print(f"{'per-delta (before)':<22} cpu_per_1k_tokens={before * scale * 1000:.3f}ms  frames={before_frames}")
+    print(f"{'coalesced (after)':<22} cpu_per_1k_tokens={after * scale * 1000:.3f}ms  frames={after_frames}")
+    if after:
+        print(f"\nspeedup x{before / after:.1f}, {before_frames / max(after_frames, 1):.1f}x fewer frames/writes")
+
+
+if __name__ == "__main__":
+    main()
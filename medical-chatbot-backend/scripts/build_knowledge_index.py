@@ -0,0 +1,77 @@
+"""Build the offline BM25 knowledge index used by medical_search
+
+Reads crawled articles from JSONL files, one {"url", "title", "text"} object
+per line (WebTeb, MedlinePlus and the other APPROVED_DOMAINS; anything else is
+skipped), and writes the memory-mapped index to settings.KNOWLEDGE_INDEX_PATH.
+With --queries, runs each query against the new index and prints its latency
+and whether it would fall back to live search.
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.build_knowledge_index data/corpus/webteb.jsonl data/corpus/medlineplus.jsonl
+    python -m scripts.build_knowledge_index corpus.jsonl --output /tmp/knowledge_index --queries queries.txt
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Dict, Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.tools.knowledge_index import KnowledgeIndex, build
+
+
+def read_corpus(paths: List[str]) -> Iterator[Dict[str, str]]:
+    """Articles from JSONL files"""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="+", help="JSONL file(s) of crawled articles")
+    parser.add_argument("--output", default=settings.KNOWLEDGE_INDEX_PATH, help="Index directory")
+    parser.add_argument("--queries", help="Text file with one query per line to check recall")
+    args = parser.parse_args()
+
+    # Build next to the target and swap, so running workers never see a half-written index
+    staging = args.output.rstrip("/") + ".building"
+    shutil.rmtree(staging, ignore_errors=True)
+    started = time.perf_counter()
+    meta = build(read_corpus(args.corpus), staging)
+    shutil.rmtree(args.output, ignore_errors=True)
+    os.replace(staging, args.output)
+
+    size = sum(os.path.getsize(os.path.join(args.output, name)) for name in os.listdir(args.output))
+    print(
+        f"Indexed {meta['num_docs']} documents ({meta['skipped']} skipped), {meta['num_terms']} terms, "
+        f"{meta['num_postings']} postings in {time.perf_counter() - started:.1f}s -> {args.output} ({size / 1e6:.1f} MB)"
+    )
+    print("Running workers load the new index on their next search (no restart needed)")
+
+    if args.queries:
+        index = KnowledgeIndex(args.output)
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+        fallbacks = 0
+        for query in queries:
+            started = time.perf_counter()
+            hits, _ = index.search(query, settings.KNOWLEDGE_INDEX_TOP_K)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            good = [hit for hit in hits if hit["coverage"] >= settings.KNOWLEDGE_INDEX_MIN_COVERAGE]
+            fallback = len(good) < settings.KNOWLEDGE_INDEX_MIN_RESULTS
+            fallbacks += fallback
+            top = good[0]["url"] if good else "-"
+            print(f"{elapsed_ms:6.1f}ms {len(good):>2} good {'LIVE ' if fallback else 'index'} {query}  {top}")
+        print(f"\n{len(queries) - fallbacks}/{len(queries)} queries answered from the index")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Load test: concurrent chat streams vs. database pool usage
+
+Opens N concurrent /api/chat streams (guest sessions) against a running server
+and, while they stream, keeps calling a database-bound endpoint
+(GET /api/conversations). Reports the latency of those calls and the database
+pool usage from GET /metrics. When streams hold a pooled connection for their
+whole lifetime, more than pool_size + max_overflow (30) concurrent chats stall
+every other endpoint; with short-lived sessions the pool only covers in-flight
+queries.
+
+Usage (from medical-chatbot-backend/, server already running):
+    python -m scripts.load_test_chat_streams --url http://localhost:8000 --streams 60
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List
+
+import httpx
+
+
+async def run_chat(client: httpx.AsyncClient, url: str, message: str) -> float:
+    """Stream one answer to completion; returns its duration in seconds"""
+    started = time.perf_counter()
+    payload = {"message": message, "guest_session_id": f"load-{uuid.uuid4().hex}"}
+    async with client.stream("POST", f"{url}/api/chat", json=payload) as response:
+        async for _ in response.aiter_bytes():
+            pass
+    return time.perf_counter() - started
+
+
+async def probe(client: httpx.AsyncClient, url: str, stop: asyncio.Event, latencies: List[float], pool_samples: List[int]):
+    """Call a DB-bound endpoint and sample pool usage until the streams finish"""
+    guest = f"probe-{uuid.uuid4().hex}"
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await client.get(f"{url}/api/conversations", params={"guest_session_id": guest}, timeout=60.0)
+            latencies.append((time.perf_counter() - started) * 1000)
+            metrics = (await client.get(f"{url}/metrics")).json()
+            pool_samples.append(metrics.get("db_pool", {}).get("checked_out", 0))
+        except httpx.HTTPError as e:
+            print(f"probe failed: {e!r}")
+        await asyncio.sleep(0.2)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--streams", type=int, default=60, help="Concurrent chat streams")
+    parser.add_argument("--message", default="ما هي أعراض السكري وكيف يتم علاجه؟")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.streams + 10)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        stop = asyncio.Event()
+        latencies, pool_samples = [], []
+        prober = asyncio.create_task(probe(client, args.url, stop, latencies, pool_samples))
+
+        started = time.perf_counter()
+        durations = await asyncio.gather(
+            *(run_chat(client, args.url, args.message) for _ in range(args.streams)),
+            return_exceptions=True
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+        metrics = (await client.get(f"{args.url}/metrics")).json()
+
+    ok = [d for d in durations if isinstance(d, float)]
+    print(f"{len(ok)}/{args.streams} streams completed in {elapsed:.1f}s "
+          f"(mean {statistics.mean(ok) if ok else 0:.1f}s per stream)")
+    if latencies:
+        print(f"DB-bound endpoint during load: p50={statistics.median(latencies):.0f}ms "
+              f"p99={percentile(latencies, 0.99):.0f}ms max={max(latencies):.0f}ms ({len(latencies)} calls)")
+    if pool_samples:
+        print(f"Pool connections checked out while streaming: max={max(pool_samples)} "
+              f"mean={statistics.mean(pool_samples):.1f}")
+    print(f"Server pool counters: {metrics.get('db_pool')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
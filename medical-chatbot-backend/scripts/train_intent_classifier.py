@@ -0,0 +1,198 @@
+"""Train / refresh the local intent classifier from logged gatekeeper decisions
+
+Every assistant message stores the gatekeeper decision in its meta_data. This
+script pairs each LLM decision with the user message that triggered it, adds a
+small bilingual seed set, trains the classifier and writes the NumPy weights to
+settings.INTENT_CLASSIFIER_PATH. A held-out split is written next to the model
+for scripts/benchmark_intent_classifier.py.
+
+Usage (from medical-chatbot-backend/):
+    python -m scripts.train_intent_classifier
+    python -m scripts.train_intent_classifier --no-db --extra data/labeled.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+import os
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.agent.intent_classifier import IntentClassifier, evaluate, INTENT_LABELS
+
+
+# Bilingual seed examples so a fresh deployment gets a usable model
+SEED_EXAMPLES: List[Tuple[str, str]] = [
+    # direct_answer - greetings, thanks, small talk, questions about the bot
+    ("hello", "direct_answer"),
+    ("hi", "direct_answer"),
+    ("hi there", "direct_answer"),
+    ("hey", "direct_answer"),
+    ("good morning", "direct_answer"),
+    ("good evening", "direct_answer"),
+    ("how are you", "direct_answer"),
+    ("thank you", "direct_answer"),
+    ("thanks a lot", "direct_answer"),
+    ("thanks", "direct_answer"),
+    ("ok thanks", "direct_answer"),
+    ("bye", "direct_answer"),
+    ("goodbye", "direct_answer"),
+    ("who are you", "direct_answer"),
+    ("what can you do", "direct_answer"),
+    ("how does this bot work", "direct_answer"),
+    ("are you a real doctor", "direct_answer"),
+    ("nice to meet you", "direct_answer"),
+    ("great, appreciate it", "direct_answer"),
+    ("ok", "direct_answer"),
+    ("مرحبا", "direct_answer"),
+    ("اهلا", "direct_answer"),
+    ("أهلا وسهلا", "direct_answer"),
+    ("السلام عليكم", "direct_answer"),
+    ("صباح الخير", "direct_answer"),
+    ("مساء الخير", "direct_answer"),
+    ("كيف حالك", "direct_answer"),
+    ("شكرا", "direct_answer"),
+    ("شكرا جزيلا", "direct_answer"),
+    ("شكراً لك", "direct_answer"),
+    ("مشكور", "direct_answer"),
+    ("يعطيك العافية", "direct_answer"),
+    ("مع السلامة", "direct_answer"),
+    ("من أنت", "direct_answer"),
+    ("ماذا تستطيع أن تفعل", "direct_answer"),
+    ("كيف يعمل هذا البوت", "direct_answer"),
+    ("هل أنت طبيب حقيقي", "direct_answer"),
+    ("تمام", "direct_answer"),
+    ("حسنا", "direct_answer"),
+    ("ممتاز شكرا", "direct_answer"),
+    # requires_tools - medical questions, symptoms, drugs, conditions
+    ("what is diabetes", "requires_tools"),
+    ("what is hypertension", "requires_tools"),
+    ("what are the symptoms of diabetes", "requires_tools"),
+    ("I have a headache and fever", "requires_tools"),
+    ("what are the side effects of aspirin", "requires_tools"),
+    ("how is asthma treated", "requires_tools"),
+    ("is ibuprofen safe during pregnancy", "requires_tools"),
+    ("what causes high cholesterol", "requires_tools"),
+    ("my child has a rash and a cough", "requires_tools"),
+    ("how to lower blood pressure naturally", "requires_tools"),
+    ("what is the normal blood sugar level", "requires_tools"),
+    ("symptoms of vitamin d deficiency", "requires_tools"),
+    ("latest news about covid vaccines", "requires_tools"),
+    ("can migraine cause nausea", "requires_tools"),
+    ("what foods are good for anemia", "requires_tools"),
+    ("I feel dizzy every morning", "requires_tools"),
+    ("how long does the flu last", "requires_tools"),
+    ("what is the treatment for kidney stones", "requires_tools"),
+    ("difference between type 1 and type 2 diabetes", "requires_tools"),
+    ("my back hurts when I bend", "requires_tools"),
+    ("ما هو السكري", "requires_tools"),
+    ("ما هي أعراض السكري", "requires_tools"),
+    ("ما هو ضغط الدم المرتفع", "requires_tools"),
+    ("عندي صداع وحرارة", "requires_tools"),
+    ("ما هي الآثار الجانبية للأسبرين", "requires_tools"),
+    ("كيف يتم علاج الربو", "requires_tools"),
+    ("هل البروفين آمن أثناء الحمل", "requires_tools"),
+    ("ما أسباب ارتفاع الكوليسترول", "requires_tools"),
+    ("طفلي عنده طفح جلدي وكحة", "requires_tools"),
+    ("كيف أخفض ضغط الدم بشكل طبيعي", "requires_tools"),
+    ("ما هو المعدل الطبيعي للسكر في الدم", "requires_tools"),
+    ("أعراض نقص فيتامين د", "requires_tools"),
+    ("آخر أخبار لقاحات كورونا", "requires_tools"),
+    ("هل الصداع النصفي يسبب الغثيان", "requires_tools"),
+    ("ما الأطعمة المفيدة لفقر الدم", "requires_tools"),
+    ("أشعر بدوخة كل صباح", "requires_tools"),
+    ("كم تستمر الإنفلونزا", "requires_tools"),
+    ("ما علاج حصى الكلى", "requires_tools"),
+    ("الفرق بين السكري النوع الأول والثاني", "requires_tools"),
+    ("ظهري يؤلمني عند الانحناء", "requires_tools"),
+]
+
+
+def load_logged_decisions() -> List[Tuple[str, str]]:
+    """Pair each logged LLM gatekeeper decision with the user message before it"""
+    from app.database import SessionLocal
+    from app.models.message import Message
+
+    examples = []
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            Message.conversation_id, Message.role, Message.content, Message.meta_data
+        ).order_by(Message.conversation_id, Message.created_at).yield_per(1000)
+
+        previous = None
+        for row in rows:
+            if (
+                row.role == "assistant"
+                and previous is not None
+                and previous.role == "user"
+                and previous.conversation_id == row.conversation_id
+            ):
+                meta = row.meta_data or {}
+                intent = meta.get("decision")
+                # Train only on LLM labels so the model never learns from itself
+                if intent in INTENT_LABELS and meta.get("decision_source", "llm") == "llm":
+                    examples.append((previous.content, intent))
+            previous = row
+    finally:
+        db.close()
+
+    return examples
+
+
+def load_jsonl(path: str) -> List[Tuple[str, str]]:
+    """Load {"text": ..., "intent": ...} lines"""
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                if item.get("intent") in INTENT_LABELS:
+                    examples.append((item["text"], item["intent"]))
+    return examples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=settings.INTENT_CLASSIFIER_PATH, help="Where to write the .npz model")
+    parser.add_argument("--no-db", action="store_true", help="Do not read logged decisions from the database")
+    parser.add_argument("--extra", action="append", default=[], help="Extra labeled JSONL file(s)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of logged examples held out for evaluation")
+    parser.add_argument("--epochs", type=int, default=30)
+    args = parser.parse_args()
+
+    logged = [] if args.no_db else load_logged_decisions()
+    for path in args.extra:
+        logged.extend(load_jsonl(path))
+
+    # Deduplicate on text, keeping the latest label
+    logged = list({text: (text, intent) for text, intent in logged}.values())
+    random.Random(0).shuffle(logged)
+
+    split = int(len(logged) * args.holdout)
+    eval_set, train_logged = logged[:split], logged[split:]
+    train_set = SEED_EXAMPLES + train_logged
+
+    print(f"Training on {len(train_set)} examples ({len(train_logged)} logged, {len(SEED_EXAMPLES)} seed)")
+    classifier = IntentClassifier.train(
+        [t for t, _ in train_set],
+        [i for _, i in train_set],
+        epochs=args.epochs
+    )
+    classifier.save(args.output)
+    print(f"Model written to {args.output}")
+
+    print(f"Training accuracy: {evaluate(classifier, [t for t, _ in train_set], [i for _, i in train_set]):.3f}")
+    if eval_set:
+        eval_path = os.path.splitext(args.output)[0] + "_eval.jsonl"
+        with open(eval_path, "w", encoding="utf-8") as f:
+            for text, intent in eval_set:
+                f.write(json.dumps({"text": text, "intent": intent}, ensure_ascii=False) + "\n")
+        print(f"Held-out accuracy: {evaluate(classifier, [t for t, _ in eval_set], [i for _, i in eval_set]):.3f} "
+              f"({len(eval_set)} examples, written to {eval_path})")
+
+
+if __name__ == "__main__":
+    main()
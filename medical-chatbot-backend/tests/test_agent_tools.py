@@ -0,0 +1,95 @@
+"""Unit tests for concurrent tool execution in the agent loop"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from app.agent import agent as agent_module
+from app.agent.agent import MedicalChatAgent
+from app.config import settings
+from app.tools.base import ToolResult
+
+
+def tool_chunk(index, call_id, name, arguments):
+    tool_delta = SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+    delta = SimpleNamespace(content=None, tool_calls=[tool_delta])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+
+def text_chunk(text):
+    delta = SimpleNamespace(content=text, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        pass
+
+
+class FakeCompletions:
+    """Returns the scripted streams in order and records each request"""
+
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.requests = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        return FakeStream(self.streams.pop(0))
+
+
+class HangingSearch:
+    async def execute(self, query, timelimit=None):
+        await asyncio.sleep(10)
+
+
+class FastSymptomChecker:
+    async def execute(self, **args):
+        return ToolResult(success=True, data={"symptoms": args["symptoms"], "conditions": ["common cold"]})
+
+
+@pytest.mark.asyncio
+async def test_tool_timeout_keeps_other_results_in_call_order(monkeypatch):
+    """A timed-out tool becomes an error message; tool messages follow tool_calls order"""
+    completions = FakeCompletions([
+        [
+            tool_chunk(0, "call_search", "medical_search", json.dumps({"query": "fever"})),
+            tool_chunk(1, "call_symptoms", "check_symptoms", json.dumps({"symptoms": ["fever"]})),
+        ],
+        [text_chunk("Rest and drink fluids.")],
+    ])
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(agent_module, "get_openai_client", lambda: client)
+    monkeypatch.setitem(agent_module.TOOL_TIMEOUTS, "medical_search", 0.1)
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", False)
+
+    agent = MedicalChatAgent()
+    agent.search_tool = HangingSearch()
+    agent.symptom_checker = FastSymptomChecker()
+
+    async def decide_action(user_message, conversation_history):
+        return {"intent": "requires_tools", "reason": "test", "confidence": 1.0, "source": "test"}
+    agent.decision_maker.decide_action = decide_action
+
+    events = [event async for event in agent.process_message("I have a fever")]
+
+    statuses = [e["data"] for e in events if e["type"] == "metadata" and "status" in e["data"] and e["data"]["status"] != "executing"]
+    assert statuses == [
+        {"tool_used": "check_symptoms", "status": "completed"},
+        {"tool_used": "medical_search", "status": "timeout"},
+    ]
+    tool_messages = [m for m in completions.requests[1]["messages"] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["call_search", "call_symptoms"]
+    assert tool_messages[0]["content"] == "Error: medical_search timed out"
+    assert json.loads(tool_messages[1]["content"])["conditions"] == ["common cold"]
+    assert "".join(e["data"] for e in events if e["type"] == "content") == "Rest and drink fluids."
+    assert events[-1]["type"] == "done" and "error" not in events[-1]["data"]
+
@@ -0,0 +1,150 @@
+"""Unit tests for the answer cache"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from app.agent import agent as agent_module
+from app.agent.agent import MedicalChatAgent
+from app.services.answer_cache import AnswerCache
+from app.tools.base import ToolResult
+
+
+@pytest.fixture
+def cache():
+    """Small cache for testing eviction"""
+    return AnswerCache(max_entries=2, ttl_seconds=60)
+
+
+class TestAnswerCache:
+    """Test suite for the answer cache"""
+
+    def test_normalized_variants_hit(self, cache):
+        """Diacritics, letter variants and punctuation map to the same entry"""
+        cache.put("ما هي أعراض السكري؟", "requires_tools", "answer", sources=[{"url": "a"}])
+        entry = cache.get("ما هي اعراض السكري")
+        assert entry is not None
+        assert entry["content"] == "answer"
+        assert entry["sources"] == [{"url": "a"}]
+
+    def test_tool_path_is_part_of_key(self, cache):
+        """An entry stored for one tool path is not returned for the other"""
+        cache.put("hello", "direct_answer", "Hi!")
+        assert cache.get("hello", ("requires_tools",)) is None
+        assert cache.get("hello", ("direct_answer",))["tool_path"] == "direct_answer"
+
+    def test_lru_eviction(self, cache):
+        """The least recently used entry is evicted beyond the size cap"""
+        cache.put("q1", "direct_answer", "a1")
+        cache.put("q2", "direct_answer", "a2")
+        cache.get("q1")
+        cache.put("q3", "direct_answer", "a3")
+        assert cache.get("q2") is None
+        assert cache.get("q1") is not None
+        assert cache.get("q3") is not None
+
+    def test_ttl_expiry(self):
+        """Expired entries are never returned"""
+        cache = AnswerCache(ttl_seconds=0)
+        cache.put("q1", "direct_answer", "a1")
+        assert cache.get("q1") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_only_standalone_questions_are_cacheable(self):
+        """Prior context or attachments disable caching"""
+        assert AnswerCache.is_cacheable([], None)
+        assert not AnswerCache.is_cacheable([{"role": "user", "content": "hi"}], None)
+        assert not AnswerCache.is_cacheable([], [{"file_name": "x.png"}])
+
+
+def tool_chunk(index, call_id, name, arguments):
+    tool_delta = SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+    delta = SimpleNamespace(content=None, tool_calls=[tool_delta])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+
+def text_chunk(text):
+    delta = SimpleNamespace(content=text, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        pass
+
+
+class FakeCompletions:
+    """Returns the scripted streams in order and records each request"""
+
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.requests = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        return FakeStream(self.streams.pop(0))
+
+
+class FakeSearch:
+    async def execute(self, query, timelimit=None):
+        return ToolResult(success=True, data={"results": []}, sources=[{"title": "WebTeb", "url": "https://www.webteb.com/a"}])
+
+
+def make_agent(monkeypatch, completions, intent):
+    """Agent without a local classifier whose gatekeeper always picks `intent`"""
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(agent_module, "get_openai_client", lambda: client)
+    answer_cache = AnswerCache()
+    monkeypatch.setattr(agent_module, "get_answer_cache", lambda: answer_cache)
+
+    agent = MedicalChatAgent()
+    agent.search_tool = FakeSearch()
+    agent.decision_maker.local_classifier = None
+
+    async def decide_action(user_message, conversation_history):
+        return {"intent": intent, "reason": "test", "confidence": 1.0, "source": "llm_memo"}
+    agent.decision_maker.decide_action = decide_action
+    return agent, answer_cache
+
+
+class TestAgentAnswerCache:
+    """The agent consults the answer cache once, on the decided tool path"""
+
+    @pytest.mark.asyncio
+    async def test_lookup_waits_for_gatekeeper_path(self, monkeypatch):
+        """Without a confident classifier the cache is looked up once, after the gatekeeper"""
+        completions = FakeCompletions([[text_chunk("Hello! How can I help?")]])
+        agent, answer_cache = make_agent(monkeypatch, completions, "direct_answer")
+
+        first = [event async for event in agent.process_message("hello there")]
+        second = [event async for event in agent.process_message("hello there")]
+
+        assert len(completions.requests) == 1
+        assert not first[-1]["data"].get("cache_hit")
+        assert second[-1]["data"]["cache_hit"] is True
+        assert "".join(e["data"] for e in second if e["type"] == "content") == "Hello! How can I help?"
+        assert (answer_cache.hits, answer_cache.misses) == (1, 1)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("timelimit, cached", [(None, True), ("d", False)])
+    async def test_time_limited_searches_are_not_cached(self, monkeypatch, timelimit, cached):
+        """Only a real timelimit value disables caching (an explicit null does not)"""
+        arguments = json.dumps({"query": "fever", "timelimit": timelimit})
+        completions = FakeCompletions([
+            [tool_chunk(0, "call_search", "medical_search", arguments)],
+            [text_chunk("Rest and drink fluids.")],
+        ])
+        agent, answer_cache = make_agent(monkeypatch, completions, "requires_tools")
+
+        events = [event async for event in agent.process_message("fever treatment")]
+
+        assert events[-1]["type"] == "done" and "error" not in events[-1]["data"]
+        assert (answer_cache.stats()["entries"] == 1) is cached
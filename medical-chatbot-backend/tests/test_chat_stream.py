@@ -0,0 +1,200 @@
+"""Unit tests for the chat endpoint's streaming lifecycle (database session, client disconnects)"""
+
+import asyncio
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.api import chat as chat_api
+from app.config import settings
+from app.core.metrics import stream_metrics
+from app.database import Base
+from app.models.user import User  # noqa: F401 - registers every table
+from app.models.guest_session import GuestSession  # noqa: F401
+from app.models.conversation import Conversation  # noqa: F401
+from app.models.feedback import Feedback  # noqa: F401
+from app.models.message import Message
+from app.schemas.chat import ChatRequest
+
+
+class FakeRequest:
+    """Starlette request stand-in whose connection state the test controls"""
+
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self) -> bool:
+        return self.disconnected
+
+
+class SlowAgent:
+    """Streams part of an answer, then generates until cancelled"""
+
+    def __init__(self):
+        self.generating = asyncio.Event()
+        self.cancelled = False
+
+    async def process_message(self, message, history, attachments=None, **kwargs):
+        yield {"type": "metadata", "data": {"decision": "DIRECT_ANSWER"}}
+        yield {"type": "content", "data": "Partial "}
+        yield {"type": "content", "data": "answer"}
+        self.generating.set()
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        yield {"type": "content", "data": " never sent"}
+
+
+@pytest_asyncio.fixture
+async def sessions(tmp_path, monkeypatch):
+    """File database shared by the request session and save_assistant_message"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chat.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    monkeypatch.setattr(chat_api, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(settings, "DISCONNECT_POLL_SECONDS", 0.05)
+    yield engine, factory
+    await engine.dispose()
+
+
+async def start_chat(factory, agent, monkeypatch):
+    """
+    Call the chat endpoint as a guest and read frames until the agent is mid-answer
+
+    Returns:
+        (SSE frame iterator, producer task, fake HTTP request)
+    """
+    monkeypatch.setattr(chat_api, "get_agent", lambda: agent)
+    http_request = FakeRequest()
+    before = set(chat_api._producers)
+    async with factory() as db:
+        response = await chat_api.chat(
+            request=ChatRequest(message="What causes headaches?", guest_session_id="guest-1"),
+            http_request=http_request,
+            current_user=None,
+            db=db,
+            last_event_id=None
+        )
+    producer = next(task for task in chat_api._producers - before if task.get_coro().__name__ == "produce")
+
+    frames = response.body_iterator
+    first = await frames.__anext__()
+    assert b'"metadata"' in first
+    await asyncio.wait_for(agent.generating.wait(), timeout=1)
+    return frames, producer, http_request
+
+
+async def saved_assistant_message(factory) -> Message:
+    async with factory() as db:
+        return await db.scalar(select(Message).where(Message.role == "assistant"))
+
+
+class TestClientDisconnect:
+    """Generation stops for clients that are gone, keeping the partial answer"""
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_immediately_without_resume(self, sessions, monkeypatch):
+        """Resumable streams off: the producer is cancelled as soon as the reader leaves"""
+        _, factory = sessions
+        monkeypatch.setattr(settings, "STREAM_RESUME_ENABLED", False)
+        agent = SlowAgent()
+        aborted_before = stream_metrics.aborted_streams
+
+        frames, producer, http_request = await start_chat(factory, agent, monkeypatch)
+        http_request.disconnected = True
+        await frames.aclose()
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(producer, timeout=0.05)
+        assert producer.cancelled()
+        assert agent.cancelled
+
+        message = await saved_assistant_message(factory)
+        assert message.content == "Partial answer"
+        assert message.meta_data["truncated"] is True
+        assert message.meta_data["finish_reason"] == "client_disconnected"
+        assert message.meta_data["decision"] == "DIRECT_ANSWER"
+        assert stream_metrics.aborted_streams == aborted_before + 1
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_after_grace_with_resume(self, sessions, monkeypatch):
+        """Resumable streams on: generation survives the grace period, then is cancelled"""
+        _, factory = sessions
+        monkeypatch.setattr(settings, "STREAM_RESUME_ENABLED", True)
+        monkeypatch.setattr(settings, "STREAM_RESUME_GRACE_SECONDS", 0.2)
+        agent = SlowAgent()
+        aborted_before = stream_metrics.aborted_streams
+
+        frames, producer, http_request = await start_chat(factory, agent, monkeypatch)
+        http_request.disconnected = True
+        await frames.aclose()
+
+        # Still generating for a client that may reconnect
+        await asyncio.sleep(0.1)
+        assert not producer.done()
+
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(producer, timeout=1)
+        assert agent.cancelled
+
+        message = await saved_assistant_message(factory)
+        assert message.content == "Partial answer"
+        assert message.meta_data["truncated"] is True
+        assert message.meta_data["finish_reason"] == "client_disconnected"
+        assert stream_metrics.aborted_streams == aborted_before + 1
+
+
+class TestRequestSession:
+    """The request's database connection is not held while the answer streams"""
+
+    @pytest.mark.asyncio
+    async def test_connection_returned_before_first_frame(self, sessions, monkeypatch):
+        """No connection is checked out while the stream is paused after its first event"""
+        engine, factory = sessions
+        counters = {"checkouts": 0, "checked_out": 0}
+
+        @event.listens_for(engine.sync_engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            counters["checkouts"] += 1
+            counters["checked_out"] += 1
+
+        @event.listens_for(engine.sync_engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            counters["checked_out"] -= 1
+
+        agent = SlowAgent()
+        monkeypatch.setattr(chat_api, "get_agent", lambda: agent)
+        before = set(chat_api._producers)
+        # Not closed by the test: the endpoint itself must release it
+        db = factory()
+        lifecycle = []
+        close_session = db.close
+
+        async def close():
+            lifecycle.append("session closed")
+            await close_session()
+        monkeypatch.setattr(db, "close", close)
+        response = await chat_api.chat(
+            request=ChatRequest(message="What causes headaches?", guest_session_id="guest-1"),
+            http_request=FakeRequest(),
+            current_user=None,
+            db=db,
+            last_event_id=None
+        )
+        producer = next(task for task in chat_api._producers - before if task.get_coro().__name__ == "produce")
+
+        frames = response.body_iterator
+        await frames.__anext__()
+        lifecycle.append("first frame")
+        await asyncio.wait_for(agent.generating.wait(), timeout=1)
+        assert counters["checkouts"] > 0
+        assert counters["checked_out"] == 0
+        assert lifecycle == ["session closed", "first frame"]
+
+        await frames.aclose()
+        producer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await producer
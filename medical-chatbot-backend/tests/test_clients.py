@@ -0,0 +1,73 @@
+"""Unit tests for the pooled upstream client transport"""
+
+import asyncio
+import httpx
+import pytest
+from app.core.clients import InstrumentedTransport
+
+
+@pytest.mark.asyncio
+async def test_transport_counts_new_connections():
+    """Keep-alive requests reuse one connection; only the first one is counted as new"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    traced = []
+
+    async def caller_trace(event_name, info):
+        traced.append(event_name)
+
+    transport = InstrumentedTransport(limits=httpx.Limits(max_connections=2))
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(3):
+            response = await client.get(f"http://127.0.0.1:{port}/", extensions={"trace": caller_trace})
+            assert response.text == "ok"
+        stats = transport.stats()
+    server.close()
+
+    assert stats["checkouts"] == 3
+    assert stats["new_connections"] == 1
+    assert stats["saturated_checkouts"] == 0
+    assert stats["in_flight_requests"] == 0
+    # A trace callback set by the caller still receives the events
+    assert "connection.connect_tcp.complete" in traced
+
+
+@pytest.mark.asyncio
+async def test_transport_counts_saturated_checkouts():
+    """A checkout while every connection serves an open response is counted as saturated"""
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: keep-alive\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    transport = InstrumentedTransport(limits=httpx.Limits(max_connections=1))
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", f"http://127.0.0.1:{port}/") as first:
+            assert transport.stats()["in_flight_requests"] == 1
+            queued = asyncio.create_task(client.get(f"http://127.0.0.1:{port}/"))
+            await asyncio.sleep(0.05)
+            assert transport.stats()["saturated_checkouts"] == 1
+            await first.aread()
+        assert (await queued).text == "ok"
+        stats = transport.stats()
+    server.close()
+
+    assert stats["checkouts"] == 2
+    assert stats["in_flight_requests"] == 0
+    assert stats["peak_in_flight_requests"] == 2
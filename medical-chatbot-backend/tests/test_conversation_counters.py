@@ -0,0 +1,52 @@
+"""Unit tests for the denormalized conversation list columns"""
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database import Base
+from app.models.user import User  # noqa: F401 - registers every table
+from app.models.guest_session import GuestSession  # noqa: F401
+from app.models.conversation import Conversation
+from app.models.feedback import Feedback  # noqa: F401
+from app.core.messages import add_message, PREVIEW_CHARS
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Fresh in-memory database"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_add_message_maintains_count_and_preview(db):
+    """Every message increments the count; the first user message becomes the preview"""
+    conversation = Conversation()
+    db.add(conversation)
+    await db.commit()
+
+    first = "ما هي أعراض السكري؟ " * 10
+    await add_message(db, conversation.id, "user", first)
+    await add_message(db, conversation.id, "assistant", "answer", {"sources": []})
+    await add_message(db, conversation.id, "user", "follow-up")
+    await db.commit()
+
+    await db.refresh(conversation)
+    assert conversation.message_count == 3
+    assert conversation.preview == first[:PREVIEW_CHARS]
+
+
+@pytest.mark.asyncio
+async def test_new_conversation_starts_empty(db):
+    """A conversation without messages has no preview and a zero count"""
+    conversation = Conversation()
+    db.add(conversation)
+    await db.commit()
+    await db.refresh(conversation)
+
+    assert conversation.message_count == 0
+    assert conversation.preview is None
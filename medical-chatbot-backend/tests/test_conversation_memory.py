@@ -80,18 +80,21 @@ class TestConversationMemory:
             system_prompt=system_prompt
         )
         
-        # Should have: 1 system message (with summary) + last 30 messages
-        expected_length = 1 + 30
+        # Should have: 1 static system message + 1 summary message + last 30 messages
+        expected_length = 2 + 30
         assert len(result) == expected_length, f"Expected {expected_length} messages, got {len(result)}"
         
-        # Check system message contains summary
+        # System prompt must stay byte-identical (prompt prefix caching)
         assert result[0]["role"] == "system"
-        assert "ملخص المحادثة السابقة" in result[0]["content"] or "Previous Conversation Summary" in result[0]["content"]
-        assert system_prompt in result[0]["content"]
+        assert result[0]["content"] == system_prompt
+        
+        # Summary follows the static prefix
+        assert result[1]["role"] == "system"
+        assert "ملخص المحادثة السابقة" in result[1]["content"] or "Previous Conversation Summary" in result[1]["content"]
         
         # Check that last 30 messages are preserved
         for i, original_msg in enumerate(long_conversation[-30:]):
-            assert result[i+1]["role"] == original_msg["role"]
+            assert result[i+2]["role"] == original_msg["role"]
     
     @pytest.mark.asyncio
     async def test_summarization_quality(self, memory_service):
@@ -142,8 +145,26 @@ async def test_memory_window_size_customization():
         system_prompt="Test system prompt"
     )
     
-    # Should have 1 system (with summary) + 20 recent messages
-    assert len(result) == 21
+    # Should have 1 system + 1 summary + 20 recent messages
+    assert len(result) == 22
+
+
+def test_token_budget_window():
+    """The window is cut by the token budget, using stored token counts"""
+    memory = ConversationMemory(window_size=30, token_budget=100)
+    messages = [
+        {"role": "user", "content": "pasted document", "token_count": 500},
+        {"role": "assistant", "content": "summary of it", "token_count": 40},
+        {"role": "user", "content": "follow-up", "token_count": 40},
+    ]
+    
+    evicted, recent = memory.split_window(messages)
+    
+    # 40 + 40 tokens plus per-message overhead fit; the long document does not
+    assert evicted == messages[:1]
+    assert recent == messages[1:]
+    assert memory.should_summarize(messages) is True
+    assert memory.should_summarize(recent) is False
 
 
 # Run tests
@@ -0,0 +1,32 @@
+"""Unit tests for the async database URL mapping"""
+
+import pytest
+from app.config import Settings
+
+
+def async_url(database_url: str) -> str:
+    return Settings(DATABASE_URL=database_url, SECRET_KEY="x", OPENAI_API_KEY="sk-test").async_database_url
+
+
+@pytest.mark.parametrize("database_url, expected", [
+    ("postgres://u:p@db:5432/app", "postgresql+asyncpg://u:p@db:5432/app"),
+    ("postgresql://u:p@db/app?sslmode=require", "postgresql+asyncpg://u:p@db/app?ssl=require"),
+    ("postgresql+psycopg2://u:p@db/app", "postgresql+asyncpg://u:p@db/app"),
+    # Neon-style URL: channel_binding is libpq-only
+    (
+        "postgresql://u:p@db.neon.tech/app?sslmode=require&channel_binding=require",
+        "postgresql+asyncpg://u:p@db.neon.tech/app?ssl=require"
+    ),
+    ("postgresql://u:p@db/app?connect_timeout=10&application_name=api", "postgresql+asyncpg://u:p@db/app"),
+    (
+        "postgresql://u:p@db/app?sslmode=verify-full&target_session_attrs=read-write",
+        "postgresql+asyncpg://u:p@db/app?ssl=verify-full&target_session_attrs=read-write"
+    ),
+    # Only whole parameter names are renamed
+    ("postgresql://u:p@db/app?xsslmode=1", "postgresql+asyncpg://u:p@db/app?xsslmode=1"),
+    ("sqlite:///./medical_chatbot.db", "sqlite+aiosqlite:///./medical_chatbot.db"),
+    ("sqlite+aiosqlite:///x.db", "sqlite+aiosqlite:///x.db"),
+])
+def test_async_database_url(database_url, expected):
+    """Sync URLs are mapped to the async driver of the same database"""
+    assert async_url(database_url) == expected
@@ -0,0 +1,90 @@
+"""Unit tests for the compact gatekeeper view and the decision memo"""
+
+import json
+from types import SimpleNamespace
+import pytest
+from app.agent import decision_maker as decision_module
+from app.agent.decision_maker import DecisionMaker, compact_history_view, GATEKEEPER_TURN_CHARS
+
+
+def test_compact_view_skips_answers_and_truncates():
+    """Only recent user turns (truncated) and earlier intents reach the gatekeeper"""
+    history = []
+    for i in range(5):
+        history.append({"role": "user", "content": f"سؤال {i} " + "x" * 500})
+        history.append({"role": "assistant", "content": "long cited answer " * 200, "intent": "requires_tools"})
+
+    view = compact_history_view(history)
+
+    assert "long cited answer" not in view
+    assert "سؤال 0" not in view and "سؤال 4" in view
+    assert all(len(line) <= len("user: ") + GATEKEEPER_TURN_CHARS + 1 for line in view.splitlines()[:-1])
+    assert view.splitlines()[-1] == "earlier intents: " + ", ".join(["requires_tools"] * 5)
+    assert compact_history_view([]) == ""
+
+
+@pytest.mark.asyncio
+async def test_decision_memo(monkeypatch):
+    """The same conversation state and message is classified by the LLM only once"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(
+                content=json.dumps({"intent": "direct_answer", "reason": "thanks", "confidence": 0.9})
+            ))]
+        )
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(decision_module, "get_openai_client", lambda: client)
+    maker = DecisionMaker(memo_max_entries=1)
+    history = [{"role": "user", "content": "ما هي أعراض السكري؟"}, {"role": "assistant", "content": "...", "intent": "requires_tools"}]
+
+    first = await maker.decide_with_llm("شكراً!", history)
+    second = await maker.decide_with_llm("شكرا", history)  # Same normalized message
+
+    assert len(calls) == 1
+    assert first["source"] == "llm" and second["source"] == "llm_memo"
+    assert second["intent"] == "direct_answer" and second["cost"] == 0.0
+
+    await maker.decide_with_llm("شكراً", [])  # Different state: evicts the only entry
+    await maker.decide_with_llm("شكراً", history)
+    assert len(calls) == 3
+    assert maker.memo_stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_follow_up_skips_local_classifier(monkeypatch):
+    """A follow-up goes to the LLM gatekeeper with its history; the classifier only sees standalone messages"""
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            usage=None,
+            choices=[SimpleNamespace(message=SimpleNamespace(
+                content=json.dumps({"intent": "requires_tools", "reason": "dosage follow-up", "confidence": 0.95})
+            ))]
+        )
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(decision_module, "get_openai_client", lambda: client)
+    maker = DecisionMaker()
+    # Confidently (and wrongly, without context) calls the short follow-up chit-chat
+    maker.local_classifier = SimpleNamespace(
+        classify=lambda message: {"intent": "direct_answer", "reason": "local", "confidence": 0.99, "source": "local"}
+    )
+    history = [
+        {"role": "user", "content": "What is the paracetamol dose for adults?"},
+        {"role": "assistant", "content": "...", "intent": "requires_tools"},
+    ]
+
+    follow_up = await maker.decide_action("and for children?", history)
+    assert follow_up["intent"] == "requires_tools" and follow_up["source"] == "llm"
+    assert "paracetamol" in calls[0]["messages"][1]["content"]
+
+    standalone = await maker.decide_action("hello", [])
+    assert standalone["source"] == "local"
+    assert len(calls) == 1
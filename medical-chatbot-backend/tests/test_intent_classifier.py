@@ -0,0 +1,68 @@
+"""Unit tests for the local intent classifier"""
+
+import pytest
+from app.agent.intent_classifier import IntentClassifier, evaluate
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    """Small bilingual labeled set"""
+    examples = [
+        ("hello", "direct_answer"),
+        ("hi there", "direct_answer"),
+        ("thank you", "direct_answer"),
+        ("thanks a lot", "direct_answer"),
+        ("good morning", "direct_answer"),
+        ("مرحبا", "direct_answer"),
+        ("شكرا", "direct_answer"),
+        ("شكرا جزيلا", "direct_answer"),
+        ("السلام عليكم", "direct_answer"),
+        ("صباح الخير", "direct_answer"),
+        ("what is diabetes", "requires_tools"),
+        ("symptoms of hypertension", "requires_tools"),
+        ("side effects of aspirin", "requires_tools"),
+        ("I have a headache and fever", "requires_tools"),
+        ("how is asthma treated", "requires_tools"),
+        ("ما هو السكري", "requires_tools"),
+        ("ما هي أعراض السكري", "requires_tools"),
+        ("عندي صداع وحرارة", "requires_tools"),
+        ("علاج الربو", "requires_tools"),
+        ("أعراض ارتفاع ضغط الدم", "requires_tools"),
+    ]
+    return [t for t, _ in examples], [i for _, i in examples]
+
+
+@pytest.fixture(scope="module")
+def classifier(training_data):
+    texts, intents = training_data
+    return IntentClassifier.train(texts, intents)
+
+
+class TestIntentClassifier:
+    """Test suite for the local intent classifier"""
+
+    def test_fits_training_data(self, classifier, training_data):
+        """The model should separate the training examples"""
+        texts, intents = training_data
+        assert evaluate(classifier, texts, intents) == 1.0
+
+    def test_normalized_variants(self, classifier):
+        """Diacritics, punctuation and letter variants should not change the label"""
+        assert classifier.predict("شُكراً!")[0] == "direct_answer"
+        assert classifier.predict("ما هي اعراض السكري؟")[0] == "requires_tools"
+
+    def test_classify_shape(self, classifier):
+        """classify() returns a zero-cost decision shaped like DecisionMaker output"""
+        decision = classifier.classify("hello")
+        assert decision["intent"] == "direct_answer"
+        assert decision["source"] == "local"
+        assert decision["cost"] == 0.0
+        assert 0.5 <= decision["confidence"] <= 1.0
+
+    def test_save_load_roundtrip(self, classifier, tmp_path):
+        """Weights saved to .npz load back to identical predictions"""
+        path = str(tmp_path / "intent.npz")
+        classifier.save(path)
+        loaded = IntentClassifier.load(path)
+        for text in ["hello", "ما هو السكري", "random text"]:
+            assert loaded.predict_proba(text) == pytest.approx(classifier.predict_proba(text), abs=1e-6)
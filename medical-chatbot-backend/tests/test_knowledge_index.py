@@ -0,0 +1,97 @@
+"""Unit tests for the offline BM25 knowledge index"""
+
+import os
+import shutil
+import pytest
+from app.config import settings
+from app.tools import knowledge_index as knowledge_index_module
+from app.tools.knowledge_index import KnowledgeIndex, build, get_knowledge_index, tokenize
+from app.tools.search import SearchTool
+
+CORPUS = [
+    {"url": "https://www.webteb.com/diabetes", "title": "مرض السكري",
+     "text": "السكري مرض مزمن. من أعراض السكري العطش الشديد وكثرة التبول."},
+    {"url": "https://medlineplus.gov/diabetes.html", "title": "Diabetes",
+     "text": "Diabetes is a disease in which blood glucose levels are too high. Symptoms include thirst."},
+    {"url": "https://www.healthline.com/diabetes", "title": "Diabetes",
+     "text": "Diabetes is a disease in which blood glucose levels are too high. Symptoms include thirst."},
+    {"url": "https://www.mayoclinic.org/asthma", "title": "Asthma",
+     "text": "Asthma is a condition in which the airways narrow and swell. Inhalers relieve symptoms."},
+    {"url": "https://example.com/diabetes", "title": "Diabetes", "text": "Not an approved domain."},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    meta = build(CORPUS, str(tmp_path / "index"))
+    assert (meta["num_docs"], meta["skipped"]) == (4, 1)
+    index = KnowledgeIndex(str(tmp_path / "index"))
+    yield index
+    index.close()
+
+
+def test_arabic_tokenization():
+    """Article, prefixes and ta marbuta variants reduce to the same term"""
+    assert tokenize("والسكري") == tokenize("السكري") == tokenize("سكري")
+    assert tokenize("الحساسية") == tokenize("حساسيه")
+
+
+def test_search_ranking_and_domain_tie_break(index):
+    """Identical articles rank by DOMAIN_PRIORITY; Arabic queries match Arabic articles"""
+    hits, _ = index.search("diabetes symptoms")
+    assert [hit["url"] for hit in hits[:2]] == ["https://medlineplus.gov/diabetes.html", "https://www.healthline.com/diabetes"]
+
+    hits, _ = index.search("ما هي أعراض مرض السكري؟")
+    assert hits[0]["url"] == "https://www.webteb.com/diabetes"
+    assert hits[0]["coverage"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_search_tool_uses_index_and_falls_back(index, monkeypatch):
+    """Good recall answers from the index; poor recall goes to live search"""
+    monkeypatch.setattr(knowledge_index_module, "_index_instance", index)
+    monkeypatch.setattr(knowledge_index_module, "_index_loaded", True)
+    monkeypatch.setattr(settings, "KNOWLEDGE_INDEX_MIN_RESULTS", 2)
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", False)
+
+    class LiveSearch(SearchTool):
+        def _ddgs_text(self, query, max_results, timelimit):
+            return [{"title": "Migraine", "href": "https://www.who.int/migraine", "body": "..."}]
+
+    tool = LiveSearch()
+    result = await tool.execute("diabetes symptoms")
+    assert result.metadata["backend"] == "knowledge_index"
+    assert set(result.data[0]) == {"title", "url", "snippet", "source", "priority"}
+    assert result.data[0]["source"] == "MedlinePlus"
+    assert "thirst" in result.data[0]["snippet"]
+
+    result = await tool.execute("migraine treatment")
+    assert result.metadata["backend"] == "live"
+    assert tool.stats()["index_fallbacks"] == 1
+
+
+def test_rebuilt_index_is_reloaded(tmp_path, monkeypatch):
+    """A rebuild swapped in the way the build script does it is picked up without a restart"""
+    path = str(tmp_path / "index")
+    monkeypatch.setattr(settings, "KNOWLEDGE_INDEX_PATH", path)
+    monkeypatch.setattr(knowledge_index_module, "_index_instance", None)
+    monkeypatch.setattr(knowledge_index_module, "_index_loaded", False)
+    monkeypatch.setattr(knowledge_index_module, "_index_signature", None)
+
+    assert get_knowledge_index() is None
+    build(CORPUS[:2], path)
+    first = get_knowledge_index()
+    assert len(first) == 2
+    assert get_knowledge_index() is first
+
+    build(CORPUS, path + ".building")
+    shutil.rmtree(path)
+    assert get_knowledge_index() is first  # Mid-swap: keeps serving the old index
+    os.replace(path + ".building", path)
+
+    rebuilt = get_knowledge_index()
+    assert rebuilt is not first and len(rebuilt) == 4
+    # The old index stays usable for searches already running on it
+    assert first.search("diabetes")[0]
+    first.close()
+    rebuilt.close()
@@ -0,0 +1,99 @@
+"""Unit tests for the long-term memory index (local hashing embedder)"""
+
+import threading
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from app.database import Base
+from app.models.user import User  # noqa: F401 - registers every table
+from app.models.guest_session import GuestSession  # noqa: F401
+from app.models.conversation import Conversation
+from app.models.feedback import Feedback  # noqa: F401
+from app.core.messages import add_message
+from app.services.memory_index import (
+    HashingEmbedder,
+    MemoryIndex,
+    pending_messages,
+    recall_messages,
+    store_index
+)
+
+
+@pytest_asyncio.fixture
+async def db():
+    """Fresh in-memory database"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+async def index_conversation(db, conversation_id: int, through_message_id: int) -> MemoryIndex:
+    """Index the messages up to `through_message_id` the way the summary worker does"""
+    embedder = HashingEmbedder()
+    index, previous_through, messages = await pending_messages(db, conversation_id, through_message_id, embedder)
+    index = index.extend([msg.id for msg in messages], await embedder.embed([msg.content for msg in messages]))
+    assert await store_index(db, conversation_id, index, embedder.name, through_message_id, previous_through)
+    await db.commit()
+    return index
+
+
+def test_hashing_embedder_similarity():
+    """Related texts score higher than unrelated ones, across inflected forms"""
+    embedder = HashingEmbedder()
+    allergy = embedder.embed_one("عندي حساسية من البنسلين")
+    question = embedder.embed_one("هل الأموكسيسيلين آمن مع الحساسية من البنسلين؟")
+    unrelated = embedder.embed_one("كم ساعة يجب أن أنام يومياً؟")
+    assert float(allergy @ question) > float(allergy @ unrelated)
+
+
+@pytest.mark.asyncio
+async def test_hashing_embedder_runs_off_the_event_loop(monkeypatch):
+    """Batch embedding runs in a worker thread and matches embed_one"""
+    embedder = HashingEmbedder()
+    threads = []
+    embed_one = embedder.embed_one
+
+    def record_thread(text):
+        threads.append(threading.get_ident())
+        return embed_one(text)
+    monkeypatch.setattr(embedder, "embed_one", record_thread)
+
+    vectors = await embedder.embed(["fever", "headache"])
+    assert vectors.shape == (2, embedder.dim)
+    assert float(vectors[0] @ embed_one("fever")) == pytest.approx(1.0)
+    assert threads and threading.get_ident() not in threads
+
+
+@pytest.mark.asyncio
+async def test_recall_old_detail_within_budget(db):
+    """A detail from early in the conversation is recalled for a related question"""
+    conversation = Conversation()
+    db.add(conversation)
+    await db.commit()
+
+    allergy = await add_message(db, conversation.id, "user", "للعلم: عندي حساسية شديدة من البنسلين")
+    for i in range(20):
+        await add_message(db, conversation.id, "user", f"سؤال عن النوم والتمارين رقم {i}")
+        await add_message(db, conversation.id, "assistant", f"نصيحة عامة عن نمط الحياة رقم {i}")
+    last = await add_message(db, conversation.id, "assistant", "آخر رسالة مفهرسة")
+    await db.commit()
+
+    index = await index_conversation(db, conversation.id, last.id)
+    assert len(index) == 42
+    assert index.vectors.nbytes == 42 * 512 * 2  # float16
+
+    # Nothing new to index: the stored index is reused as-is
+    _, previous_through, pending = await pending_messages(db, conversation.id, last.id, HashingEmbedder())
+    assert previous_through == last.id and pending == []
+
+    recalled = await recall_messages(
+        db, conversation.id, "هل يمكنني أخذ أموكسيسيلين مع حساسية البنسلين؟",
+        top_k=3, token_budget=200, min_score=0.2
+    )
+    assert recalled[0].id == allergy.id
+    assert len(recalled) <= 3
+
+    assert await recall_messages(db, conversation.id, "anything", top_k=3, token_budget=0) == []
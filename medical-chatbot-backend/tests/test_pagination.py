@@ -0,0 +1,25 @@
+"""Unit tests for keyset pagination cursors"""
+
+import pytest
+from datetime import datetime
+from app.utils.errors import ValidationException
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    """A cursor decodes back to the row's sort key"""
+    timestamp = datetime(2026, 3, 1, 12, 30, 45, 123456)
+    assert decode_cursor(encode_cursor(timestamp, 42)) == (timestamp, 42)
+
+
+def test_cursor_is_url_safe():
+    """Cursors can be passed as query parameters without escaping"""
+    cursor = encode_cursor(datetime(2026, 3, 1), 7)
+    assert all(ch.isalnum() or ch in "-_" for ch in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["garbage!", "", "bm90LWEtZGF0ZXwx"])
+def test_invalid_cursor_is_rejected(cursor):
+    """Malformed cursors are a validation error, not a server error"""
+    with pytest.raises(ValidationException):
+        decode_cursor(cursor)
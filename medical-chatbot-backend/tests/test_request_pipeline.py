@@ -0,0 +1,110 @@
+"""Unit tests for the concurrent request pipeline (memory + gatekeeper stages)"""
+
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.agent import agent as agent_module
+from app.agent.agent import MedicalChatAgent
+from app.config import settings
+
+
+def text_chunk(text):
+    delta = SimpleNamespace(content=text, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+
+class FakeStream:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def close(self):
+        pass
+
+
+class FakeCompletions:
+    """Answers every request with the same text and records it"""
+
+    def __init__(self, text):
+        self.text = text
+        self.requests = []
+
+    async def create(self, **request):
+        self.requests.append(request)
+        return FakeStream([text_chunk(self.text)])
+
+
+@pytest.mark.asyncio
+async def test_failing_stage_cancels_siblings():
+    """run_pipeline_stages cancels the other stages and re-raises the failure"""
+    sibling_cancelled = asyncio.Event()
+
+    async def slow_stage():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            sibling_cancelled.set()
+            raise
+
+    async def failing_stage():
+        await asyncio.sleep(0.01)
+        raise ValueError("gatekeeper failed")
+
+    with pytest.raises(ValueError, match="gatekeeper failed"):
+        await asyncio.wait_for(
+            agent_module.run_pipeline_stages({"memory": slow_stage(), "decision": failing_stage()}),
+            timeout=1.0
+        )
+    assert sibling_cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stage_results_and_latency():
+    """Results and latencies are keyed by stage name"""
+    async def stage(value):
+        await asyncio.sleep(0)
+        return value
+
+    results, latency_ms = await agent_module.run_pipeline_stages({"memory": stage(1), "decision": stage(2)})
+    assert results == {"memory": 1, "decision": 2}
+    assert set(latency_ms) == {"memory", "decision"}
+
+
+@pytest.mark.asyncio
+async def test_failed_stage_falls_back_to_raw_history(monkeypatch):
+    """A failing stage still yields an answer, built from the raw history on the tool-enabled path"""
+    completions = FakeCompletions("Drink fluids.")
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    monkeypatch.setattr(agent_module, "get_openai_client", lambda: client)
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", False)
+
+    agent = MedicalChatAgent()
+
+    async def decide_action(user_message, conversation_history):
+        raise RuntimeError("gatekeeper unavailable")
+    agent.decision_maker.decide_action = decide_action
+
+    history = [
+        {"role": "user", "content": "I have a fever", "token_count": 5},
+        {"role": "assistant", "content": "How long have you had it?", "token_count": 7},
+    ]
+    events = [event async for event in agent.process_message("Two days", history)]
+
+    decision = next(e["data"] for e in events if e["type"] == "metadata" and "decision" in e["data"])
+    assert decision["decision"] == "requires_tools"
+    assert decision["decision_source"] == "fallback"
+
+    messages = completions.requests[0]["messages"]
+    assert messages[0]["role"] == "system"
+    assert messages[1:] == [
+        {"role": "user", "content": "I have a fever"},
+        {"role": "assistant", "content": "How long have you had it?"},
+        {"role": "user", "content": "Two days"},
+    ]
+    assert "tools" in completions.requests[0]
+    assert "".join(e["data"] for e in events if e["type"] == "content") == "Drink fluids."
+    assert events[-1]["type"] == "done" and "error" not in events[-1]["data"]
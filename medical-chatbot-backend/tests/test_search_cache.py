@@ -0,0 +1,79 @@
+"""Unit tests for the search result cache"""
+
+import asyncio
+import pytest
+from app.services import search_cache as search_cache_module
+from app.services.search_cache import SearchCache
+from app.tools.search import SearchTool
+
+RESULT = {"data": [{"title": "Diabetes"}], "sources": [{"url": "https://www.webteb.com/x"}], "metadata": {}}
+
+
+@pytest.mark.asyncio
+async def test_key_normalization_and_timelimit():
+    """Normalized queries share an entry; a different timelimit does not"""
+    cache = SearchCache(max_entries=8)
+    await cache.put("Diabetes  Symptoms", None, RESULT)
+
+    assert (await cache.get("diabetes symptoms"))[1] == "hit"
+    assert (await cache.get("diabetes symptoms", "d"))[1] == "miss"
+
+
+@pytest.mark.asyncio
+async def test_stale_then_expired(monkeypatch):
+    """Past the TTL an entry is stale; past twice the TTL it is gone"""
+    now = [1000.0]
+    monkeypatch.setattr(search_cache_module.time, "time", lambda: now[0])
+    cache = SearchCache(max_entries=8)
+    await cache.put("flu", "d", RESULT)
+
+    now[0] += search_cache_module.TIMELIMIT_TTL_SECONDS["d"] + 1
+    assert (await cache.get("flu", "d"))[1] == "stale"
+    now[0] += search_cache_module.TIMELIMIT_TTL_SECONDS["d"]
+    assert await cache.get("flu", "d") == (None, "miss")
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_between_instances(tmp_path):
+    """An entry written by one worker is read by another through SQLite"""
+    path = str(tmp_path / "search_cache.db")
+    await SearchCache(sqlite_path=path).put("asthma", None, RESULT)
+
+    other = SearchCache(sqlite_path=path)
+    cached, status = await other.get("asthma")
+    assert status == "hit"
+    assert cached == RESULT
+    assert other.stats()["shared_hits"] == 1
+
+
+class CountingSearch(SearchTool):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def _ddgs_text(self, query, max_results, timelimit):
+        self.calls += 1
+        return [{"title": "Asthma", "href": "https://www.webteb.com/asthma", "body": "..."}]
+
+
+@pytest.mark.asyncio
+async def test_search_tool_serves_stale_and_refreshes(monkeypatch):
+    """A stale hit is returned at once and refreshed in the background"""
+    cache = SearchCache(max_entries=8)
+    monkeypatch.setattr(search_cache_module, "_search_cache_instance", cache)
+    tool = CountingSearch()
+
+    assert (await tool.execute("asthma")).metadata["cache"] == "miss"
+    assert (await tool.execute("asthma")).metadata["cache"] == "hit"
+    assert tool.calls == 2
+
+    key = cache.make_key("asthma", None)
+    cache._entries[key]["stored_at"] -= cache.ttl_seconds + 1
+    result = await tool.execute("asthma")
+    assert result.success is True
+    assert result.metadata["cache"] == "stale"
+    await asyncio.gather(*tool._refreshing.values())
+
+    assert tool.calls == 4
+    assert tool.refreshes == 1
+    assert (await cache.get("asthma"))[1] == "hit"
@@ -0,0 +1,69 @@
+"""Unit tests for the non-blocking search tool"""
+
+import asyncio
+import time
+import pytest
+from app.config import settings
+from app.tools.search import SearchTool
+
+
+class SlowWebTebSearch(SearchTool):
+    """WebTeb query hangs past the timeout; the other sources answer"""
+
+    def _ddgs_text(self, query, max_results, timelimit):
+        if query.startswith("site:webteb.com"):
+            time.sleep(0.5)
+            return []
+        return [{"title": "Diabetes", "href": "https://www.mayoclinic.org/diabetes", "body": "..."}]
+
+
+class FailingSearch(SearchTool):
+    def _ddgs_text(self, query, max_results, timelimit):
+        raise RuntimeError("rate limited")
+
+
+@pytest.mark.asyncio
+async def test_query_timeout_keeps_other_results(monkeypatch):
+    """A slow query times out on its own; results of the other query are returned"""
+    monkeypatch.setattr(settings, "SEARCH_QUERY_TIMEOUT", 0.1)
+    tool = SlowWebTebSearch()
+
+    started = time.perf_counter()
+    result = await tool.execute("diabetes")
+
+    assert time.perf_counter() - started < 0.4
+    assert result.success is True
+    assert [source["source"] for source in result.sources] == ["Mayo Clinic"]
+    stats = tool.stats()
+    assert (stats["queries"], stats["timeouts"], stats["failures"]) == (2, 1, 0)
+    # The timed-out ddgs call still holds its thread until it returns
+    assert (stats["abandoned_queries"], stats["abandoned_running"]) == (1, 1)
+    await asyncio.sleep(0.6)
+    assert tool.stats()["abandoned_running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_query_is_counted_as_abandoned(monkeypatch):
+    """A cancelled query (e.g. a superseded early search) is tracked until its thread is free"""
+    monkeypatch.setattr(settings, "SEARCH_QUERY_TIMEOUT", 5.0)
+    tool = SlowWebTebSearch()
+
+    query = asyncio.create_task(tool._run_query("webteb", "site:webteb.com fever", 5, None))
+    await asyncio.sleep(0.05)
+    query.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await query
+
+    assert tool.stats()["abandoned_running"] == 1
+    await asyncio.sleep(0.6)
+    assert tool.stats()["abandoned_running"] == 0
+    assert tool.stats()["timeouts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_all_queries_failing():
+    """The tool reports failure only when no query returned"""
+    tool = FailingSearch()
+    result = await tool.execute("diabetes")
+    assert result.success is False
+    assert tool.stats()["failures"] == 2
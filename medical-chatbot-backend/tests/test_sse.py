@@ -0,0 +1,93 @@
+"""Unit tests for SSE framing"""
+
+import asyncio
+import json
+import pytest
+from app.utils.sse import SSEFramer, TextBuffer, paced_events
+
+
+def parse(frames: bytes):
+    """Decode concatenated SSE frames into event dicts"""
+    return [json.loads(part[len(b"data: "):]) for part in frames.split(b"\n\n") if part]
+
+
+class TestSSEFramer:
+    """Test suite for the coalescing SSE framer"""
+
+    def test_coalesces_within_window(self):
+        """Deltas arriving inside the window are sent as one content frame"""
+        now = [0.0]
+        framer = SSEFramer(window_ms=30, max_bytes=512, clock=lambda: now[0])
+        out = b""
+        for delta in ["مر", "حبا", " world"]:
+            now[0] += 0.005
+            out += framer.content(delta) or b""
+        assert out == b""
+        out += framer.event({"type": "done", "data": {}})
+        assert parse(out) == [
+            {"type": "content", "data": "مرحبا world"},
+            {"type": "done", "data": {}}
+        ]
+
+    def test_flushes_on_window_and_bytes(self):
+        """A frame is emitted once the window elapses or the byte budget is hit"""
+        now = [0.0]
+        framer = SSEFramer(window_ms=30, max_bytes=8, clock=lambda: now[0])
+        assert framer.content("ab") is None
+        now[0] = 0.05
+        assert parse(framer.content("cd")) == [{"type": "content", "data": "abcd"}]
+        assert parse(framer.content("123456789")) == [{"type": "content", "data": "123456789"}]
+
+    def test_zero_window_disables_coalescing(self):
+        """With a 0 ms window every delta is its own frame"""
+        framer = SSEFramer(window_ms=0)
+        assert parse(framer.content("a")) == [{"type": "content", "data": "a"}]
+
+    def test_text_buffer(self):
+        """TextBuffer joins appended parts"""
+        buffer = TextBuffer()
+        assert not buffer
+        for part in ["a", "b", "c"]:
+            buffer.append(part)
+        assert buffer.getvalue() == "abc"
+        buffer.append("d")
+        assert buffer.getvalue() == "abcd" and len(buffer) == 4
+
+
+class TestPacedEvents:
+    """Test suite for the coalescing deadline"""
+
+    @pytest.mark.asyncio
+    async def test_flushes_pending_content_during_stall(self):
+        """Buffered text goes out after the window even if the next delta is late"""
+        received = []
+        next_delta_sent = asyncio.Event()
+
+        async def agent_events():
+            yield {"type": "content", "data": "Hello"}
+            await asyncio.sleep(0.3)  # Tool call / slow token
+            next_delta_sent.set()
+            yield {"type": "content", "data": " world"}
+
+        framer = SSEFramer(window_ms=20)
+        async for item in paced_events(agent_events(), framer):
+            if isinstance(item, bytes):
+                received.append((parse(item), next_delta_sent.is_set()))
+            else:
+                framer.content(item["data"])
+
+        assert received[0] == ([{"type": "content", "data": "Hello"}], False)
+        assert parse(framer.flush()) == [{"type": "content", "data": " world"}]
+
+    @pytest.mark.asyncio
+    async def test_passes_events_through(self):
+        """Events and errors of the source are forwarded unchanged"""
+        async def agent_events():
+            yield {"type": "metadata", "data": {}}
+            raise RuntimeError("boom")
+
+        items = []
+        with pytest.raises(RuntimeError):
+            async for item in paced_events(agent_events(), SSEFramer()):
+                items.append(item)
+        assert items == [{"type": "metadata", "data": {}}]
@@ -0,0 +1,112 @@
+"""Unit tests for the resumable stream buffer"""
+
+import asyncio
+import pytest
+from app.services.stream_buffer import (
+    InMemoryStreamStore,
+    SQLiteStreamStore,
+    StreamBufferStore,
+    format_event_id,
+    parse_event_id
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    """Both backends with a tiny ring buffer"""
+    if request.param == "sqlite":
+        sqlite_store = SQLiteStreamStore(str(tmp_path / "streams.db"), max_events=3)
+        yield sqlite_store
+        sqlite_store.close()
+    else:
+        yield InMemoryStreamStore(max_events=3)
+
+
+class TestStreamBuffer:
+    """Test suite for the stream buffer backends"""
+
+    def test_event_id_roundtrip(self):
+        """Event ids encode the stream id and sequence number"""
+        assert parse_event_id(format_event_id("abc", 7)) == ("abc", 7)
+        assert parse_event_id("garbage") is None
+
+    @pytest.mark.asyncio
+    async def test_resume_after_sequence(self, store):
+        """Reading after a sequence number returns only the later frames"""
+        await store.create("s1", "guest:g1")
+        for frame in [b"a", b"b", b"c"]:
+            await store.append("s1", frame)
+
+        frames, finished = await store.read("s1", 1)
+        assert frames == [(2, b"b"), (3, b"c")]
+        assert finished is False
+
+        await store.finish("s1")
+        frames, finished = await store.read("s1", 3)
+        assert frames == [] and finished is True
+
+    @pytest.mark.asyncio
+    async def test_ring_buffer_eviction(self, store):
+        """Resuming from a frame that fell out of the ring buffer is refused"""
+        await store.create("s1", "guest:g1")
+        for frame in [b"a", b"b", b"c", b"d", b"e"]:
+            await store.append("s1", frame)
+
+        assert await store.read("s1", 0) is None
+        frames, _ = await store.read("s1", 2)
+        assert [seq for seq, _ in frames] == [3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_owner_and_heartbeat(self, store):
+        """Owner is stored and readers update the heartbeat"""
+        await store.create("s1", "user:5")
+        assert await store.get_owner("s1") == "user:5"
+        assert await store.get_owner("missing") is None
+
+        before = await store.last_seen("s1")
+        await store.touch("s1")
+        assert await store.last_seen("s1") >= before
+
+    @pytest.mark.asyncio
+    async def test_expiry_keeps_active_streams(self, store):
+        """Finished and abandoned streams expire; appending to an expired stream cancels the producer"""
+        store.ttl_seconds = 0.05
+        await store.create("active", "guest:g1")
+        await store.create("abandoned", "guest:g1")  # Producer crashed before finishing it
+        await store.create("done", "guest:g1")
+        await store.finish("done")
+        await asyncio.sleep(0.06)
+        await store.append("active", b"a")
+
+        await store.create("new", "guest:g1")
+        assert await store.get_owner("active") == "guest:g1"
+        assert await store.get_owner("abandoned") is None
+        assert await store.get_owner("done") is None
+        assert await store.append("active", b"b") == 2
+        with pytest.raises(asyncio.CancelledError):
+            await store.append("abandoned", b"a")
+
+    @pytest.mark.asyncio
+    async def test_sqlite_stores_share_streams(self, tmp_path):
+        """Workers on the same host (one store each) resume each other's streams"""
+        path = str(tmp_path / "streams.db")
+        producer_worker, reader_worker = SQLiteStreamStore(path), SQLiteStreamStore(path)
+        try:
+            await producer_worker.create("s1", "guest:g1")
+            await producer_worker.append("s1", b"a")
+            await producer_worker.finish("s1")
+
+            assert await reader_worker.get_owner("s1") == "guest:g1"
+            assert await reader_worker.read("s1", 0) == ([(1, b"a")], True)
+        finally:
+            producer_worker.close()
+            reader_worker.close()
+
+    def test_incomplete_backend_fails_on_instantiation(self):
+        """Backends must implement the whole interface"""
+        class Partial(StreamBufferStore):
+            async def create(self, stream_id, owner):
+                pass
+
+        with pytest.raises(TypeError):
+            Partial()
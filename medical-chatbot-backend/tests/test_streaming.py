@@ -0,0 +1,173 @@
+"""Unit tests for streamed tool call handling"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from app.agent.agent import MedicalChatAgent
+from app.agent.streaming import ToolAwareStream, find_complete_string_argument
+from app.tools.base import ToolResult
+
+
+def tool_chunk(index, call_id=None, name=None, arguments=None):
+    """A chat.completions chunk carrying one tool call fragment"""
+    tool_delta = SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+    delta = SimpleNamespace(content=None, tool_calls=[tool_delta])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+
+def text_chunk(text):
+    delta = SimpleNamespace(content=text, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+
+
+async def fake_stream(chunks):
+    for chunk in chunks:
+        await asyncio.sleep(0)  # Network: lets an early search task start
+        yield chunk
+
+
+def fragments(arguments, size=4):
+    return [arguments[i:i + size] for i in range(0, len(arguments), size)]
+
+
+class FakeSearchTool:
+    """Records medical_search executions"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, query, timelimit=None):
+        self.calls.append((query, timelimit))
+        await asyncio.sleep(0.05)
+        return ToolResult(
+            success=True,
+            data=[{"query": query, "timelimit": timelimit}],
+            sources=[{"title": query, "url": "https://www.webteb.com/x", "source": "WebTeb"}]
+        )
+
+
+class TestFindCompleteStringArgument:
+    """Test suite for the incremental JSON string argument scanner"""
+
+    def test_partial_input(self):
+        """The value is returned only once its closing quote has arrived"""
+        arguments = '{"query": "diabetes symptoms", "timelimit": "w"}'
+        seen = [find_complete_string_argument(arguments[:end], "query") for end in range(len(arguments) + 1)]
+        first = seen.index("diabetes symptoms")
+        assert all(value is None for value in seen[:first])
+        assert arguments[:first].endswith('symptoms"')
+        assert find_complete_string_argument('{"query": "diabetes sy', "query") is None
+        assert find_complete_string_argument('{"query"', "query") is None
+        assert find_complete_string_argument("", "query") is None
+
+    def test_escapes(self):
+        """Escaped quotes and \\uXXXX sequences are decoded"""
+        assert find_complete_string_argument(r'{"query": "say \"hi\" now"', "query") == 'say "hi" now'
+        assert find_complete_string_argument(r'{"query": "\u0633\u0643\u0631\u064a"}', "query") == "سكري"
+        assert find_complete_string_argument(r'{"query": "a\\', "query") is None
+        assert find_complete_string_argument(r'{"query": "ends with \\"}', "query") == "ends with \\"
+        # Incomplete \u escape: wait for the rest
+        assert find_complete_string_argument(r'{"query": "\u06', "query") is None
+
+    def test_key_as_value(self):
+        """A value equal to the key name is not mistaken for the key"""
+        arguments = '{"timelimit": "query", "query": "flu"}'
+        assert find_complete_string_argument(arguments, "query") == "flu"
+        assert find_complete_string_argument('{"timelimit": "query"', "query") is None
+
+    def test_nested_objects(self):
+        """Keys inside nested objects and arrays are skipped"""
+        arguments = '{"filters": {"query": "nested", "tags": ["a", "}"]}, "query": "top"}'
+        assert find_complete_string_argument(arguments, "query") == "top"
+        assert find_complete_string_argument('{"filters": {"query": "nested"', "query") is None
+
+    def test_unterminated_and_invalid(self):
+        """Unterminated strings, non-string values and invalid JSON give None"""
+        assert find_complete_string_argument('{"query": "never closed', "query") is None
+        assert find_complete_string_argument('{"query": 42}', "query") is None
+        assert find_complete_string_argument('{"other": "x"}', "query") is None
+        assert find_complete_string_argument('["query", "x"]', "query") is None
+        assert find_complete_string_argument('{query: "x"}', "query") is None
+
+
+class TestToolAwareStream:
+    """Test suite for tool call accumulation across chunks"""
+
+    @pytest.mark.asyncio
+    async def test_interleaved_tool_calls(self):
+        """Fragments of parallel tool calls are accumulated by index"""
+        search_args = fragments('{"query": "diabetes"}')
+        symptom_args = fragments('{"symptoms": ["fever", "cough"]}')
+        chunks = [
+            text_chunk("Let me check. "),
+            tool_chunk(0, "call_a", "medical_search", ""),
+            tool_chunk(1, "call_b", "check_", ""),
+            tool_chunk(1, name="symptoms"),
+        ]
+        for i in range(max(len(search_args), len(symptom_args))):
+            if i < len(symptom_args):
+                chunks.append(tool_chunk(1, arguments=symptom_args[i]))
+            if i < len(search_args):
+                chunks.append(tool_chunk(0, arguments=search_args[i]))
+
+        stream = ToolAwareStream(fake_stream(chunks))
+        events = [event async for event in stream.events()]
+
+        assert [e["data"] for e in events if e["type"] == "content"] == ["Let me check. "]
+        assert "".join(e["data"]["arguments"] for e in events if e["type"] == "tool_call_delta" and e["data"]["index"] == 0) == '{"query": "diabetes"}'
+        assert stream.get_tool_calls() == [
+            {"id": "call_a", "name": "medical_search", "arguments": '{"query": "diabetes"}'},
+            {"id": "call_b", "name": "check_symptoms", "arguments": '{"symptoms": ["fever", "cough"]}'},
+        ]
+        message = stream.assistant_message()
+        assert message["content"] == "Let me check. "
+        assert [call["id"] for call in message["tool_calls"]] == ["call_a", "call_b"]
+
+
+class TestEarlySearch:
+    """Test suite for starting medical_search while arguments stream"""
+
+    async def stream_with_early_search(self, agent, arguments):
+        """Consume a tool call stream the way process_message does"""
+        chunks = [tool_chunk(0, "call_a", "medical_search", "")] + [tool_chunk(0, arguments=f) for f in fragments(arguments)]
+        stream = ToolAwareStream(fake_stream(chunks))
+        early_searches = {}
+        started_at = None
+        async for event in stream.events():
+            index = event["data"]["index"]
+            if index not in early_searches and agent._start_early_search(stream.tool_calls[index], index, early_searches):
+                started_at = stream.tool_calls[index]["arguments"]
+        return stream.get_tool_calls()[0], early_searches, started_at
+
+    @pytest.mark.asyncio
+    async def test_early_search_reused_when_arguments_match(self):
+        """The search starts before the arguments end and its result is reused"""
+        agent = MedicalChatAgent()
+        agent.search_tool = FakeSearchTool()
+        arguments = json.dumps({"query": "diabetes symptoms", "extra": "padding to stream after the query"})
+
+        tool_call, early_searches, started_at = await self.stream_with_early_search(agent, arguments)
+        assert started_at != arguments
+
+        outcome = await agent._run_tool_call(tool_call, early_searches.get(0))
+        assert agent.search_tool.calls == [("diabetes symptoms", None)]
+        assert outcome["status"] == "completed"
+        assert json.loads(outcome["content"]) == [{"query": "diabetes symptoms", "timelimit": None}]
+
+    @pytest.mark.asyncio
+    async def test_early_search_cancelled_when_arguments_differ(self):
+        """A timelimit arriving after the query invalidates the early search"""
+        agent = MedicalChatAgent()
+        agent.search_tool = FakeSearchTool()
+        arguments = json.dumps({"query": "flu vaccine news", "timelimit": "w"})
+
+        tool_call, early_searches, _ = await self.stream_with_early_search(agent, arguments)
+        early_task = early_searches[0]["task"]
+        assert early_searches[0]["timelimit"] is None
+
+        outcome = await agent._run_tool_call(tool_call, early_searches.get(0))
+        await asyncio.sleep(0)
+        assert early_task.cancelled()
+        assert agent.search_tool.calls == [("flu vaccine news", None), ("flu vaccine news", "w")]
+        assert json.loads(outcome["content"]) == [{"query": "flu vaccine news", "timelimit": "w"}]
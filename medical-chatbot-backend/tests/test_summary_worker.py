@@ -0,0 +1,47 @@
+"""Unit tests for the background summary worker"""
+
+import asyncio
+import pytest
+from app.services.summary_worker import SummaryWorker
+
+
+class RecordingWorker(SummaryWorker):
+    """Summary worker that records jobs instead of calling the LLM"""
+
+    def __init__(self):
+        super().__init__(concurrency=2)
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def fold(self, conversation_id: int) -> bool:
+        self.calls.append(conversation_id)
+        await self.release.wait()
+        return True
+
+
+class TestSummaryWorker:
+    """Test suite for job scheduling and coalescing"""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_pending_jobs(self):
+        """Repeated schedules while a job is queued or running collapse into one follow-up run"""
+        worker = RecordingWorker()
+        worker.schedule(1)
+        worker.schedule(1)  # Still queued: coalesced
+        await asyncio.sleep(0)
+        assert worker.calls == [1]
+
+        worker.schedule(1)  # Running: one follow-up run
+        worker.schedule(1)
+        worker.schedule(2)
+        await asyncio.sleep(0)
+        assert sorted(worker.calls) == [1, 2]  # Never two jobs for the same conversation at once
+
+        worker.release.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert sorted(worker.calls) == [1, 1, 2]
+        assert worker.stats()["coalesced"] == 2
+        assert worker.stats()["pending"] == 0
+        assert worker.stats()["updated"] == 3
+        await worker.stop()